@@ -3,8 +3,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
 from fastapi.security import OAuth2PasswordBearer
 from app.models.schemas import UserCreate, UserUpdate, User, Token
-from app.core.security import verify_password, create_access_token, decode_access_token
+from app.core.security import verify_password_async, create_access_token, decode_access_token, token_cache
 from app.data_access.repositories.user_repository import UserRepository
+from app.core.exceptions import DatabaseError
 
 # --- 从 app.state 获取实例 ---
 def get_user_repository(request: Request) -> UserRepository:
@@ -22,6 +23,11 @@ async def get_current_user(
     依赖项：验证JWT并返回当前登录的用户对象。
     这是一个“守卫”，保护需要登录才能访问的接口。
     """
+    # 短时间内验证过的令牌直接返回缓存的用户
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     token_data = decode_access_token(token)
     if not token_data or not (username := token_data.get("sub")):
         # 使用 walrus operator (:=) for python 3.8+
@@ -39,7 +45,9 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     # 将数据库ORM对象转换为Pydantic模型User再返回
-    return User.model_validate(user)
+    current_user = User.model_validate(user)
+    token_cache.put(token, current_user, token_data.get("exp"))
+    return current_user
 
 
 # --- API 路由 ---
@@ -56,7 +64,11 @@ async def register_user(
     if await user_repo.get_by_email(payload.email):
         raise HTTPException(status_code=400, detail="邮箱已被注册")
 
-    db_user = await user_repo.create(user_create=payload)
+    try:
+        db_user = await user_repo.create(user_create=payload)
+    except DatabaseError as e:
+        # 并发注册同一用户名/邮箱时，只有第一个请求成功
+        raise HTTPException(status_code=400, detail=e.message)
     return db_user
 
 @router.post("/login", response_model=Token)
@@ -75,7 +87,8 @@ async def login_for_access_token(
 
     # 从密码表中取 password_hash
     password_hash = await user_repo.get_hashed_password(user.id)
-    if not verify_password(payload.get("password"), password_hash):
+    # bcrypt 校验在线程池中执行，不阻塞事件循环
+    if not password_hash or not await verify_password_async(payload.get("password"), password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -111,4 +124,6 @@ async def update_current_user_profile(
             raise HTTPException(status_code=400, detail="此邮箱已被其他用户注册")
 
     updated_user = await user_repo.update(db_obj=db_user, obj_in=payload)
+    # 资料已变化，之后的请求重新验证令牌
+    token_cache.invalidate_user(current_user.id)
     return updated_user
\ No newline at end of file
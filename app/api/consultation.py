@@ -3,13 +3,10 @@ from typing import List, Dict, Any
 from app.models.schemas import ConsultationMessage, ConsultationResponse, ConsultationSurvey, StartSessionPayload, SessionMeta, User
 from app.business_logic.controllers.consultation_controller import ConsultationController
 from app.data_access.repositories.session_repository import SessionRepository
+from app.data_access.repositories.survey_repository import SurveyRepository
+from app.business_logic.services.session_locks import SessionLockManager
 from app.api.auth import get_current_user
 
-import json
-
-with open('data/user.json', 'r', encoding='utf-8') as f:
-    user_survey_dict = json.load(f)
-
 router = APIRouter(prefix="/consultation", tags=["Consultation V2"])
 
 def get_consultation_controller(request: Request) -> ConsultationController:
@@ -18,12 +15,27 @@ def get_consultation_controller(request: Request) -> ConsultationController:
 def get_session_repository(request: Request) -> SessionRepository:
     return request.app.state.session_repository
 
+def get_survey_repository(request: Request) -> SurveyRepository:
+    return request.app.state.survey_repository
+
+def get_session_locks(request: Request) -> SessionLockManager:
+    return request.app.state.session_locks
+
+async def check_session_owner(session_repo: SessionRepository, session_id: str, current_user: User):
+    """会话不存在时返回404，不属于当前用户时返回403"""
+    session_meta = await session_repo.get_meta(session_id)
+    if not session_meta:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    if session_meta["user_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="禁止访问他人会话")
+
 @router.post("/start", response_model=ConsultationResponse)
 async def start_session(
     payload: StartSessionPayload,
     current_user: User = Depends(get_current_user),
     controller: ConsultationController = Depends(get_consultation_controller),
     session_repo: SessionRepository = Depends(get_session_repository),
+    survey_repo: SurveyRepository = Depends(get_survey_repository),
 ):
     if payload.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="禁止访问他人会话")
@@ -34,13 +46,13 @@ async def start_session(
     )
     initial_state = await controller.start_new_session(session_id)
 
-    initial_survey = {}
-    for item in user_survey_dict:
-        if item.get("年级") == current_user.grade and item.get("性别") == current_user.gender and item.get("学校") == current_user.university and item.get("专业") == current_user.major:
-            initial_survey = item
-            break
+    initial_survey = await survey_repo.get_for_user(
+        current_user.grade, current_user.gender, current_user.university, current_user.major
+    ) or {}
     initial_state["initial_scales_result"] = initial_survey
     initial_state["current_student_basic_info"] = current_user
+    # 补充的信息写入检查点，后续请求从检查点读取会话状态
+    await controller.save_session_state(session_id, initial_state)
     await session_repo.update(session_id, initial_state)
     return ConsultationResponse(session_id=session_id, agent_output=initial_state["dialogue_history"][-1][0], is_complete=False)
 
@@ -51,26 +63,30 @@ async def send_survey(
     current_user: User = Depends(get_current_user),
     controller: ConsultationController = Depends(get_consultation_controller),
     session_repo: SessionRepository = Depends(get_session_repository),
+    session_locks: SessionLockManager = Depends(get_session_locks),
 ):
-    session = await session_repo.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="会话不存在")
-    if session["user_id"] != current_user.id:
-        raise HTTPException(status_code=403, detail="禁止访问他人会话")
-    if session['state'].get("is_complete", False):
-        return ConsultationResponse(session_id=session_id, agent_output="本次会话已结束", is_complete=True)
+    # 归属检查在合并重复请求之前完成，其他用户的请求不会拿到本会话的结果
+    await check_session_owner(session_repo, session_id, current_user)
 
-    if not session['state'].get("wait_for_user_input", False):
-        raise HTTPException(status_code=400, detail="当前不需要用户输入")
-    
-    updated_state = await controller.process_user_survey(session_id, session['state'], payload.user_survey)
-    await session_repo.update(session_id, updated_state)
+    async def process() -> ConsultationResponse:
+        session = await session_repo.get(session_id)
+        if session['state'].get("is_complete", False):
+            return ConsultationResponse(session_id=session_id, agent_output="本次会话已结束", is_complete=True)
 
-    return ConsultationResponse(
-        session_id=session_id,
-        agent_output=updated_state["dialogue_history"][-1][0],
-        is_complete=updated_state.get("is_complete", False)
-    )
+        if not session['state'].get("wait_for_user_input", False):
+            raise HTTPException(status_code=400, detail="当前不需要用户输入")
+
+        updated_state = await controller.process_user_survey(session_id, session['state'], payload.user_survey)
+        await session_repo.update(session_id, updated_state)
+
+        return ConsultationResponse(
+            session_id=session_id,
+            agent_output=updated_state["dialogue_history"][-1][0],
+            is_complete=updated_state.get("is_complete", False)
+        )
+
+    # 同一会话串行处理，进行中的重复提交合并为一次
+    return await session_locks.run(session_id, ("survey", current_user.id, payload.user_survey), process)
 
 @router.post("/{session_id}/message", response_model=ConsultationResponse)
 async def send_message(
@@ -79,26 +95,30 @@ async def send_message(
     current_user: User = Depends(get_current_user),
     controller: ConsultationController = Depends(get_consultation_controller),
     session_repo: SessionRepository = Depends(get_session_repository),
+    session_locks: SessionLockManager = Depends(get_session_locks),
 ):
-    session = await session_repo.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="会话不存在")
-    if session["user_id"] != current_user.id:
-        raise HTTPException(status_code=403, detail="禁止访问他人会话")
-    if session['state'].get("is_complete", False):
-        return ConsultationResponse(session_id=session_id, agent_output="本次会话已结束", is_complete=True)
+    # 归属检查在合并重复请求之前完成，其他用户的请求不会拿到本会话的结果
+    await check_session_owner(session_repo, session_id, current_user)
 
-    if not session['state'].get("wait_for_user_input", False):
-        raise HTTPException(status_code=400, detail="当前不需要用户输入")
-    
-    updated_state = await controller.process_user_message(session_id, session['state'], payload.user_input)
-    await session_repo.update(session_id, updated_state)
+    async def process() -> ConsultationResponse:
+        session = await session_repo.get(session_id)
+        if session['state'].get("is_complete", False):
+            return ConsultationResponse(session_id=session_id, agent_output="本次会话已结束", is_complete=True)
 
-    return ConsultationResponse(
-        session_id=session_id,
-        agent_output=updated_state["dialogue_history"][-1][0],
-        is_complete=updated_state.get("is_complete", False)
-    )
+        if not session['state'].get("wait_for_user_input", False):
+            raise HTTPException(status_code=400, detail="当前不需要用户输入")
+
+        updated_state = await controller.process_user_message(session_id, session['state'], payload.user_input)
+        await session_repo.update(session_id, updated_state)
+
+        return ConsultationResponse(
+            session_id=session_id,
+            agent_output=updated_state["dialogue_history"][-1][0],
+            is_complete=updated_state.get("is_complete", False)
+        )
+
+    # 同一会话串行处理，进行中的重复提交合并为一次
+    return await session_locks.run(session_id, ("message", current_user.id, payload.user_input), process)
 
 @router.get("/{session_id}") # 暂时移除 response_model 以便直接返回字典
 async def get_session_detail(
@@ -1,10 +1,9 @@
 # src/agents/therapist_agent.py
 import hashlib
 import time
-import os
-import json
 import traceback
 from typing import Dict, Any
+from app.core.therapist_config import get_therapist_config
 from ..services.prompt_loader import PromptLoader
 from ..services.logger import logger
 
@@ -25,31 +24,12 @@ class TherapistAgent:
             logger.warning("找不到咨询师提示词配置")
 
     def _load_config(self, therapy_type: str) -> Dict[str, Any]:
-        """从配置文件加载特定流派的配置"""
-        try:
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if not os.path.exists(config_path):
-                logger.warning(f"未找到咨询师配置文件: {config_path}")
-                return self._create_default_config(therapy_type)
-
-            with open(config_path, 'r', encoding='utf-8') as f:
-                full_config = json.load(f)
-
-            for therapist_config in full_config.get("therapists", []):
-                if therapist_config.get("id") == therapy_type:
-                    return therapist_config
-
+        """从共享的咨询师配置中获取特定流派的配置"""
+        therapist_config = get_therapist_config().get(therapy_type)
+        if therapist_config is None:
             logger.warning(f"在配置文件中未找到流派 '{therapy_type}' 的配置，使用默认配置")
             return self._create_default_config(therapy_type)
-
-        except Exception as e:
-            logger.error(f"加载咨询师配置失败: {str(e)}")
-            traceback.print_exc()
-            return self._create_default_config(therapy_type)
+        return therapist_config
 
     def _create_default_config(self, therapy_type: str) -> Dict[str, Any]:
         """创建默认配置"""
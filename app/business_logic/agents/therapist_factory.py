@@ -1,55 +1,29 @@
 # app/business_logic/agents/therapist_factory.py
-import os
-import json
+import asyncio
 from typing import List, Dict, Any, Optional
 from app.business_logic.agents.therapist_agent import TherapistAgent
+from app.core.therapist_config import TherapistConfig, get_therapist_config
 from ..services.logger import logger
 
 class TherapistFactory:
     """心理咨询师工厂类"""
 
-    def __init__(self, memory_manager, llm_service):
-        """初始化心理咨询师工厂"""
+    def __init__(self, memory_manager, llm_service, therapist_config: Optional[TherapistConfig] = None):
+        """初始化心理咨询师工厂（未提供配置时使用记忆管理器的配置或默认配置文件）"""
         self.memory_manager = memory_manager
         self.llm_service = llm_service
-        self.therapists_config = {}
+        if therapist_config is None and memory_manager is not None:
+            therapist_config = getattr(memory_manager, "therapist_config", None)
+        self.therapist_config = therapist_config or get_therapist_config()
 
     def load_config(self, config_path: Optional[str] = None) -> Dict[str, Any]:
-        """加载心理咨询师配置"""
-        if config_path is None:
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
-                "data",
-                "therapists_config.json"
-            )
-
-        try:
-            if not os.path.exists(config_path):
-                logger.warning(f"未找到心理咨询师配置文件: {config_path}")
-                return {}
-
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-
-            self.therapists_config = config_data
-            logger.info(f"成功加载了 {len(config_data.get('therapists', []))} 个咨询师配置")
-            return config_data
-
-        except Exception as e:
-            logger.error(f"加载心理咨询师配置失败: {str(e)}")
-            return {}
+        """加载心理咨询师配置（同一路径在进程内只读取一次）"""
+        self.therapist_config = get_therapist_config(config_path)
+        return {"therapists": self.therapist_config.therapist_configs()}
 
     def create_therapist(self, therapy_type: str) -> Optional[TherapistAgent]:
         """创建特定流派的心理咨询师"""
-        if not self.therapists_config:
-            self.load_config()
-
-        therapy_config = None
-        for therapist in self.therapists_config.get("therapists", []):
-            if therapist.get("id") == therapy_type:
-                therapy_config = therapist
-                break
-
+        therapy_config = self.therapist_config.get(therapy_type)
         if therapy_config is None:
             logger.warning(f"未找到流派 '{therapy_type}' 的配置")
             return None
@@ -69,11 +43,8 @@ class TherapistFactory:
 
     def create_all_therapists(self) -> List[TherapistAgent]:
         """根据配置创建所有流派的心理咨询师"""
-        if not self.therapists_config:
-            self.load_config()
-
         therapists = []
-        for therapist_config in self.therapists_config.get("therapists", []):
+        for therapist_config in self.therapist_config.therapist_configs():
             therapy_type = therapist_config.get("id")
 
             if not therapy_type:
@@ -96,44 +67,44 @@ class TherapistFactory:
         return therapists
 
     async def ensure_therapist_memories(self) -> None:
-        """确保所有配置的咨询师在记忆系统中有对应的记忆集合"""
+        """确保所有配置的咨询师在记忆系统中有对应的记忆集合（各流派并发检查）"""
         if not self.memory_manager:
             logger.warning("记忆管理器未提供，无法初始化咨询师记忆")
             return
 
-        if not self.therapists_config:
-            self.load_config()
-
-        for therapist_config in self.therapists_config.get("therapists", []):
-            therapy_type = therapist_config.get("id")
-
-            if not therapy_type:
-                continue
-
-            try:
-                skills = await self.memory_manager.get_skill_memory("therapist", therapy_type=therapy_type)
-
-                if not skills:
-                    logger.info(f"咨询师 {therapy_type} 的技能记忆为空，将创建初始技能记忆")
-                    core_techniques = therapist_config.get("core_techniques", [])
+        await asyncio.gather(*(
+            self._ensure_therapist_memory(therapist_config)
+            for therapist_config in self.therapist_config.therapist_configs()
+            if therapist_config.get("id")
+        ))
 
-                    for i, technique in enumerate(core_techniques):
-                        skill_content = f"作为{therapist_config.get('name', therapy_type)}咨询师，掌握{technique}技术，能够有效帮助来访者解决心理问题。"
-
-                        skill_memory = {
-                            "id": f"{therapy_type}_base_skill_{i}",
-                            "content": skill_content,
-                            "timestamp": 0,  # 使用0表示系统初始化的基础技能
-                            "therapy_type": therapy_type
-                        }
-
-                        await self.memory_manager.update_skill_memory(
-                            "therapist",
-                            skill_memory,
-                            therapy_type=therapy_type
-                        )
+    async def _ensure_therapist_memory(self, therapist_config: Dict[str, Any]) -> None:
+        """技能记忆为空时为咨询师写入基于核心技术的初始技能记忆"""
+        therapy_type = therapist_config["id"]
+        try:
+            if await self.memory_manager.has_skill_memory("therapist", therapy_type=therapy_type):
+                return
+
+            logger.info(f"咨询师 {therapy_type} 的技能记忆为空，将创建初始技能记忆")
+            core_techniques = therapist_config.get("core_techniques", [])
+
+            for i, technique in enumerate(core_techniques):
+                skill_content = f"作为{therapist_config.get('name', therapy_type)}咨询师，掌握{technique}技术，能够有效帮助来访者解决心理问题。"
+
+                skill_memory = {
+                    "id": f"{therapy_type}_base_skill_{i}",
+                    "content": skill_content,
+                    "timestamp": 0,  # 使用0表示系统初始化的基础技能
+                    "therapy_type": therapy_type
+                }
+
+                await self.memory_manager.update_skill_memory(
+                    "therapist",
+                    skill_memory,
+                    therapy_type=therapy_type
+                )
 
-                    logger.info(f"为咨询师 {therapy_type} 创建了 {len(core_techniques)} 条初始技能记忆")
+            logger.info(f"为咨询师 {therapy_type} 创建了 {len(core_techniques)} 条初始技能记忆")
 
-            except Exception as e:
-                logger.error(f"初始化咨询师 {therapy_type} 的记忆时出错: {str(e)}")
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"初始化咨询师 {therapy_type} 的记忆时出错: {str(e)}")
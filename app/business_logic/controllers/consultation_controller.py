@@ -1,6 +1,7 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from abc import ABC
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from app.business_logic.agents import ProfilerAgent, SupervisorAgent, TherapistAgent
 from app.data_access.memory.memory_manager import MemoryManager
@@ -18,6 +19,7 @@ class ConsultationController(ABC):
         therapist_agents: List[TherapistAgent],
         supervisor_agent: SupervisorAgent,
         memory_manager: MemoryManager,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
     ):
         self.profiler_agent = profiler_agent
         self.therapist_agents = therapist_agents
@@ -37,7 +39,8 @@ class ConsultationController(ABC):
         self.cbt_config = self._load_cbt_config()
         logger.info(f"咨询控制器初始化，使用CBT咨询师: {self.selected_therapist.therapy_type}")
 
-        self.checkpointer = MemorySaver()
+        # 未传入持久化检查点存储时退回内存存储（进程重启后会话无法继续）
+        self.checkpointer = checkpointer if checkpointer is not None else MemorySaver()
         self.graph = StateGraph(state_schema=dict)
         self._register_nodes()
         self._define_edges()
@@ -188,6 +191,11 @@ class ConsultationController(ABC):
         config = {"configurable": {"thread_id": session_id}}
         return await self.compiled_graph.ainvoke({}, config)
 
+    async def save_session_state(self, session_id: str, session_state: dict):
+        """把图外修改过的会话状态写入最新检查点（保持中断位置不变）"""
+        config = {"configurable": {"thread_id": session_id}}
+        await self.compiled_graph.aupdate_state(config, session_state)
+
     async def process_user_survey(self, session_id: int, session_state: dict, user_message: str) -> Dict[str, Any]:
         if session_state["current_phase"] == "survey":
             session_state['initial_scales_result']=user_message
@@ -195,14 +203,14 @@ class ConsultationController(ABC):
             session_state["scales_result_after_consultation"]=user_message
         session_state.pop("wait_for_user_input", None)
         config = {"configurable": {"thread_id": session_id}}
-        self.compiled_graph.update_state(config, session_state)
+        await self.compiled_graph.aupdate_state(config, session_state)
         return await self.compiled_graph.ainvoke(None, config)
     
     async def process_user_message(self, session_id: int, session_state: dict, user_message: str) -> Dict[str, Any]:
         session_state['dialogue_history'].append([user_message, "user"])
         session_state.pop("wait_for_user_input", None)
         config = {"configurable": {"thread_id": session_id}}
-        self.compiled_graph.update_state(config, session_state)
+        await self.compiled_graph.aupdate_state(config, session_state)
         return await self.compiled_graph.ainvoke(None, config)
 
     # --------------------- 节点实现 ---------------------
@@ -5,8 +5,6 @@ import json
 from typing import Dict, Any, Optional
 from abc import ABC, abstractmethod
 
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
 
 from app.core.config import settings
 
@@ -23,6 +21,9 @@ class LLMService(ABC):
 class OpenAIService(LLMService):
     """OpenAI兼容接口的LLM服务实现（可用于OpenAI, 硅基流动等）"""
     def __init__(self, api_key: str, model_name: str, default_temperature: float, api_base: Optional[str]):
+        # langchain_openai导入较慢，在创建服务时才导入
+        from langchain_openai import ChatOpenAI
+
         self.model = ChatOpenAI(
             model_name=model_name,
             temperature=default_temperature,
@@ -34,6 +35,8 @@ class OpenAIService(LLMService):
         print(f"OpenAIService initialized for model '{model_name}' at base_url '{api_base}'.")
 
     async def invoke(self, prompt: str, temperature: Optional[float] = None) -> str:
+        from langchain_core.messages import HumanMessage
+
         try:
             current_temp = self.model.temperature
             if temperature is not None:
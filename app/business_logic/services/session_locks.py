@@ -0,0 +1,80 @@
+# app/business_logic/services/session_locks.py
+"""
+会话级并发控制
+同一会话的"读取状态 - 处理 - 写回"串行执行，不同会话互不阻塞；
+同一会话中内容相同、仍在处理中的重复请求（例如前端重复提交）合并为一次处理，共享同一个结果。
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SessionLockManager:
+    """按会话ID分配的异步锁，以及进行中请求的合并"""
+
+    def __init__(self):
+        # 会话ID -> 锁；等待数归零后删除，避免锁随历史会话无限增长
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+        # (会话ID, 请求键) -> 进行中的处理结果
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+
+    @asynccontextmanager
+    async def lock(self, session_id: str):
+        """持有会话锁期间，同一会话的其他请求排队等待"""
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[session_id] -= 1
+            if self._waiters[session_id] == 0:
+                del self._waiters[session_id]
+                del self._locks[session_id]
+
+    async def run(self, session_id: str, request_key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        在会话锁内执行一次请求处理，合并进行中的重复请求
+
+        Args:
+            session_id: 会话ID
+            request_key: 标识请求来源和内容的键，例如 ("message", 用户ID, 用户输入)；
+                调用方应先完成权限检查，只有键相同的请求才会共享结果
+            func: 读取状态、处理并写回的协程函数
+
+        Returns:
+            Any: func 的返回值；重复请求直接返回首个请求的结果（或抛出同样的异常），
+                首个请求被取消时由等待中的重复请求之一重新执行 func
+        """
+        key = (session_id, request_key)
+        while True:
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            try:
+                # 重复请求被取消时不应影响首个请求
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # 首个请求被取消（例如客户端断开）时，仍在等待的重复请求重新发起处理，
+                # 只有自身被取消时才向上抛出
+                if not in_flight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            async with self.lock(session_id):
+                result = await func()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # 没有重复请求等待时，避免"异常从未被获取"的警告
+            future.exception()
+            raise
+        finally:
+            # 被取消（或其他非Exception中断）时取消共享结果，等待者据此重试
+            if not future.done():
+                future.cancel()
+            del self._in_flight[key]
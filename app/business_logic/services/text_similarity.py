@@ -0,0 +1,117 @@
+# app/business_logic/services/text_similarity.py
+"""
+特征文本相似度
+把按空白分词的特征文本哈希成稀疏词频向量（哈希特征），一次向量化运算计算
+一个查询与多个候选文本的余弦相似度，取代逐对构建词汇表并逐词计数的实现。
+"""
+import zlib
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+# 哈希特征空间大小（2的幂），特征文本的词数远小于该值，碰撞可以忽略
+N_FEATURES = 1 << 20
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    """词的哈希特征下标（特征文本的词表很小，缓存后基本不再重复计算crc32）"""
+    return zlib.crc32(token.encode("utf-8")) & (N_FEATURES - 1)
+
+
+def hash_features(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把文本转换为L2归一化的稀疏词频向量
+
+    Args:
+        text: 按空白分隔的特征文本
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (升序且不重复的特征下标, 对应的权重)
+    """
+    tokens = text.split() if text else []
+    if not tokens:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    hashed = np.fromiter(map(_token_hash, tokens), dtype=np.int64, count=len(tokens))
+    indices, counts = np.unique(hashed, return_counts=True)
+    weights = counts.astype(np.float32)
+    weights /= np.linalg.norm(weights)
+    return indices, weights
+
+
+class HashedTextMatrix:
+    """多个候选文本的稀疏哈希特征矩阵（CSR布局），可复用于多次查询"""
+
+    def __init__(self, texts: List[str]):
+        """
+        一次性哈希全部候选文本的词，按 (行, 特征下标) 去重计数后构建CSR布局的数组
+
+        Args:
+            texts: 候选特征文本列表
+        """
+        token_lists = [text.split() if text else [] for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        hashed = np.fromiter((_token_hash(token) for tokens in token_lists for token in tokens),
+                             dtype=np.int64, count=int(lengths.sum()))
+        row_ids = np.repeat(np.arange(len(token_lists), dtype=np.int64), lengths)
+
+        # 组合键按行优先排序，去重后即为CSR的列下标和词频
+        keys, counts = np.unique(row_ids * N_FEATURES + hashed, return_counts=True)
+        rows = keys // N_FEATURES
+        self.indices = keys % N_FEATURES
+        self.data = counts.astype(np.float32)
+
+        self.indptr = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(token_lists)), out=self.indptr[1:])
+
+        # 每行L2归一化
+        norms = np.sqrt(np.bincount(rows, weights=self.data * self.data, minlength=len(token_lists)))
+        if len(self.data):
+            self.data /= norms[rows].astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def similarities(self, query_text: str) -> np.ndarray:
+        """
+        计算查询文本与所有候选文本的余弦相似度
+
+        Args:
+            query_text: 查询特征文本
+
+        Returns:
+            np.ndarray: 每个候选文本的相似度（0-1之间），空文本的相似度为0
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        query_indices, query_weights = hash_features(query_text)
+        if not len(query_indices) or not len(self.indices):
+            return scores
+
+        # 在查询的有序下标中查找每个候选非零项，命中的项乘以查询权重
+        positions = np.searchsorted(query_indices, self.indices)
+        positions[positions == len(query_indices)] = 0
+        matched = query_indices[positions] == self.indices
+        products = np.where(matched, self.data * query_weights[positions], 0.0)
+
+        # 按行求和（跳过没有非零项的行）
+        non_empty = self.indptr[:-1] < self.indptr[1:]
+        if non_empty.any():
+            scores[non_empty] = np.add.reduceat(products, self.indptr[:-1][non_empty])
+        return np.clip(scores, 0.0, 1.0)
+
+
+def cosine_similarities(query_text: str, candidate_texts: List[str]) -> np.ndarray:
+    """
+    计算一个查询文本与多个候选文本的词袋余弦相似度
+
+    Args:
+        query_text: 查询特征文本
+        candidate_texts: 候选特征文本列表
+
+    Returns:
+        np.ndarray: 与candidate_texts一一对应的相似度
+    """
+    return HashedTextMatrix(candidate_texts).similarities(query_text)
+
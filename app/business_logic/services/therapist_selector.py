@@ -2,6 +2,7 @@
 from typing import Dict, Any, List, Optional, Tuple
 import json
 from .vector_utils import VectorUtils
+from .text_similarity import cosine_similarities
 from app.data_access.memory.memory_manager import MemoryManager
 from .logger import logger
 import random
@@ -54,10 +55,16 @@ class TherapistSelector:
             # print("-------2---------------")
             # print(vector_index)
 
+            # 一次计算当前学生与所有相似案例的特征文本相似度
+            similarities = cosine_similarities(
+                current_feature_text,
+                [vector.get("feature_text", "") for vector in similar_vectors]
+            )
+
             # 4. 计算每个案例的综合得分
             case_scores = []
 
-            for vector in similar_vectors:
+            for vector, similarity in zip(similar_vectors, similarities.tolist()):
                 vector_id = vector.get("id")
                 # print("-------3----------")
                 # print(vector_id)
@@ -96,11 +103,6 @@ class TherapistSelector:
                 # if improvement_score <= 0:
                 #     continue
 
-                # 计算相似度
-                similarity = TherapistSelector._calculate_similarity(
-                    current_feature_text,
-                    vector.get("feature_text", "")
-                )
                 # print("-------8----------")
                 # print(similarity)
 
@@ -145,47 +147,3 @@ class TherapistSelector:
             logger.error(f"选择最佳治疗师时出错: {str(e)}")
             # 出错时返回默认治疗师
             return available_therapists[0], 0.0
-
-    @staticmethod
-    def _calculate_similarity(text1: str, text2: str) -> float:
-        """
-        计算两个特征文本的相似度
-
-        使用词袋模型和余弦相似度计算两个文本的相似度
-
-        Args:
-            text1: 第一个特征文本
-            text2: 第二个特征文本
-
-        Returns:
-            float: 相似度分数 (0-1之间)
-        """
-        if not text1 or not text2:
-            return 0.0
-
-        # 分词
-        words1 = text1.split()
-        words2 = text2.split()
-
-        # 构建词汇表
-        vocabulary = sorted(set(words1).union(set(words2)))
-
-        # 构建词袋向量
-        vector1 = [words1.count(word) for word in vocabulary]
-        vector2 = [words2.count(word) for word in vocabulary]
-
-        # 计算向量的点积
-        dot_product = sum(a * b for a, b in zip(vector1, vector2))
-
-        # 计算向量的范数
-        magnitude1 = sum(a * a for a in vector1) ** 0.5
-        magnitude2 = sum(b * b for b in vector2) ** 0.5
-
-        # 避免除以零
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
-
-        # 计算余弦相似度
-        similarity = dot_product / (magnitude1 * magnitude2)
-
-        return similarity
\ No newline at end of file
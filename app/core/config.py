@@ -23,6 +23,14 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # --- 认证性能配置 ---
+    PASSWORD_HASH_WORKERS: int = 2       # 执行bcrypt哈希/校验的线程数，限制登录高峰占用的CPU
+    TOKEN_CACHE_TTL_SECONDS: int = 60    # 已验证令牌的缓存时间，0为不缓存
+    TOKEN_CACHE_SIZE: int = 1024         # 已验证令牌缓存的最大条目数
+
+    # --- 会话检查点配置 ---
+    CHECKPOINT_KEEP_PER_THREAD: int = 3  # 每个会话保留的最近检查点数量，结束的会话只保留最终检查点
     
     # Pydantic-Settings的配置类
     model_config = SettingsConfigDict(
@@ -1,7 +1,11 @@
 # app/core/security.py
 
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, Optional, Set, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -50,6 +54,34 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(processed_password)
 
 
+# bcrypt 每次哈希/校验要占用 100-300ms CPU，放到有界线程池中执行，
+# 避免阻塞事件循环上其他会话的请求；线程数限制了登录高峰时占用的CPU
+_password_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+            thread_name_prefix="bcrypt"
+        )
+    return _password_executor
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在密码线程池中验证密码，参数和返回值同 verify_password。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在密码线程池中哈希密码，参数和返回值同 get_password_hash。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), get_password_hash, password)
+
+
 
 # 2. --- JWT 令牌处理 ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -98,4 +130,73 @@ def decode_access_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         # 如果解码失败（例如，签名不匹配、令牌过期等），返回None
-        return None
\ No newline at end of file
+        return None
+
+
+# 3. --- 已验证令牌缓存 ---
+class VerifiedTokenCache:
+    """
+    令牌 -> 已验证用户的LRU缓存。
+    条目在TTL到期或令牌本身过期时失效，用户资料更新时按用户ID清除，
+    命中时无需再解码JWT和查询用户。
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # 令牌 -> (失效时间, 用户)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # 用户ID -> 该用户的令牌
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[Any]:
+        """返回缓存的用户，未命中或已失效时返回None"""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(token)
+            return None
+        self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: Any, token_exp: Optional[float] = None):
+        """
+        缓存已验证的用户。
+
+        Args:
+            token: JWT字符串。
+            user: 验证得到的用户对象（需要有 id 属性）。
+            token_exp: 令牌的过期时间（Unix时间戳），缓存不会超过令牌本身的有效期。
+        """
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+            if ttl <= 0:
+                return
+
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (time.monotonic() + ttl, user)
+        self._tokens_by_user.setdefault(user.id, set()).add(token)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """清除某个用户的所有缓存令牌（用户资料更新后调用）"""
+        for token in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(token, None)
+
+    def _remove(self, token: str):
+        _, user = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.id]
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_TTL_SECONDS, settings.TOKEN_CACHE_SIZE)
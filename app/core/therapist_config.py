@@ -0,0 +1,89 @@
+# app/core/therapist_config.py
+"""
+咨询师配置
+data/therapists_config.json 在进程内只读取一次，解析为不可变的配置对象，
+在应用启动时注入记忆系统和咨询师工厂，不再由各组件分别读取配置文件
+"""
+import os
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple, Mapping
+
+from app.business_logic.services.logger import logger
+
+
+# 默认配置文件路径（项目根目录下的 data/therapists_config.json）
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data",
+    "therapists_config.json"
+)
+
+# 配置文件不存在或读取失败时使用的流派
+DEFAULT_THERAPY_TYPES = ("cbt", "psychodynamic")
+
+
+def _freeze(value: Any) -> Any:
+    """递归地把dict转换为只读映射、list转换为元组"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """把只读配置还原为可修改的普通dict和list"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class TherapistConfig:
+    """
+    不可变的咨询师配置。
+    therapists 为各流派的只读配置，therapy_types 为流派ID（配置文件不可用时为默认流派）。
+    """
+    path: str
+    therapists: Tuple[Mapping[str, Any], ...] = ()
+    therapy_types: Tuple[str, ...] = DEFAULT_THERAPY_TYPES
+
+    def get(self, therapy_type: str) -> Optional[Dict[str, Any]]:
+        """返回指定流派配置的可修改副本，未配置该流派时返回None"""
+        for therapist in self.therapists:
+            if therapist.get("id") == therapy_type:
+                return _thaw(therapist)
+        return None
+
+    def therapist_configs(self) -> List[Dict[str, Any]]:
+        """返回所有咨询师配置的可修改副本"""
+        return [_thaw(therapist) for therapist in self.therapists]
+
+
+@lru_cache
+def get_therapist_config(config_path: Optional[str] = None) -> TherapistConfig:
+    """
+    获取咨询师配置实例的函数。
+    使用lru_cache装饰器确保同一配置文件只被读取和解析一次。
+    """
+    path = config_path or DEFAULT_CONFIG_PATH
+    if not os.path.exists(path):
+        logger.warning(f"未找到咨询师配置文件: {path}，将使用默认流派")
+        return TherapistConfig(path=path)
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
+    except Exception as e:
+        logger.warning(f"加载咨询师配置失败: {str(e)}，将使用默认流派")
+        return TherapistConfig(path=path)
+
+    therapists = tuple(_freeze(therapist) for therapist in config_data.get("therapists", []))
+    therapy_types = tuple(therapist.get("id") for therapist in therapists if therapist.get("id"))
+    logger.info(f"成功加载了 {len(therapists)} 个咨询师配置: {', '.join(therapy_types)}")
+    return TherapistConfig(path=path, therapists=therapists, therapy_types=therapy_types)
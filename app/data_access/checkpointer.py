@@ -0,0 +1,323 @@
+# app/data_access/checkpointer.py
+"""
+持久化且有界的 LangGraph 检查点存储
+检查点保存在 SQLite（WAL）中，进程重启后会话仍可从中断处继续；
+每个线程（会话）只保留最近的若干个检查点，已结束的会话只保留最终检查点。
+会话状态以这里的最新检查点为准，SessionRepository 从这里读取。
+"""
+import asyncio
+import sqlite3
+import threading
+from functools import wraps
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+# 状态为 dict 的 StateGraph 把整个状态保存在这个通道中
+ROOT_CHANNEL = "__root__"
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        checkpoint_type TEXT NOT NULL,
+        checkpoint BLOB NOT NULL,
+        metadata_type TEXT NOT NULL,
+        metadata BLOB NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        value_type TEXT NOT NULL,
+        value BLOB NOT NULL,
+        task_path TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )""",
+]
+
+
+def _locked(method):
+    """在连接锁内执行（sqlite连接在线程池和事件循环之间共享）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    基于 SQLite 的检查点存储。
+    检查点（含通道值）整体序列化为一行，写入新检查点后删除该线程中较早的检查点及其待写入项，
+    内存中不保留任何检查点。
+    """
+
+    def __init__(self, path: str, keep_per_thread: int = 3):
+        """
+        Args:
+            path: SQLite 数据库文件路径。
+            keep_per_thread: 每个线程保留的最近检查点数量（至少为1）。
+        """
+        super().__init__()
+        self.path = path
+        self.keep_per_thread = max(1, keep_per_thread)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    # --------------------- 读取 ---------------------
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, value_type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((checkpoint_type, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    @_locked
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata"
+        if checkpoint_id := get_checkpoint_id(config):
+            row = self._conn.execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchone()
+        else:
+            # 检查点ID单调递增，最大的即为最新
+            row = self._conn.execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns)
+            ).fetchone()
+        return self._to_tuple(thread_id, checkpoint_ns, row) if row else None
+
+    @_locked
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, "
+                 "checkpoint, metadata_type, metadata FROM checkpoints")
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        results = []
+        for thread_id, checkpoint_ns, *row in self._conn.execute(query, params).fetchall():
+            checkpoint_tuple = self._to_tuple(thread_id, checkpoint_ns, tuple(row))
+            if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            results.append(checkpoint_tuple)
+            if limit is not None and len(results) >= limit:
+                break
+        return iter(results)
+
+    # --------------------- 写入 ---------------------
+
+    @_locked
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "checkpoint_type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 checkpoint_type, checkpoint_blob, metadata_type, metadata_blob)
+            )
+            self._prune(thread_id, checkpoint_ns, self.keep_per_thread)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    @_locked
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, value_type, value_blob, task_path))
+        # 与 InMemorySaver 一致：特殊写入（错误、中断等）覆盖，普通写入只保留第一次
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                "value_type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] >= 0]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                "value_type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] < 0]
+            )
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, keep: int):
+        """删除线程中最近 keep 个之外的检查点及其待写入项（需在锁和事务内调用）"""
+        stale = "checkpoint_id NOT IN (SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? " \
+                "ORDER BY checkpoint_id DESC LIMIT ?)"
+        params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep)
+        self._conn.execute(f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND {stale}", params)
+        self._conn.execute(f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND {stale}", params)
+
+    @_locked
+    def evict_thread(self, thread_id: str) -> None:
+        """会话结束后只保留最终检查点，删除其余检查点和所有待写入项"""
+        with self._conn:
+            for (checkpoint_ns,) in self._conn.execute(
+                "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchall():
+                self._prune(thread_id, checkpoint_ns, 1)
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    @_locked
+    def delete_thread(self, thread_id: str) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+
+    def get_state_values(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取线程最新检查点中的会话状态。
+
+        Returns:
+            最新的状态字典；线程没有检查点时返回None。
+        """
+        checkpoint_tuple = self.get_tuple({"configurable": {"thread_id": thread_id}})
+        if checkpoint_tuple is None:
+            return None
+        return checkpoint_tuple.checkpoint["channel_values"].get(ROOT_CHANNEL)
+
+    # --------------------- 异步接口（在线程中执行） ---------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(self.list, config, filter=filter, before=before, limit=limit)
+        for item in results:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aevict_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.evict_thread, thread_id)
+
+    async def aget_state_values(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get_state_values, thread_id)
+
+    # 版本号格式与 InMemorySaver 相同
+    get_next_version = InMemorySaver.get_next_version
@@ -1,7 +1,5 @@
 # src/memory/enhanced_memory_manager.py
 import traceback
-import os
-import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import time
@@ -11,6 +9,7 @@ from app.data_access.memory.json_store import JSONMemoryStore
 from app.data_access.memory.long_term_store import LongTermMemoryStore
 from app.data_access.memory.initializer import MemoryInitializer
 from app.models.memory_schemas import SkillMemory, MedicalRecord
+from app.core.therapist_config import TherapistConfig, get_therapist_config
 from app.business_logic.services.logger import logger
 from app.core.exceptions import StateError
 
@@ -42,59 +41,32 @@ def _sanitize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
 class EnhancedMemoryManager:
     """增强型记忆管理器 - 同时管理JSON文件和向量数据库"""
 
-    def __init__(self):
-        """初始化增强型记忆管理器"""
+    def __init__(self, therapist_config: Optional[TherapistConfig] = None):
+        """
+        初始化增强型记忆管理器
+
+        Args:
+            therapist_config: 咨询师配置，为None时加载默认配置文件；同一个配置对象注入到各存储
+        """
+        self.therapist_config = therapist_config or get_therapist_config()
+
         # 创建JSON存储和向量存储
-        self.json_store = JSONMemoryStore()
-        self.vector_store = LongTermMemoryStore()
+        self.json_store = JSONMemoryStore(therapist_config=self.therapist_config)
+        self.vector_store = LongTermMemoryStore(therapist_config=self.therapist_config)
 
         # 创建记忆初始化器
         self.initializer = MemoryInitializer(
             json_store=self.json_store,
-            vector_store=self.vector_store
+            vector_store=self.vector_store,
+            therapist_config=self.therapist_config
         )
 
-        # 获取配置的治疗师流派
-        self.therapy_types = self._get_therapist_types()
+        # 配置的治疗师流派
+        self.therapy_types = list(self.therapist_config.therapy_types)
 
         # 更新集合映射，包含所有治疗师流派
         self._collection_mapping = self._create_collection_mapping()
 
-    def _get_therapist_types(self) -> List[str]:
-        """
-        从配置文件获取所有的治疗师流派类型
-
-        Returns:
-            List[str]: 治疗师流派类型列表
-        """
-        # 默认流派
-        therapy_types = ["cbt", "psychodynamic"]
-
-        try:
-            # 尝试加载治疗师配置文件
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 提取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
-
-                logger.info(f"记忆管理器: 从配置文件加载了 {len(therapy_types)} 个治疗流派")
-
-        except Exception as e:
-            logger.warning(f"记忆管理器: 加载治疗师配置失败: {str(e)}，将使用默认流派")
-
-        return therapy_types
-
     def _create_collection_mapping(self) -> Dict[str, str]:
         """
         创建集合映射，动态包含所有治疗师流派
@@ -126,6 +98,11 @@ class EnhancedMemoryManager:
             raise StateError("记忆初始化失败") from e
 
     # === 技能记忆管理 ===
+    async def has_skill_memory(self, agent_type: str, therapy_type: Optional[str] = None) -> bool:
+        """技能集合中是否已有记忆（只统计数量，不读取文档）"""
+        collection_name = _get_skill_collection_name(agent_type, therapy_type)
+        return await self.vector_store.count_documents(collection_name) > 0
+
     async def get_skill_memory(self, agent_type: str, therapy_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """获取技能记忆 (直接从向量数据库读取)"""
         try:
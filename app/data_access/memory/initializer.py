@@ -6,12 +6,14 @@
 import os
 import json
 import shutil
+import asyncio
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional
 
 from app.data_access.memory.json_store import JSONMemoryStore
 from app.data_access.memory.long_term_store import LongTermMemoryStore
+from app.core.therapist_config import TherapistConfig, get_therapist_config
 from app.business_logic.services.logger import logger
 from app.business_logic.services.vector_utils import VectorUtils
 
@@ -22,64 +24,33 @@ class MemoryInitializer:
     """
 
     def __init__(self, json_store: Optional[JSONMemoryStore] = None,
-                 vector_store: Optional[LongTermMemoryStore] = None):
+                 vector_store: Optional[LongTermMemoryStore] = None,
+                 therapist_config: Optional[TherapistConfig] = None):
         """
         初始化记忆系统初始化器
 
         Args:
             json_store: 可选的JSON存储对象，如果为None则创建新的
             vector_store: 可选的向量存储对象，如果为None则创建新的
+            therapist_config: 咨询师配置，为None时加载默认配置文件
         """
-        self.json_store = json_store if json_store else JSONMemoryStore()
-        self.vector_store = vector_store if vector_store else LongTermMemoryStore()
+        therapist_config = therapist_config or get_therapist_config()
+        self.json_store = json_store if json_store else JSONMemoryStore(therapist_config=therapist_config)
+        self.vector_store = vector_store if vector_store else LongTermMemoryStore(therapist_config=therapist_config)
 
         # 获取向量数据库目录路径
         self.vector_db_dir = Path(self.vector_store.persist_directory)
 
         logger.info(f"记忆初始化器创建完成，JSON路径: {self.json_store.base_dir}, 向量库路径: {self.vector_db_dir}")
 
-        # 获取可用的治疗流派
-        self.therapy_types = self._get_available_therapy_types()
-
-    def _get_available_therapy_types(self) -> List[str]:
-        """
-        从配置文件获取所有可用的治疗流派
-
-        Returns:
-            List[str]: 可用的治疗流派列表
-        """
-        therapy_types = ["cbt", "psychodynamic"]  # 默认支持的流派
-
-        try:
-            # 尝试从配置文件加载流派
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 获取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
-
-                logger.info(f"从配置文件加载了 {len(therapy_types)} 个治疗流派")
-
-        except Exception as e:
-            logger.warning(f"加载治疗流派配置失败: {str(e)}，将使用默认流派")
-
-        return therapy_types
+        # 可用的治疗流派
+        self.therapy_types = list(therapist_config.therapy_types)
 
     async def initialize(self):
         """
         初始化记忆系统
 
-        检查JSON和向量数据库状态，执行必要的同步
+        检查JSON和向量数据库状态，执行必要的同步，向量数据库的集合在首次使用时才打开
         """
         # 检查向量数据库目录是否存在
         vector_db_exists = self.vector_db_dir.exists() and any(os.listdir(self.vector_db_dir))
@@ -90,15 +61,9 @@ class MemoryInitializer:
         else:
             logger.info("向量数据库已存在，检查是否需要更新")
 
-            # 获取所有集合
-            await self.vector_store.init_collections()
-
-            # 执行增量同步确保两种存储保持一致
+            # 执行增量同步确保两种存储保持一致（集合在同步时按需打开）
             await self._sync_json_and_vector_db()
 
-        # 确保所有必要的集合都已创建
-        await self._ensure_all_collections()
-
     async def _sync_json_and_vector_db(self):
         """
         同步JSON文件和向量数据库，确保两者数据一致
@@ -116,9 +81,8 @@ class MemoryInitializer:
         for therapy_type in self.therapy_types:
             collections.append(f"therapist_{therapy_type}_skills")
 
-        # 同步每个集合
-        for collection_name in collections:
-            await self._sync_collection(collection_name)
+        # 各集合互不影响，并发同步
+        await asyncio.gather(*(self._sync_collection(name) for name in collections))
 
     async def _sync_collection(self, collection_name: str):
         """
@@ -136,16 +100,8 @@ class MemoryInitializer:
                 logger.info(f"JSON文件 {collection_name} 为空，无需同步")
                 return
 
-            # 获取向量数据库中的所有文档
-            vector_docs = await self.vector_store.search_documents(
-                collection_name=collection_name,
-                query="",
-                filter_dict=None,
-                limit=10000  # 足够大的限制以获取所有文档
-            )
-
-            # 创建向量文档ID集合以便快速查找
-            vector_doc_ids = {doc.get("id") for doc in vector_docs if doc.get("id")}
+            # 只获取向量数据库中的文档ID，不读取和解析文档正文
+            vector_doc_ids = set(await self.vector_store.get_document_ids(collection_name))
 
             # 找出需要添加到向量数据库的文档
             for doc in json_docs:
@@ -211,29 +167,6 @@ class MemoryInitializer:
 
         return metadata
 
-    async def _ensure_all_collections(self):
-        """确保所有必要的集合都已创建"""
-        collections = [
-            "profiler_skills",
-            "medical_records",
-            "student_vectors"  # 添加学生特征向量集合
-        ]
-
-        # 添加所有治疗师流派的集合
-        for therapy_type in self.therapy_types:
-            collections.append(f"therapist_{therapy_type}_skills")
-
-        # 确保每个集合都存在于向量数据库中
-        for collection_name in collections:
-            if collection_name not in self.vector_store._collections:
-                try:
-                    self.vector_store._collections[collection_name] = self.vector_store.client.create_collection(
-                        name=collection_name
-                    )
-                    logger.info(f"创建了缺失的集合: {collection_name}")
-                except Exception as e:
-                    logger.error(f"创建集合 {collection_name} 失败: {str(e)}")
-
     async def rebuild_vector_db_from_json(self):
         """
         从JSON文件重建向量数据库
@@ -9,6 +9,8 @@ import time
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from app.core.therapist_config import TherapistConfig, get_therapist_config
+
 
 class JSONMemoryStore:
     """JSON记忆存储管理器
@@ -16,12 +18,13 @@ class JSONMemoryStore:
     负责读写JSON文件作为向量数据库的中间表示
     """
 
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(self, base_dir: Optional[str] = None, therapist_config: Optional[TherapistConfig] = None):
         """
         初始化JSON记忆存储
 
         Args:
             base_dir: JSON文件基础目录，默认为src/json-memories
+            therapist_config: 咨询师配置，为None时加载默认配置文件
         """
         # 如果没有指定基础目录，使用默认路径
         if base_dir is None:
@@ -33,8 +36,9 @@ class JSONMemoryStore:
         # 确保基础目录存在
         os.makedirs(self.base_dir, exist_ok=True)
 
-        # 获取可用的治疗流派
-        self.therapy_types = self._get_available_therapy_types()
+        # 可用的治疗流派
+        therapist_config = therapist_config or get_therapist_config()
+        self.therapy_types = list(therapist_config.therapy_types)
 
         # 各类记忆的文件路径
         self.memory_files = self._initialize_memory_files()
@@ -44,40 +48,6 @@ class JSONMemoryStore:
 
         print(f"JSON记忆存储初始化完成，基础目录: {self.base_dir}")
 
-    def _get_available_therapy_types(self) -> List[str]:
-        """
-        从配置文件获取所有可用的治疗流派
-
-        Returns:
-            List[str]: 可用的治疗流派列表
-        """
-        therapy_types = ["cbt", "psychodynamic"]  # 默认支持的流派
-
-        try:
-            # 尝试从配置文件加载流派
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 获取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
-
-                print(f"从配置文件加载了 {len(therapy_types)} 个治疗流派")
-
-        except Exception as e:
-            print(f"加载治疗流派配置失败: {str(e)}，将使用默认流派")
-
-        return therapy_types
-
     def _initialize_memory_files(self) -> Dict[str, Path]:
         """
         初始化记忆文件路径，包括动态加载的治疗流派
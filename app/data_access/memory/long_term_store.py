@@ -1,21 +1,36 @@
 # src/memory/long_term_store.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 import json
 import os
+import asyncio
 from datetime import datetime
-import chromadb
-from chromadb import Collection
+
+from app.core.therapist_config import TherapistConfig, get_therapist_config
+
+if TYPE_CHECKING:
+    # chromadb导入较慢，只在首次访问数据库时导入
+    from chromadb import Collection
+
+# 集合的距离度量，与归一化的bge向量匹配
+COLLECTION_SPACE = "cosine"
+
+# 文档只按ID和元数据读取，写入固定的占位向量，不需要embedding函数计算文本向量
+PLACEHOLDER_EMBEDDING = [1.0]
+
+# 迁移旧集合时每批复制的文档数量
+MIGRATION_BATCH_SIZE = 500
 
 
 class LongTermMemoryStore:
     """底层存储实现 - 直接负责与数据库的交互"""
 
-    def __init__(self, persist_directory=None):
+    def __init__(self, persist_directory=None, therapist_config: Optional[TherapistConfig] = None):
         """
         初始化长期记忆存储
 
         Args:
             persist_directory: 持久化目录，如果为None则使用内存模式
+            therapist_config: 咨询师配置，为None时加载默认配置文件
         """
         # 如果没有指定持久化目录，使用默认路径
         if persist_directory is None:
@@ -30,113 +45,149 @@ class LongTermMemoryStore:
 
         print(f"向量数据库持久化目录: {self.persist_directory}")
 
-        # 使用最新的ChromaDB客户端创建方式
-        self.client = chromadb.PersistentClient(path=self.persist_directory)
-        self._collections: Dict[str, Collection] = {}
+        # ChromaDB客户端在首次访问数据库时才创建
+        self._client = None
+        self._collections: Dict[str, "Collection"] = {}
 
-        # 获取可用的治疗流派
-        self.therapy_types = self._get_available_therapy_types()
+        # 可用的治疗流派
+        therapist_config = therapist_config or get_therapist_config()
+        self.therapy_types = list(therapist_config.therapy_types)
 
-    def _get_available_therapy_types(self) -> List[str]:
-        """
-        从配置文件获取所有可用的治疗流派
+        # 集合在首次使用时才打开，打开过程串行执行
+        self._open_lock = asyncio.Lock()
 
-        Returns:
-            List[str]: 可用的治疗流派列表
-        """
-        therapy_types = ["cbt", "psychodynamic"]  # 默认支持的流派
-
-        try:
-            # 尝试从配置文件加载流派
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
+    @property
+    def client(self):
+        """ChromaDB客户端，首次访问时导入chromadb并创建"""
+        if self._client is None:
+            import chromadb
 
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+            # 使用最新的ChromaDB客户端创建方式
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
 
-                # 获取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
+    def _collection_names(self) -> List[str]:
+        """所有默认集合的名称"""
+        names = ["profiler_skills"]
+        # 为每个治疗流派添加集合
+        for therapy_type in self.therapy_types:
+            names.append(f"therapist_{therapy_type}_skills")
+        names.extend(["medical_records", "student_vectors"])  # 新增向量集合
+        return names
 
-                print(f"向量数据库: 从配置文件加载了 {len(therapy_types)} 个治疗流派")
+    def _open_collection(self, name: str):
+        """获取或创建集合，旧版本创建的集合会先迁移"""
+        try:
+            collection = self.client.get_collection(name=name, embedding_function=None)
+        except Exception:
+            # 如果集合不存在，创建新集合
+            self._collections[name] = self.client.create_collection(name=name, **self._collection_options())
+            print(f"创建新集合: {name}")
+            return
+
+        if self._needs_migration(collection):
+            collection = self._migrate_collection(collection)
+        self._collections[name] = collection
+        print(f"成功加载现有集合: {name}")
+
+    @staticmethod
+    def _collection_options() -> Dict[str, Any]:
+        """创建集合的参数：不配置embedding函数（避免加载ONNX模型），使用余弦距离"""
+        return {"embedding_function": None, "configuration": {"hnsw": {"space": COLLECTION_SPACE}}}
+
+    @staticmethod
+    def _needs_migration(collection: "Collection") -> bool:
+        """集合是否由旧版本创建（配置了默认embedding函数或使用l2距离）"""
+        configuration = collection.configuration or {}
+        space = (configuration.get("hnsw") or {}).get("space")
+        return configuration.get("embedding_function") is not None or space != COLLECTION_SPACE
+
+    def _migrate_collection(self, collection: "Collection") -> "Collection":
+        """
+        把旧集合迁移为不带embedding函数的余弦距离集合。
+        先复制到临时集合，再删除旧集合并重命名临时集合，复制出错时旧集合保持不变。
+        """
+        name = collection.name
+        temp_name = f"{name}__migrating"
+        try:
+            self.client.delete_collection(name=temp_name)
+        except Exception:
+            pass
+        migrated = self.client.create_collection(name=temp_name, **self._collection_options())
+
+        offset = 0
+        while True:
+            page = collection.get(limit=MIGRATION_BATCH_SIZE, offset=offset, include=["documents", "metadatas"])
+            if page["ids"]:
+                migrated.add(ids=page["ids"], documents=page["documents"], metadatas=page["metadatas"],
+                             embeddings=[PLACEHOLDER_EMBEDDING] * len(page["ids"]))
+            if len(page["ids"]) < MIGRATION_BATCH_SIZE:
+                break
+            offset += MIGRATION_BATCH_SIZE
+
+        self.client.delete_collection(name=name)
+        migrated.modify(name=name)
+        print(f"已将集合 {name} 迁移为余弦距离且不使用embedding函数")
+        return migrated
 
-        except Exception as e:
-            print(f"向量数据库: 加载治疗流派配置失败: {str(e)}，将使用默认流派")
+    async def init_collections(self):
+        """打开所有默认集合（通常不需要调用，集合会在首次使用时打开）"""
+        for name in self._collection_names():
+            if name not in self._collections:
+                self._open_collection(name)
 
-        return therapy_types
+    async def _get_collection(self, collection_name: str, create: bool = False) -> Optional["Collection"]:
+        """
+        获取集合，首次使用时只打开这一个集合
 
-    async def init_collections(self):
-        """初始化所有集合"""
-        # 构建集合配置
-        skills_collections = ["profiler_skills"]
+        Args:
+            collection_name: 集合名称
+            create: 不是默认集合但为治疗师技能集合时是否创建
 
-        # 为每个治疗流派添加集合
-        for therapy_type in self.therapy_types:
-            skills_collections.append(f"therapist_{therapy_type}_skills")
-
-        collections_config = {
-            "skills": skills_collections,
-            "records": ["medical_records"],
-            "vectors": ["student_vectors"]  # 新增向量集合
-        }
-
-        for category, names in collections_config.items():
-            for name in names:
-                # 获取或创建集合
-                try:
-                    self._collections[name] = self.client.get_collection(name=name)
-                    print(f"成功加载现有集合: {name}")
-                except Exception:
-                    # 如果集合不存在，创建新集合
-                    self._collections[name] = self.client.create_collection(name=name)
-                    print(f"创建新集合: {name}")
+        Returns:
+            Optional[Collection]: 集合对象，不存在时返回None
+        """
+        if collection_name not in self._collections:
+            async with self._open_lock:
+                # 等待锁期间可能已被其他协程打开
+                opened = collection_name in self._collections
+                if not opened and collection_name in self._collection_names():
+                    self._open_collection(collection_name)
+                elif not opened and create and collection_name.startswith("therapist_"):
+                    # 新的治疗流派集合
+                    therapy_type = collection_name.split("_")[1]
+                    if therapy_type not in self.therapy_types:
+                        self.therapy_types.append(therapy_type)
+                        print(f"添加新的治疗流派集合: {therapy_type}")
+
+                    self._open_collection(collection_name)
+                    print(f"创建新的治疗流派集合: {collection_name}")
+
+        return self._collections.get(collection_name)
 
     async def add_document(self, collection_name: str, doc_id: str, content: Dict[str, Any],
                            metadata: Dict[str, Any]) -> None:
         """添加文档到指定集合"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            print(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
-
-            # 如果仍不存在，则是一个新的治疗流派集合，需要创建
-            if collection_name not in self._collections and collection_name.startswith("therapist_"):
-                therapy_type = collection_name.split("_")[1]
-                if therapy_type not in self.therapy_types:
-                    self.therapy_types.append(therapy_type)
-                    print(f"添加新的治疗流派集合: {therapy_type}")
+        collection = await self._get_collection(collection_name, create=True)
+        if collection is None:
+            print(f"集合 {collection_name} 不存在且无法创建，无法添加文档")
+            return
 
-                # 创建新集合
-                self._collections[collection_name] = self.client.create_collection(name=collection_name)
-                print(f"创建新的治疗流派集合: {collection_name}")
-
-        collection = self._collections[collection_name]
         collection.add(
             documents=[json.dumps(content)],
             metadatas=[metadata],
-            ids=[doc_id]
+            ids=[doc_id],
+            embeddings=[PLACEHOLDER_EMBEDDING]
         )
         print(f"已添加文档到 {collection_name}")
 
     async def get_document(self, collection_name: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """获取指定文档"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            print(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
-
-            # 如果仍不存在，则可能是新的治疗流派或者其他未知集合
-            if collection_name not in self._collections:
-                print(f"集合 {collection_name} 不存在且无法创建")
-                return None
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            print(f"集合 {collection_name} 不存在且无法创建")
+            return None
 
-        collection = self._collections[collection_name]
         results = collection.get(ids=[doc_id])
         if results["documents"] and results["documents"][0]:
             print(f"从 {collection_name} 成功获取文档 {doc_id}")
@@ -147,38 +198,40 @@ class LongTermMemoryStore:
     async def update_document(self, collection_name: str, doc_id: str, content: Dict[str, Any],
                               metadata: Dict[str, Any]) -> None:
         """更新指定文档"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            print(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            print(f"集合 {collection_name} 不存在且无法创建，无法更新文档")
+            return
 
-            # 如果仍不存在，则可能是新的治疗流派或者其他未知集合
-            if collection_name not in self._collections:
-                print(f"集合 {collection_name} 不存在且无法创建，无法更新文档")
-                return
-
-        collection = self._collections[collection_name]
         collection.update(
             ids=[doc_id],
             documents=[json.dumps(content)],
-            metadatas=[metadata]
+            metadatas=[metadata],
+            embeddings=[PLACEHOLDER_EMBEDDING]
         )
         print(f"已更新文档 {doc_id}")
 
+    async def get_document_ids(self, collection_name: str) -> List[str]:
+        """获取集合中所有文档的ID（不读取文档正文）"""
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return []
+        return collection.get(include=[])["ids"]
+
+    async def count_documents(self, collection_name: str) -> int:
+        """获取集合中的文档数量"""
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return 0
+        return collection.count()
+
     async def search_documents(self, collection_name: str, query: str,
                                filter_dict: Dict[str, Any] = None, limit: int = 5) -> List[Dict[str, Any]]:
         """搜索文档"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            print(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
-
-            # 如果仍不存在，则返回空列表
-            if collection_name not in self._collections:
-                print(f"集合 {collection_name} 不存在且无法创建，无法搜索文档")
-                return []
-
-        collection = self._collections[collection_name]
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            print(f"集合 {collection_name} 不存在且无法创建，无法搜索文档")
+            return []
 
         try:
             # 获取所有文档
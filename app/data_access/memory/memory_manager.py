@@ -7,6 +7,7 @@ from pathlib import Path
 
 from app.data_access.memory.enhanced_memory_manager import EnhancedMemoryManager
 from app.models.memory_schemas import SkillMemory, MedicalRecord
+from app.core.therapist_config import TherapistConfig
 from app.business_logic.services.logger import logger
 from app.core.exceptions import StateError
 
@@ -18,10 +19,10 @@ class MemoryManager(EnhancedMemoryManager):
     保持原有接口不变，以确保兼容性
     """
 
-    def __init__(self):
+    def __init__(self, therapist_config: Optional[TherapistConfig] = None):
         """初始化记忆管理器"""
         # 调用父类的初始化方法
-        super().__init__()
+        super().__init__(therapist_config)
 
     # 以下方法保留原接口，但实现委托给父类
 
@@ -6,11 +6,12 @@
 import os
 import json
 import time
+import asyncio
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from app.data_access.memory.initializer import MemoryInitializer
+from app.core.therapist_config import TherapistConfig
 from app.data_access.memory.memory_manager import MemoryManager
 from app.business_logic.services.logger import logger
 
@@ -22,7 +23,7 @@ class MemorySystemInitializer:
     """
 
     @staticmethod
-    async def initialize_memory_system() -> MemoryManager:
+    async def initialize_memory_system(therapist_config: Optional[TherapistConfig] = None) -> MemoryManager:
         """
         初始化整个记忆系统
 
@@ -30,18 +31,19 @@ class MemorySystemInitializer:
         2. 检查JSON文件和向量数据库状态
         3. 必要时执行同步
 
+        Args:
+            therapist_config: 咨询师配置，为None时加载默认配置文件
+
         Returns:
             MemoryManager: 初始化好的记忆管理器实例
         """
         logger.info("开始初始化记忆系统...")
 
-        # 获取动态咨询师配置
-        therapist_types = MemorySystemInitializer._get_therapist_types()
+        # 创建记忆管理器（咨询师配置只加载一次，注入到各存储）
+        memory_manager = MemoryManager(therapist_config)
+        therapist_types = list(memory_manager.therapy_types)
         logger.info(f"检测到 {len(therapist_types)} 个心理咨询流派: {', '.join(therapist_types)}")
 
-        # 创建记忆管理器
-        memory_manager = MemoryManager()
-
         # 检查向量数据库目录是否存在
         vector_db_dir = Path(memory_manager.vector_store.persist_directory)
         vector_db_exists = vector_db_dir.exists() and any(
@@ -57,21 +59,13 @@ class MemorySystemInitializer:
         # 根据检测结果决定初始化策略
         if vector_db_exists and json_exists:
             logger.info("向量数据库和JSON文件都存在，进行增量同步")
-            # 使用初始化器进行增量同步
-            initializer = MemoryInitializer(
-                json_store=memory_manager.json_store,
-                vector_store=memory_manager.vector_store
-            )
-            await initializer.initialize()
+            # 使用记忆管理器的初始化器进行增量同步
+            await memory_manager.initializer.initialize()
 
         elif json_exists and not vector_db_exists:
             logger.info("只有JSON文件存在，从JSON重建向量数据库")
-            # 使用初始化器从JSON重建向量数据库
-            initializer = MemoryInitializer(
-                json_store=memory_manager.json_store,
-                vector_store=memory_manager.vector_store
-            )
-            await initializer.rebuild_vector_db_from_json()
+            # 使用记忆管理器的初始化器从JSON重建向量数据库
+            await memory_manager.initializer.rebuild_vector_db_from_json()
 
         elif vector_db_exists and not json_exists:
             logger.info("只有向量数据库存在，从向量数据库生成JSON文件")
@@ -103,7 +97,7 @@ class MemorySystemInitializer:
         await memory_manager.vector_store.init_collections()
 
         # 获取所有治疗师流派
-        therapist_types = MemorySystemInitializer._get_therapist_types()
+        therapist_types = memory_manager.therapy_types
 
         # 定义要处理的集合列表
         collections = [
@@ -189,76 +183,51 @@ class MemorySystemInitializer:
             logger.error(f"重建向量索引文件失败: {str(e)}")
 
     @staticmethod
-    def _get_therapist_types() -> List[str]:
-        """
-        从配置文件获取所有的治疗师流派类型
-
-        Returns:
-            List[str]: 治疗师流派类型列表
+    async def _ensure_therapist_collections(memory_manager: MemoryManager, therapist_types: List[str]) -> None:
         """
-        # 默认流派
-        therapist_types = ["cbt", "psychodynamic"]
-
-        try:
-            # 尝试加载治疗师配置文件
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 提取所有流派ID
-                therapist_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
+        确保所有治疗师流派的记忆集合都已创建
 
-        except Exception as e:
-            logger.warning(f"加载治疗师配置失败: {str(e)}，将使用默认流派")
+        并发检查各流派集合中的文档数量，只为空集合添加默认技能
 
-        return therapist_types
+        Args:
+            memory_manager: 记忆管理器
+            therapist_types: 治疗师流派类型列表
+        """
+        await asyncio.gather(*(
+            MemorySystemInitializer._ensure_therapist_collection(memory_manager, therapy_type)
+            for therapy_type in therapist_types
+        ))
 
     @staticmethod
-    async def _ensure_therapist_collections(memory_manager: MemoryManager, therapist_types: List[str]) -> None:
+    async def _ensure_therapist_collection(memory_manager: MemoryManager, therapy_type: str) -> None:
         """
-        确保所有治疗师流派的记忆集合都已创建
+        确保单个治疗师流派的记忆集合非空
 
         Args:
             memory_manager: 记忆管理器
-            therapist_types: 治疗师流派类型列表
+            therapy_type: 治疗师流派类型
         """
-        # 为每个治疗师流派验证记忆集合
-        for therapy_type in therapist_types:
-            collection_name = f"therapist_{therapy_type}_skills"
+        try:
+            # 如果集合为空，添加默认技能
+            if not await memory_manager.has_skill_memory("therapist", therapy_type=therapy_type):
+                logger.info(f"为治疗师流派 {therapy_type} 添加默认技能记忆")
+
+                # 创建基础技能
+                skill_memory = {
+                    "id": f"{therapy_type}_base_skill_1",
+                    "content": f"作为{therapy_type}流派的心理咨询师，能够通过专业技能帮助来访者解决心理问题。",
+                    "timestamp": time.time(),
+                    "therapy_type": therapy_type
+                }
 
-            try:
-                # 尝试从集合中获取技能
-                skills = await memory_manager.get_skill_memory("therapist", therapy_type=therapy_type)
-
-                # 如果集合为空，添加默认技能
-                if not skills:
-                    logger.info(f"为治疗师流派 {therapy_type} 添加默认技能记忆")
-
-                    # 创建基础技能
-                    skill_memory = {
-                        "id": f"{therapy_type}_base_skill_1",
-                        "content": f"作为{therapy_type}流派的心理咨询师，能够通过专业技能帮助来访者解决心理问题。",
-                        "timestamp": time.time() if 'time' in globals() else 0,
-                        "therapy_type": therapy_type
-                    }
-
-                    # 存储基础技能
-                    await memory_manager.update_skill_memory(
-                        "therapist",
-                        skill_memory,
-                        therapy_type=therapy_type
-                    )
-
-                logger.info(f"治疗师流派 {therapy_type} 的记忆集合已验证")
+                # 存储基础技能
+                await memory_manager.update_skill_memory(
+                    "therapist",
+                    skill_memory,
+                    therapy_type=therapy_type
+                )
 
-            except Exception as e:
-                logger.error(f"验证治疗师流派 {therapy_type} 的记忆集合时出错: {str(e)}")
\ No newline at end of file
+            logger.info(f"治疗师流派 {therapy_type} 的记忆集合已验证")
+
+        except Exception as e:
+            logger.error(f"验证治疗师流派 {therapy_type} 的记忆集合时出错: {str(e)}")
@@ -1,26 +1,50 @@
 # app/data_access/repositories/session_repository.py
 
-import uuid
-import json
 import uuid
 import json
 import os
+import asyncio
+import sqlite3
+import threading
 from typing import Dict, Any, Optional, List
 import datetime
 from pydantic import BaseModel
-import aiofiles
+
+from app.business_logic.services.logger import logger
+from app.data_access.checkpointer import SQLiteCheckpointSaver
 
 # data dir
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '..', '..', 'data', 'user_data')
 DATA_DIR = os.path.normpath(DATA_DIR)
+# each session is one row of metadata, so an update only rewrites the session that changed;
+# the conversation state itself lives in the graph checkpoints (see app/data_access/checkpointer.py)
+SESSIONS_DB = os.path.join(DATA_DIR, "sessions.sqlite3")
+# legacy single-file storage, imported into SESSIONS_DB once
 SESSIONS_FILE = os.path.join(DATA_DIR, "sessions.json")
 USER_INDEX_FILE = os.path.join(DATA_DIR, "user_sessions_index.json")
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        created_at TEXT,
+        updated_at TEXT,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id, created_at)",
+]
+
 # in-memory stores
 _sessions_table: Dict[str, Dict[str, Any]] = {}
 _user_sessions_index: Dict[int, List[str]] = {}
+# source of truth for session state
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+
+# sqlite connection shared by the worker threads that run the writes
+_conn: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
 
 
 def _default_json_serializer(obj):
@@ -32,47 +56,104 @@ def _default_json_serializer(obj):
     raise TypeError(f"type {type(obj)} is not JSON serializable")
 
 
-async def _save_data():
-    async with aiofiles.open(SESSIONS_FILE, 'w', encoding='utf-8') as f:
-        await f.write(json.dumps(_sessions_table, indent=4, default=_default_json_serializer, ensure_ascii=False))
+def _parse_datetimes(session_data: Dict[str, Any]) -> Dict[str, Any]:
+    for key in ('created_at', 'updated_at'):
+        if session_data.get(key):
+            try:
+                session_data[key] = datetime.datetime.fromisoformat(session_data[key])
+            except Exception:
+                pass
+    return session_data
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(SESSIONS_DB, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        with _conn:
+            for statement in _SCHEMA:
+                _conn.execute(statement)
+    return _conn
+
+
+def _session_row(session_data: Dict[str, Any]) -> tuple:
+    # the state is stored by the checkpointer, only metadata goes into the row
+    session_data = {key: value for key, value in session_data.items() if key != "state"}
+    created_at = session_data.get("created_at")
+    updated_at = session_data.get("updated_at")
+    return (
+        session_data["session_id"],
+        session_data["user_id"],
+        created_at.isoformat() if isinstance(created_at, datetime.datetime) else created_at,
+        updated_at.isoformat() if isinstance(updated_at, datetime.datetime) else updated_at,
+        json.dumps(session_data, default=_default_json_serializer, ensure_ascii=False),
+    )
+
+
+def _write_rows(rows: List[tuple]):
+    with _db_lock:
+        conn = _get_conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, user_id, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+
+def _read_legacy_state(session_id: str) -> Optional[Dict[str, Any]]:
+    # sessions written before the checkpointer kept their state in the row
+    with _db_lock:
+        row = _get_conn().execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+    return json.loads(row[0]).get("state") if row else None
+
+
+async def _save_session(session_data: Dict[str, Any]):
+    # serialize on the event loop so the state is not mutated while it is being dumped,
+    # then write the single row in a worker thread
+    row = _session_row(session_data)
+    await asyncio.to_thread(_write_rows, [row])
+
+
+def _migrate_legacy_file():
+    """import sessions.json into the database once, then keep the old file as a backup"""
+    if not os.path.exists(SESSIONS_FILE):
+        return
+    try:
+        with open(SESSIONS_FILE, 'r', encoding='utf-8') as f:
+            content = f.read()
+        legacy_sessions = json.loads(content) if content.strip() else {}
+    except json.JSONDecodeError:
+        legacy_sessions = {}
+
+    rows = [_session_row(session_data) for session_data in legacy_sessions.values() if session_data.get("session_id")]
+    if rows:
+        _write_rows(rows)
+    for path in (SESSIONS_FILE, USER_INDEX_FILE):
+        if os.path.exists(path):
+            os.replace(path, path + ".migrated")
+    logger.info(f"Migrated {len(rows)} sessions from {SESSIONS_FILE} to {SESSIONS_DB}")
+
 
-    async with aiofiles.open(USER_INDEX_FILE, 'w', encoding='utf-8') as f:
-        await f.write(json.dumps(_user_sessions_index, indent=4))
+def _read_all() -> List[Dict[str, Any]]:
+    _migrate_legacy_file()
+    with _db_lock:
+        rows = _get_conn().execute("SELECT data FROM sessions ORDER BY created_at").fetchall()
+    return [_parse_datetimes(json.loads(data)) for (data,) in rows]
 
 
 async def _load_data():
     global _sessions_table, _user_sessions_index
-    try:
-        async with aiofiles.open(SESSIONS_FILE, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            if content.strip():
-                loaded_sessions = json.loads(content)
-                for session_id, session_data in loaded_sessions.items():
-                    if session_data.get('created_at'):
-                        try:
-                            session_data['created_at'] = datetime.datetime.fromisoformat(session_data['created_at'])
-                        except Exception:
-                            pass
-                    if session_data.get('updated_at'):
-                        try:
-                            session_data['updated_at'] = datetime.datetime.fromisoformat(session_data['updated_at'])
-                        except Exception:
-                            pass
-                _sessions_table = loaded_sessions
-            else:
-                _sessions_table = {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        _sessions_table = {}
-
-    try:
-        async with aiofiles.open(USER_INDEX_FILE, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            if content.strip():
-                _user_sessions_index = {int(k): v for k, v in json.loads(content).items()}
-            else:
-                _user_sessions_index = {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        _user_sessions_index = {}
+    sessions = await asyncio.to_thread(_read_all)
+    _sessions_table = {}
+    _user_sessions_index = {}
+    for session_data in sessions:
+        # legacy rows may still carry a state; it is read on demand instead of kept in memory
+        session_data.pop("state", None)
+        _sessions_table[session_data["session_id"]] = session_data
+        _user_sessions_index.setdefault(int(session_data["user_id"]), []).append(session_data["session_id"])
 
 
 class SessionRepository:
@@ -80,8 +161,11 @@ class SessionRepository:
         pass
 
     @classmethod
-    async def create_repo(cls) -> "SessionRepository":
-        # async factory to load data then return repository instance
+    async def create_repo(cls, checkpointer: SQLiteCheckpointSaver) -> "SessionRepository":
+        # async factory to load data then return repository instance;
+        # session state is read from the checkpointer shared with the consultation graph
+        global _checkpointer
+        _checkpointer = checkpointer
         await _load_data()
         return cls()
 
@@ -99,28 +183,42 @@ class SessionRepository:
             "selected_therapist_type": None,
             "created_at": now,
             "updated_at": now,
-            "state": initial_state
         }
 
         _sessions_table[session_id] = session_data
+        # the user index is kept incrementally and backed by the user_id column
         _user_sessions_index.setdefault(user_id, []).append(session_id)
 
-        await _save_data()
+        await _save_session(session_data)
         return session_id
 
-    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # metadata only (owner, status, timestamps), without loading the state from the checkpointer
         return _sessions_table.get(session_id)
 
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session_meta = _sessions_table.get(session_id)
+        if session_meta is None:
+            return None
+        state = await _checkpointer.aget_state_values(session_id)
+        if state is None:
+            state = await asyncio.to_thread(_read_legacy_state, session_id) or {}
+        return {**session_meta, "state": state}
+
     async def update(self, session_id: str, new_state: Dict[str, Any]):
+        # new_state has already been checkpointed by the graph; only the metadata is written here
         if session_id in _sessions_table:
-            _sessions_table[session_id]['state'] = new_state
             _sessions_table[session_id]["session_status"] = new_state.get("current_phase")
             _sessions_table[session_id]["updated_at"] = datetime.datetime.now(datetime.timezone.utc)
-            await _save_data()
+            await _save_session(_sessions_table[session_id])
+            if new_state.get("is_complete", False):
+                # finished sessions only keep their final checkpoint
+                await _checkpointer.aevict_thread(session_id)
 
     async def get_for_user(self, user_id: int) -> List[Dict[str, Any]]:
         session_ids = _user_sessions_index.get(user_id, [])
         return [_sessions_table[sid] for sid in session_ids if sid in _sessions_table]
 
     async def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
-        return _sessions_table[session_id]['state']["dialogue_history"]
\ No newline at end of file
+        session = await self.get(session_id)
+        return session['state']["dialogue_history"]
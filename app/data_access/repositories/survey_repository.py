@@ -0,0 +1,56 @@
+# app/data_access/repositories/survey_repository.py
+
+import os
+import json
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+# initial survey results of the students, matched to users by their basic info
+SURVEY_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    'data', 'user.json'
+)
+
+SurveyKey = Tuple[Any, Any, Any, Any]
+
+# (年级, 性别, 学校, 专业) -> survey record, built once and swapped whole on reload
+_survey_index: Dict[SurveyKey, Dict[str, Any]] = {}
+
+
+def _survey_key(grade, gender, university, major) -> SurveyKey:
+    return (grade, gender, university, major)
+
+
+def _build_index(path: str) -> Dict[SurveyKey, Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        records: List[Dict[str, Any]] = json.load(f)
+    index: Dict[SurveyKey, Dict[str, Any]] = {}
+    for item in records:
+        key = _survey_key(item.get("年级"), item.get("性别"), item.get("学校"), item.get("专业"))
+        # keep the first record for duplicated keys, same as the former linear scan
+        index.setdefault(key, item)
+    return index
+
+
+async def _load_data(path: str = SURVEY_FILE):
+    global _survey_index
+    _survey_index = await asyncio.to_thread(_build_index, path)
+
+
+class SurveyRepository:
+    """Initial survey lookup by (grade, gender, university, major). Call `await SurveyRepository.create_repo()`."""
+    def __init__(self):
+        pass
+
+    @classmethod
+    async def create_repo(cls) -> "SurveyRepository":
+        # async factory to load data then return repository instance
+        await _load_data()
+        return cls()
+
+    async def reload(self):
+        # rebuild the index from the file, lookups keep using the old index until the new one is ready
+        await _load_data()
+
+    async def get_for_user(self, grade, gender, university, major) -> Optional[Dict[str, Any]]:
+        return _survey_index.get(_survey_key(grade, gender, university, major))
@@ -2,41 +2,53 @@
 
 import json
 import os
+import asyncio
+import sqlite3
+import threading
 import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from app.models.schemas import User, UserCreate, UserUpdate
-from app.core.security import get_password_hash
-
-# --- 数据持久化设置 ---
-DATA_DIR = r"D:\ruc\Code\Codefield\Code_Python\aaai\psy-app\data\user_data"
-USERS_FILE = os.path.join(DATA_DIR, "users.json")
-PASSWORDS_FILE = os.path.join(DATA_DIR, "passwords.json")
-
-# 确保数据目录存在
-import json
-import os
-import datetime
-from typing import Optional, Dict, Any
-import aiofiles
-
-from app.models.schemas import User, UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
+from app.core.exceptions import DatabaseError
+from app.business_logic.services.logger import logger
 
 # --- data dir (keep existing path if running on windows dev machine, but prefer relative for deployment)
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '..', '..', 'data', 'user_data')
 DATA_DIR = os.path.normpath(DATA_DIR)
+# one row per user, so a registration or profile update only writes that user
+USERS_DB = os.path.join(DATA_DIR, "users.sqlite3")
+# legacy whole-file storage, imported into USERS_DB once
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 PASSWORDS_FILE = os.path.join(DATA_DIR, "passwords.json")
 
 # ensure data dir exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        data TEXT NOT NULL,
+        password_hash TEXT
+    )""",
+]
+
 # --- in-memory structures (initialized during async initialize) ---
 _users_db: Dict[int, User] = {}
 _passwords_db: Dict[int, str] = {}
 _next_user_id = 1
 
+# hash indexes for the lookups done on every authenticated request
+_username_index: Dict[str, int] = {}
+_email_index: Dict[str, int] = {}
+# usernames / emails of registrations that are still hashing their password
+_reserved_usernames: set = set()
+_reserved_emails: set = set()
+
+# sqlite connection shared by the worker threads that run the writes
+_conn: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
 
 def _default_json_serializer(obj):
     if isinstance(obj, (datetime.datetime, datetime.date)):
@@ -44,46 +56,97 @@ def _default_json_serializer(obj):
     raise TypeError(f"type {type(obj)} is not JSON serializable")
 
 
-async def _save_data():
-    serializable_users = {uid: user.model_dump() for uid, user in _users_db.items()}
-    async with aiofiles.open(USERS_FILE, 'w', encoding='utf-8') as f:
-        await f.write(json.dumps(serializable_users, indent=4, ensure_ascii=False, default=_default_json_serializer))
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(USERS_DB, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        with _conn:
+            for statement in _SCHEMA:
+                _conn.execute(statement)
+    return _conn
 
-    async with aiofiles.open(PASSWORDS_FILE, 'w', encoding='utf-8') as f:
-        await f.write(json.dumps(_passwords_db, indent=4, ensure_ascii=False, default=_default_json_serializer))
 
+def _user_row(user: User, password_hash: Optional[str]) -> tuple:
+    return (
+        user.id,
+        json.dumps(user.model_dump(), ensure_ascii=False, default=_default_json_serializer),
+        password_hash,
+    )
 
-async def _load_data():
-    global _users_db, _passwords_db, _next_user_id
-    # load users
-    try:
-        async with aiofiles.open(USERS_FILE, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            if content.strip():
-                loaded_users_raw = json.loads(content)
-                _users_db = {int(uid): User.model_validate(data) for uid, data in loaded_users_raw.items()}
-            else:
-                _users_db = {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        _users_db = {}
 
-    # load passwords
+def _write_rows(rows: List[tuple]):
+    with _db_lock:
+        conn = _get_conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO users (id, data, password_hash) VALUES (?, ?, ?)", rows)
+
+
+async def _save_user(user: User):
+    row = _user_row(user, _passwords_db.get(user.id))
+    await asyncio.to_thread(_write_rows, [row])
+
+
+def _read_json_file(path: str) -> Dict[str, Any]:
     try:
-        async with aiofiles.open(PASSWORDS_FILE, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            if content.strip():
-                _passwords_db = {int(k): v for k, v in json.loads(content).items()}
-            else:
-                _passwords_db = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return json.loads(content) if content.strip() else {}
     except (FileNotFoundError, json.JSONDecodeError):
-        _passwords_db = {}
+        return {}
+
+
+def _migrate_legacy_files():
+    """import users.json / passwords.json into the database once, then keep the old files as a backup"""
+    if not os.path.exists(USERS_FILE):
+        return
+    users_raw = _read_json_file(USERS_FILE)
+    passwords_raw = _read_json_file(PASSWORDS_FILE)
+    rows = [
+        _user_row(User.model_validate(data), passwords_raw.get(str(uid)))
+        for uid, data in users_raw.items()
+    ]
+    if rows:
+        _write_rows(rows)
+    for path in (USERS_FILE, PASSWORDS_FILE):
+        if os.path.exists(path):
+            os.replace(path, path + ".migrated")
+    logger.info(f"Migrated {len(rows)} users from {USERS_FILE} to {USERS_DB}")
+
+
+def _read_all() -> List[tuple]:
+    _migrate_legacy_files()
+    with _db_lock:
+        return _get_conn().execute("SELECT id, data, password_hash FROM users").fetchall()
+
+
+def _index_user(user: User):
+    _username_index[user.username] = user.id
+    if user.email:
+        _email_index[user.email] = user.id
+
+
+async def _load_data():
+    global _users_db, _passwords_db, _next_user_id, _username_index, _email_index
+    rows = await asyncio.to_thread(_read_all)
+    _users_db = {}
+    _passwords_db = {}
+    _username_index = {}
+    _email_index = {}
+    for uid, data, password_hash in rows:
+        user = User.model_validate(json.loads(data))
+        _users_db[uid] = user
+        if password_hash:
+            _passwords_db[uid] = password_hash
+        _index_user(user)
 
     if _users_db:
         _next_user_id = max(_users_db.keys()) + 1
 
 
 class UserRepository:
-    """Async user repository (file-backed). Call `await UserRepository.create()` to get an initialized instance."""
+    """Async user repository (SQLite-backed). Call `await UserRepository.create_repo()` to get an initialized instance."""
     def __init__(self):
         pass
 
@@ -97,22 +160,34 @@ class UserRepository:
         return _users_db.get(user_id)
 
     async def get_by_username(self, username: str) -> Optional[User]:
-        for user in _users_db.values():
-            if user.username == username:
-                return user
-        return None
+        user_id = _username_index.get(username)
+        return _users_db.get(user_id) if user_id is not None else None
 
     async def get_by_email(self, email: str) -> Optional[User]:
-        for user in _users_db.values():
-            if user.email == email:
-                return user
-        return None
+        user_id = _email_index.get(email)
+        return _users_db.get(user_id) if user_id is not None else None
 
     async def get_hashed_password(self, user_id: int) -> Optional[str]:
         return _passwords_db.get(user_id)
 
     async def create(self, user_create: UserCreate) -> User:
         global _next_user_id
+        # the uniqueness check and the reservation happen before any await, so a concurrent
+        # registration of the same username / email fails here instead of creating a duplicate
+        if user_create.username in _username_index or user_create.username in _reserved_usernames:
+            raise DatabaseError("用户名已存在")
+        if user_create.email and (user_create.email in _email_index or user_create.email in _reserved_emails):
+            raise DatabaseError("邮箱已被注册")
+        _reserved_usernames.add(user_create.username)
+        if user_create.email:
+            _reserved_emails.add(user_create.email)
+        try:
+            # hash in the password pool; the id is only taken after the await,
+            # so concurrent registrations never share an id
+            password_hash = await get_password_hash_async(user_create.password)
+        finally:
+            _reserved_usernames.discard(user_create.username)
+            _reserved_emails.discard(user_create.email)
         now = datetime.datetime.now(datetime.timezone.utc)
         new_user = User(
             id=_next_user_id,
@@ -127,19 +202,28 @@ class UserRepository:
         )
 
         _users_db[_next_user_id] = new_user
-        _passwords_db[_next_user_id] = get_password_hash(user_create.password)
+        _passwords_db[_next_user_id] = password_hash
+        _index_user(new_user)
         _next_user_id += 1
-        await _save_data()
+        await _save_user(new_user)
         return new_user
 
     async def update(self, *, db_obj: User, obj_in: UserUpdate) -> User:
         update_data = obj_in.model_dump(exclude_unset=True)
+        old_username, old_email = db_obj.username, db_obj.email
         for field, value in update_data.items():
             if field == "password":
-                _passwords_db[db_obj.id] = get_password_hash(value)
+                _passwords_db[db_obj.id] = await get_password_hash_async(value)
             else:
                 setattr(db_obj, field, value)
 
+        # keep the indexes in step with changed usernames / emails
+        if _username_index.get(old_username) == db_obj.id and old_username != db_obj.username:
+            del _username_index[old_username]
+        if old_email and _email_index.get(old_email) == db_obj.id and old_email != db_obj.email:
+            del _email_index[old_email]
+        _index_user(db_obj)
+
         db_obj.updated_at = datetime.datetime.now(datetime.timezone.utc)
-        await _save_data()
-        return db_obj
\ No newline at end of file
+        await _save_user(db_obj)
+        return db_obj
@@ -1,5 +1,7 @@
 # app/main.py
 
+import os
+import asyncio
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
@@ -8,8 +10,13 @@ from .api import auth, consultation
 from .business_logic.agents import ProfilerAgent, SupervisorAgent, TherapistAgent, TherapistFactory
 from .business_logic.controllers.consultation_controller import ConsultationController
 from .business_logic.services.llm_service import create_llm_service
+from .business_logic.services.session_locks import SessionLockManager
+from .core.config import settings
+from .core.therapist_config import get_therapist_config
+from .data_access.checkpointer import SQLiteCheckpointSaver
 from .data_access.memory.system_initializer import MemorySystemInitializer
-from .data_access.repositories.session_repository import SessionRepository
+from .data_access.repositories.session_repository import SessionRepository, DATA_DIR
+from .data_access.repositories.survey_repository import SurveyRepository
 from .data_access.repositories.user_repository import UserRepository
 
 @asynccontextmanager
@@ -17,14 +24,35 @@ async def lifespan(app: FastAPI):
     print("--- 应用启动，初始化核心服务 ---")
     
     app.state.llm_service = create_llm_service()
-    app.state.memory_manager = await MemorySystemInitializer.initialize_memory_system()
-    # create async repositories (they perform async file loading)
-    app.state.session_repository = await SessionRepository.create_repo()
-    app.state.user_repository = await UserRepository.create_repo()
+    # 同一会话的请求串行处理，不同会话并行
+    app.state.session_locks = SessionLockManager()
+    # 咨询师配置只读取一次，注入记忆系统和咨询师工厂
+    app.state.therapist_config = get_therapist_config()
+    # 咨询图的检查点持久化到SQLite，重启后会话可从中断处继续；会话仓库从这里读取会话状态
+    app.state.checkpointer = SQLiteCheckpointSaver(
+        os.path.join(DATA_DIR, "checkpoints.sqlite3"),
+        keep_per_thread=settings.CHECKPOINT_KEEP_PER_THREAD,
+    )
+    # 记忆系统初始化与仓库的异步文件加载互不依赖，并发执行
+    (
+        app.state.memory_manager,
+        app.state.session_repository,
+        app.state.user_repository,
+        app.state.survey_repository,
+    ) = await asyncio.gather(
+        MemorySystemInitializer.initialize_memory_system(app.state.therapist_config),
+        SessionRepository.create_repo(app.state.checkpointer),
+        UserRepository.create_repo(),
+        SurveyRepository.create_repo(),
+    )
 
     profiler = ProfilerAgent(llm_service=app.state.llm_service)
     supervisor = SupervisorAgent(llm_service=app.state.llm_service)
-    therapist_factory = TherapistFactory(memory_manager=app.state.memory_manager, llm_service=app.state.llm_service)
+    therapist_factory = TherapistFactory(
+        memory_manager=app.state.memory_manager,
+        llm_service=app.state.llm_service,
+        therapist_config=app.state.therapist_config
+    )
 
     await therapist_factory.ensure_therapist_memories()
     therapists = therapist_factory.create_all_therapists()
@@ -33,7 +61,8 @@ async def lifespan(app: FastAPI):
         profiler_agent=profiler,
         therapist_agents=therapists,
         supervisor_agent=supervisor,
-        memory_manager=app.state.memory_manager
+        memory_manager=app.state.memory_manager,
+        checkpointer=app.state.checkpointer,
     )
 
     print("--- 所有核心服务已准备就绪 (挂载于 app.state) ---")
@@ -1,4 +1,3 @@
-import pandas as pd
 import json
 
 # 1. Define variable names and their English counterparts.
@@ -59,6 +58,8 @@ def convert_value(var_name: str, value):
     Returns:
         The transformed, human-readable value.
     """
+    import pandas as pd
+
     if pd.isna(value):
         return None
     
@@ -117,48 +118,58 @@ def convert_value(var_name: str, value):
     except (ValueError, TypeError):
         return value
 
-# 3. Read the new data file.
-try:
-    data_df = pd.read_excel('data/原始数据.xls')
-except FileNotFoundError:
-    print("Error: 'data/原始数据.xls' not found. Please ensure the file is in the correct directory.")
-    raise FileNotFoundError
-
-# 4. Process the data and create the JSON structure.
-cnt = 0
-json_data = []
-for index, row in data_df.iterrows():
-    student_record = {'basic_info': {'id': f"stu{index:03d}"},
-                      'realQuestionnaireResults': {},
-                      'psychologicalPortrait': {},
-                      'additional_info': {}
-                      }
-    
-    
-    cnt += 1
-    for category, var_list in var_categories.items():
-        if category == 'basic_info' or category == 'realQuestionnaireResults' or category == 'additional_info':
-            for var_code in var_list:
-                if var_code in data_df.columns:
-                    english_name = var_name_mapping.get(var_code, var_code)
-                    raw_value = row[var_code]
-                    transformed_value = convert_value(var_code, raw_value)
-                    student_record[category][english_name] = transformed_value
-        else:
-            student_record['psychologicalPortrait'][category] = {}
-            for var_code in var_list:
-                if var_code in data_df.columns:
-                    english_name = var_name_mapping.get(var_code, var_code)
-                    raw_value = row[var_code]
-                    transformed_value = convert_value(var_code, raw_value)
-                    student_record['psychologicalPortrait'][category][english_name] = transformed_value
-    
-    json_data.append(student_record)
-print(cnt)
-# 5. Save the transformed data to a new JSON file.
-output_filename = 'src/students_config_0718.json'
-with open(output_filename, 'w', encoding='utf-8') as f:
-    json.dump(json_data, f, ensure_ascii=False, indent=2)
-
-print(f"Successfully transformed {len(json_data)} student records.")
-print(f"Data saved to '{output_filename}'")
\ No newline at end of file
+
+def main():
+    """Reads the raw survey spreadsheet and writes the student config JSON."""
+    # pandas is slow to import, so it is only loaded when the transform actually runs.
+    import pandas as pd
+
+    # 3. Read the new data file.
+    try:
+        data_df = pd.read_excel('data/原始数据.xls')
+    except FileNotFoundError:
+        print("Error: 'data/原始数据.xls' not found. Please ensure the file is in the correct directory.")
+        raise FileNotFoundError
+
+    # 4. Process the data and create the JSON structure.
+    cnt = 0
+    json_data = []
+    for index, row in data_df.iterrows():
+        student_record = {'basic_info': {'id': f"stu{index:03d}"},
+                          'realQuestionnaireResults': {},
+                          'psychologicalPortrait': {},
+                          'additional_info': {}
+                          }
+
+
+        cnt += 1
+        for category, var_list in var_categories.items():
+            if category == 'basic_info' or category == 'realQuestionnaireResults' or category == 'additional_info':
+                for var_code in var_list:
+                    if var_code in data_df.columns:
+                        english_name = var_name_mapping.get(var_code, var_code)
+                        raw_value = row[var_code]
+                        transformed_value = convert_value(var_code, raw_value)
+                        student_record[category][english_name] = transformed_value
+            else:
+                student_record['psychologicalPortrait'][category] = {}
+                for var_code in var_list:
+                    if var_code in data_df.columns:
+                        english_name = var_name_mapping.get(var_code, var_code)
+                        raw_value = row[var_code]
+                        transformed_value = convert_value(var_code, raw_value)
+                        student_record['psychologicalPortrait'][category][english_name] = transformed_value
+
+        json_data.append(student_record)
+    print(cnt)
+    # 5. Save the transformed data to a new JSON file.
+    output_filename = 'src/students_config_0718.json'
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        json.dump(json_data, f, ensure_ascii=False, indent=2)
+
+    print(f"Successfully transformed {len(json_data)} student records.")
+    print(f"Data saved to '{output_filename}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -60,7 +60,8 @@ class ProfilerAgent:
                     relevant_skills = await memory_manager.get_skill_memory(
                         "profiler",
                         query_text=query_text if query_text else None,
-                        limit=5
+                        limit=5,
+                        include=["id", "content", "similarity"]
                     )
 
                     if relevant_skills and len(relevant_skills) > 0:
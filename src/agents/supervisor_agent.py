@@ -328,11 +328,8 @@ class SupervisorAgent:
             # 新增：创建学生特征向量并存储
             from src.utils.vector_utils import VectorUtils
 
-            # 创建学生特征向量
-            vector_data = VectorUtils.create_student_feature_vector(
-                state["current_student_basic_info"],
-                state.get("psychological_portraits", {})
-            )
+            # 获取学生特征向量（画像版本未变化时复用状态中已计算的向量），每份病历使用新的向量ID
+            vector_data = VectorUtils.for_new_record(VectorUtils.get_student_feature_vector(state))
 
             # 存储向量并更新索引，关联到病历
             vector_id = await memory_manager.create_student_vector(student_id, vector_data, record_id)
@@ -2,10 +2,13 @@
 import os
 from typing import List, Dict, Any
 import asyncio
+# 需要在导入其他项目模块之前导入，才能统计它们的导入耗时
+from src.utils.startup_profiler import profiler, PROFILE_FLAG
 from src.system import System
 from src.utils.logger import logger
 from src.utils.exceptions import ConsultationError
 from src.memory.system_initializer import MemorySystemInitializer
+from src.utils.therapist_config import load_therapist_config
 import json
 import argparse
 import sys
@@ -15,6 +18,7 @@ def parse_args():
     """命令行参数解析"""
     parser = argparse.ArgumentParser(description="心理咨询系统")
     parser.add_argument('--ablation', type=str, required=True, help='ablation parameters, e.g., "none" for no ablation,  "wo-profiler" for without profiler, "wo-memory" for without memory')
+    parser.add_argument(PROFILE_FLAG, action='store_true', help='print per-module import time and init phase timings')
     return parser.parse_args()
 
 async def load_student_configs() -> List[Dict[str, Any]]:
@@ -56,31 +60,12 @@ async def load_student_configs() -> List[Dict[str, Any]]:
 async def load_therapist_configs() -> Dict[str, Any]:
     """加载心理咨询师配置数据
 
-    从src目录下的therapists_config.json文件加载所有咨询师的配置数据
+    从src目录下的therapists_config.json文件加载所有咨询师的配置数据（进程内只读取一次）
 
     Returns:
         Dict[str, Any]: 咨询师配置，包含所有流派信息
     """
-    try:
-        # 确定配置文件路径
-        config_file = os.path.join(os.path.dirname(__file__), "therapists_config.json")
-
-        # 检查文件是否存在
-        if not os.path.exists(config_file):
-            logger.warning(f"未找到咨询师配置文件: {config_file}")
-            return {"therapists": []}
-
-        # 从文件加载咨询师配置
-        with open(config_file, 'r', encoding='utf-8') as f:
-            therapist_configs = json.load(f)
-
-        therapist_count = len(therapist_configs.get("therapists", []))
-        logger.info(f"成功加载了 {therapist_count} 个心理咨询师配置")
-        return therapist_configs
-
-    except Exception as e:
-        logger.error(f"加载咨询师配置失败: {str(e)}")
-        return {"therapists": []}
+    return {"therapists": load_therapist_config().therapist_configs()}
 
 
 def _create_default_configs() -> List[Dict[str, Any]]:
@@ -121,9 +106,13 @@ def _create_default_configs() -> List[Dict[str, Any]]:
 
 async def create_app(mode: str = "consultation", ablation_str = 'none') -> System:
     try:
+        # 咨询师配置只加载一次，由记忆系统和咨询师工厂共享
+        therapist_config = load_therapist_config()
+
         # 首先初始化记忆系统
         logger.info("初始化记忆系统...")
-        memory_manager = await MemorySystemInitializer.initialize_memory_system()
+        with profiler.phase("initialize_memory_system"):
+            memory_manager = await MemorySystemInitializer.initialize_memory_system(therapist_config)
         logger.info("记忆系统初始化完成")
 
         # 加载学生配置(训练模式需要)
@@ -137,7 +126,8 @@ async def create_app(mode: str = "consultation", ablation_str = 'none') -> Syste
             memory_manager=memory_manager
         )
 
-        await system.initialize()
+        with profiler.phase("system.initialize"):
+            await system.initialize()
         return system
 
     except Exception as e:
@@ -164,6 +154,8 @@ async def main():
         # 修改模式
         app = await create_app(mode="consultation", ablation_str=ablation_str)
         # app = await create_app(mode="training", ablation_str=ablation_str)
+        if args.profile_startup:
+            logger.info("\n" + profiler.report())
         
         # 运行系统
         result = await app.run()
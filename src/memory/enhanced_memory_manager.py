@@ -1,20 +1,31 @@
 # src/memory/enhanced_memory_manager.py
 import traceback
 import os
-import json
+import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import time
 from pathlib import Path
 
 from src.memory.json_store import JSONMemoryStore
-from src.memory.long_term_store import LongTermMemoryStore
+from src.memory.long_term_store import create_long_term_store
 from src.memory.initializer import MemoryInitializer
+from src.memory.lexical_index import LexicalIndexStore, fuse_scores
+from src.memory.skill_consolidator import SkillUsageTracker, SkillConsolidator
+from src.memory.record_index import MedicalRecordIndex, RecordCursor
+from src.memory.outcome_model import TherapyOutcomeModel
+from src.memory.student_vector_index import StudentVectorIndex
 from src.schemas.memory_schemas import SkillMemory, MedicalRecord
+from src.utils.config import Config
+from src.utils.therapist_config import TherapistConfig, load_therapist_config
 from src.utils.logger import logger
 from src.utils.exceptions import StateError
 
 
+# 混合检索时每路召回的候选数量为 limit 的倍数
+HYBRID_CANDIDATE_FACTOR = 4
+
+
 def _get_skill_collection_name(agent_type: str, therapy_type: Optional[str] = None) -> str:
     """获取技能集合名称"""
     if agent_type == "profiler":
@@ -39,61 +50,81 @@ def _sanitize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
+def _build_skill_metadata(agent_type: str, therapy_type: Optional[str] = None) -> Dict[str, Any]:
+    """构建技能记忆在向量数据库中的元数据"""
+    return _sanitize_metadata({
+        "agent_type": agent_type,
+        "therapy_type": therapy_type if therapy_type else "none",
+        "updated_at": datetime.now().isoformat()
+    })
+
+
 class EnhancedMemoryManager:
     """增强型记忆管理器 - 同时管理JSON文件和向量数据库"""
 
-    def __init__(self):
-        """初始化增强型记忆管理器"""
-        # 创建JSON存储和向量存储
-        self.json_store = JSONMemoryStore()
-        self.vector_store = LongTermMemoryStore()
+    def __init__(self, verify_writes: Optional[bool] = None, base_dir: Optional[str] = None,
+                 therapist_config: Optional[TherapistConfig] = None):
+        """
+        初始化增强型记忆管理器
 
-        # 创建记忆初始化器
-        self.initializer = MemoryInitializer(
-            json_store=self.json_store,
-            vector_store=self.vector_store
-        )
+        Args:
+            verify_writes: 写入技能记忆后是否回读验证，默认读取配置 MEMORY_VERIFY_WRITES
+            base_dir: 记忆数据根目录（其下为json-memories和long-term-memories），
+                      为None时使用各存储的默认路径
+            therapist_config: 咨询师配置，为None时加载默认配置文件；同一个配置对象注入到各存储
+        """
+        self.therapist_config = therapist_config or load_therapist_config()
 
-        # 获取配置的治疗师流派
-        self.therapy_types = self._get_therapist_types()
+        # 创建JSON存储和向量存储
+        if base_dir is None:
+            self.json_store = JSONMemoryStore(therapist_config=self.therapist_config)
+            self.vector_store = create_long_term_store(therapist_config=self.therapist_config)
+        else:
+            self.json_store = JSONMemoryStore(os.path.join(base_dir, "json-memories"),
+                                              therapist_config=self.therapist_config)
+            self.vector_store = create_long_term_store(os.path.join(base_dir, "long-term-memories"),
+                                                       therapist_config=self.therapist_config)
 
-        # 更新集合映射，包含所有治疗师流派
-        self._collection_mapping = self._create_collection_mapping()
+        # 技能、病历和学生特征文本的词法倒排索引，保存在JSON记忆目录下
+        self.lexical_index = LexicalIndexStore(self.json_store.base_dir.joinpath("lexical"))
+        self.hybrid_alpha = Config.MEMORY_HYBRID_ALPHA
 
-    def _get_therapist_types(self) -> List[str]:
-        """
-        从配置文件获取所有的治疗师流派类型
+        # 医疗记录按学生、治疗流派和创建时间的二级索引（SQLite）
+        self.record_index = MedicalRecordIndex(self.json_store.base_dir)
 
-        Returns:
-            List[str]: 治疗师流派类型列表
-        """
-        # 默认流派
-        therapy_types = ["cbt", "psychodynamic"]
+        # 按特征桶聚合的治疗效果模型（SQLite），随病历写入增量更新
+        self.outcome_model = TherapyOutcomeModel(self.json_store.base_dir, Config.THERAPY_PRIOR_STRENGTH)
 
-        try:
-            # 尝试加载治疗师配置文件
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
+        # 技能使用统计和后台整理（近似重复合并、容量淘汰）
+        self.skill_usage = SkillUsageTracker(self.json_store.base_dir)
+        self.skill_consolidator = SkillConsolidator(self)
 
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+        # 写入验证只在调试时开启，避免每次写入多一次向量数据库读取
+        self.verify_writes = Config.MEMORY_VERIFY_WRITES if verify_writes is None else verify_writes
 
-                # 提取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
+        # 尚未完成的后台JSON写入任务
+        self._pending_json_writes: set = set()
+        # 按提交顺序执行后台JSON写入，保证同一文档的多次写入不会乱序
+        self._json_write_lock = asyncio.Lock()
+        # 技能集合的写锁：单条技能写入与整理结果的回写互斥，整理时可以在锁内校验快照是否过期
+        self._skill_write_locks: Dict[str, asyncio.Lock] = {}
 
-                logger.info(f"记忆管理器: 从配置文件加载了 {len(therapy_types)} 个治疗流派")
+        # 学生特征向量ID -> (学生ID, 病历ID) 的索引（SQLite）
+        self.vector_index = StudentVectorIndex(self.json_store.base_dir)
 
-        except Exception as e:
-            logger.warning(f"记忆管理器: 加载治疗师配置失败: {str(e)}，将使用默认流派")
+        # 创建记忆初始化器
+        self.initializer = MemoryInitializer(
+            json_store=self.json_store,
+            vector_store=self.vector_store,
+            vector_index=self.vector_index,
+            therapist_config=self.therapist_config
+        )
 
-        return therapy_types
+        # 配置的治疗师流派
+        self.therapy_types = list(self.therapist_config.therapy_types)
+
+        # 更新集合映射，包含所有治疗师流派
+        self._collection_mapping = self._create_collection_mapping()
 
     def _create_collection_mapping(self) -> Dict[str, str]:
         """
@@ -119,46 +150,147 @@ class EnhancedMemoryManager:
         try:
             # 使用初始化器同步JSON和向量数据库
             await self.initializer.initialize()
+            # 按JSON同步清单增量更新词法索引、医疗记录索引和治疗效果模型
+            await asyncio.to_thread(self._sync_lexical_index)
+            await asyncio.to_thread(self.record_index.sync, self.json_store)
+            await asyncio.to_thread(self.outcome_model.sync, self.json_store)
             logger.info("记忆系统初始化成功，JSON和向量数据库已同步")
         except Exception as e:
             logger.error(f"记忆系统初始化失败: {str(e)}")
             traceback.print_exc()
             raise StateError("记忆初始化失败") from e
 
+    def _sync_lexical_index(self):
+        """将所有技能集合、病历和学生特征文本同步到词法索引"""
+        collections = list(self._collection_mapping.values()) + ["student_vectors"]
+        for collection_name in collections:
+            try:
+                self.lexical_index.sync_collection(self.json_store, collection_name)
+            except Exception as e:
+                logger.warning(f"同步词法索引 {collection_name} 失败: {str(e)}")
+
+    async def _index_documents(self, collection_name: str, documents: List[Dict[str, Any]]):
+        """增量更新词法索引，失败时只记录日志（启动同步会补齐）"""
+        try:
+            await asyncio.to_thread(self.lexical_index.index_documents, collection_name, documents)
+        except Exception as e:
+            logger.warning(f"更新词法索引 {collection_name} 失败: {str(e)}")
+
+    async def hybrid_search(self, collection_name: str, query_text: str,
+                            query_vector: Optional[List[float]] = None, limit: int = 5,
+                            include: Optional[List[str]] = None,
+                            candidate_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        混合检索：BM25词法分数与向量相似度加权融合，没有查询向量时只使用词法分数
+
+        Args:
+            collection_name: 集合名称
+            query_text: 查询文本
+            query_vector: 查询向量，嵌入服务不可用时为None
+            limit: 返回数量
+            include: 需要返回的字段，为None时返回完整文档
+            candidate_ids: 只在这些文档中检索（仅限制词法召回）
+
+        Returns:
+            List[Dict[str, Any]]: 文档列表，similarity为融合分数
+        """
+        candidates = limit * HYBRID_CANDIDATE_FACTOR
+        lexical_hits = await asyncio.to_thread(
+            self.lexical_index.search, collection_name, query_text, candidates, candidate_ids
+        )
+
+        vector_hits = []
+        if query_vector is not None:
+            results = await self.vector_store.search_documents(
+                collection_name,
+                query_vector=query_vector,
+                limit=candidates,
+                include=["id", "similarity"]
+            )
+            vector_hits = [(doc["id"], doc.get("similarity", 0.0)) for doc in results]
+
+        alpha = self.hybrid_alpha if vector_hits else 0.0
+        ranked = fuse_scores(vector_hits, lexical_hits, alpha)[:limit]
+        if not ranked:
+            return []
+
+        # 只为最终入选的文档读取正文
+        fetch_fields = None if include is None else list(set(include) | {"id"})
+        documents = await self.vector_store.get_documents(
+            collection_name, [doc_id for doc_id, _ in ranked], include=fetch_fields
+        )
+        # 嵌入服务不可用时写入的文档可能不在向量数据库中（没有可写入的向量），改从JSON文件读取
+        found = {doc.get("id") for doc in documents}
+        missing = [doc_id for doc_id, _ in ranked if doc_id not in found]
+        if missing:
+            await self.flush_pending_writes()
+            documents += await asyncio.to_thread(self.json_store.get_documents, collection_name, missing)
+
+        by_id = {doc.get("id"): doc for doc in documents}
+        results = []
+        for doc_id, score in ranked:
+            doc = by_id.get(doc_id)
+            if doc is None:
+                continue
+            doc["similarity"] = score
+            if include is not None:
+                doc = {key: doc[key] for key in include if key in doc}
+            results.append(doc)
+        return results
+
     # === 技能记忆管理 ===
+    def has_skill_memory(self, agent_type: str, therapy_type: Optional[str] = None) -> bool:
+        """
+        技能集合中是否已有记忆
+
+        只检查向量数据库和JSON文件的同步清单，不打开集合也不读取文档
+
+        Args:
+            agent_type: 智能体类型
+            therapy_type: 治疗流派（仅therapist需要）
+
+        Returns:
+            bool: 任一侧清单非空时为True
+        """
+        collection_name = _get_skill_collection_name(agent_type, therapy_type)
+        return bool(self.vector_store.manifest.entries(collection_name)) or \
+            bool(self.json_store.get_manifest(collection_name))
+
     async def get_skill_memory(self, agent_type: str, therapy_type: Optional[str] = None,
-                               query_text: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
-        """获取技能记忆 (支持向量相似度检索)"""
+                               query_text: Optional[str] = None, limit: int = 5,
+                               include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """获取技能记忆 (支持向量与BM25词法的混合检索)
+
+        Args:
+            agent_type: 智能体类型
+            therapy_type: 治疗流派（仅therapist需要）
+            query_text: 查询文本，提供时进行混合检索；嵌入服务不可用时仍按词法分数返回top-k
+            limit: 返回数量（不带查询文本时返回使用频率和时间衰减得分最高的limit条）
+            include: 需要返回的字段（例如 ["id", "content", "similarity"]），为None时返回完整文档
+        """
         try:
             collection_name = _get_skill_collection_name(agent_type, therapy_type)
             logger.info(f"从集合 {collection_name} 获取技能记忆")
 
-            # 如果提供了查询文本，进行向量相似度检索
+            # 如果提供了查询文本，进行混合检索
             if query_text:
                 from src.utils.embedding_service import get_text_embedding
 
-                query_vector = get_text_embedding(query_text)
-
-                if query_vector is not None:
-                    # 使用向量相似度检索
-                    skills = await self.vector_store.search_documents(
-                        collection_name,
-                        query_vector=query_vector,
-                        filter_dict=None,
-                        limit=limit
-                    )
-                    logger.info(f"通过向量检索获取到 {len(skills)} 条相关技能记忆")
+                query_vector = await asyncio.to_thread(get_text_embedding, query_text)
+                if query_vector is None:
+                    logger.warning("查询文本向量化失败，仅使用词法检索")
+
+                skills = await self.hybrid_search(collection_name, query_text, query_vector, limit, include)
+                if skills:
+                    logger.info(f"通过混合检索获取到 {len(skills)} 条相关技能记忆")
+                    self.skill_usage.record_use(collection_name, [skill["id"] for skill in skills if "id" in skill])
+                    await self._save_skill_usage_if_due()
                     return skills
-                else:
-                    logger.warning("查询文本向量化失败，使用全量检索")
 
-            # 从向量数据库获取所有文档（或在向量化失败时的后备方案）
-            skills = await self.vector_store.search_documents(
-                collection_name,
-                query_vector=None,
-                filter_dict=None,
-                limit=100  # 获取所有技能记忆
-            )
+            # 没有查询文本或没有任何命中时，按得分返回limit条，保持提示词长度可控
+            doc_ids = await self.vector_store.get_document_ids(collection_name)
+            top_ids = self.skill_usage.rank(collection_name, doc_ids)[:limit]
+            skills = await self.vector_store.get_documents(collection_name, top_ids, include=include)
 
             logger.info(f"获取到 {len(skills)} 条技能记忆")
             return skills
@@ -178,7 +310,7 @@ class EnhancedMemoryManager:
 
     async def update_skill_memory(self, agent_type: str, skill_data: Dict[str, Any],
                                   therapy_type: Optional[str] = None) -> None:
-        """更新技能记忆 (先更新JSON文件，然后更新向量数据库)"""
+        """更新技能记忆 (向量数据库一次upsert，JSON文件在后台写入)"""
         try:
             collection_name = _get_skill_collection_name(agent_type, therapy_type)
             logger.info(f"准备更新集合 {collection_name} 中的技能记忆，ID: {skill_data['id']}")
@@ -195,10 +327,10 @@ class EnhancedMemoryManager:
             if "timestamp" not in full_skill_data:
                 full_skill_data["timestamp"] = datetime.now().timestamp()
 
-            # 对技能内容进行向量化
+            # 对技能内容进行向量化（同步HTTP调用，放到线程中执行以免阻塞事件循环）
             from src.utils.embedding_service import get_text_embedding
             skill_content = full_skill_data.get("content", "")
-            skill_vector = get_text_embedding(skill_content)
+            skill_vector = await asyncio.to_thread(get_text_embedding, skill_content)
 
             if skill_vector is not None:
                 full_skill_data["skill_vector"] = skill_vector
@@ -206,56 +338,146 @@ class EnhancedMemoryManager:
             else:
                 logger.warning(f"技能记忆向量化失败: {skill_data['id']}")
 
-            # 1. 首先更新JSON文件
-            success = self.json_store.add_document(collection_name, full_skill_data)
-            if not success:
-                raise StateError(f"更新JSON文件失败: {collection_name}/{skill_data['id']}")
-
-            # 2. 然后更新向量数据库
-            metadata = {
-                "agent_type": agent_type,
-                "therapy_type": therapy_type if therapy_type else "none",
-                "updated_at": datetime.now().isoformat()
-            }
-
-            # 清洗元数据
-            metadata = _sanitize_metadata(metadata)
+            metadata = _build_skill_metadata(agent_type, therapy_type)
             logger.debug(f"元数据: {metadata}")
 
-            # 检查文档是否已存在
-            existing_doc = await self.vector_store.get_document(collection_name, skill_data["id"])
-
-            if existing_doc:
-                logger.debug(f"文档 {skill_data['id']} 已存在，进行更新")
-                await self.vector_store.update_document(
+            async with self.skill_write_lock(collection_name):
+                # 1. 向量数据库原生upsert，一次往返完成添加或更新
+                await self.vector_store.upsert_documents(
                     collection_name,
-                    skill_data["id"],
-                    full_skill_data,
-                    metadata
+                    [skill_data["id"]],
+                    [full_skill_data],
+                    [metadata]
                 )
-                logger.info(f"向量数据库中的技能记忆已更新: {agent_type}")
-            else:
-                logger.debug(f"文档 {skill_data['id']} 不存在，进行添加")
-                await self.vector_store.add_document(
-                    collection_name,
-                    skill_data["id"],
-                    full_skill_data,
-                    metadata
-                )
-                logger.info(f"向量数据库中添加了新的技能记忆: {agent_type}")
+                logger.info(f"向量数据库中的技能记忆已写入: {agent_type}")
 
-            # 验证操作是否成功
-            verification = await self.vector_store.get_document(collection_name, skill_data["id"])
-            if verification:
-                logger.debug(f"验证成功: 文档 {skill_data['id']} 已正确存储到向量数据库")
-            else:
-                logger.warning(f"警告: 无法验证文档 {skill_data['id']} 是否正确存储到向量数据库")
+                # 增量更新词法索引
+                await self._index_documents(collection_name, [full_skill_data])
+
+                # 2. JSON文件在后台写入，不阻塞当前请求
+                self._schedule_json_write(collection_name, full_skill_data)
+
+            # 记录创建时间，新增技能足够多时在后台整理集合
+            self.skill_usage.record_created(collection_name, skill_data["id"], full_skill_data["timestamp"])
+            await self._save_skill_usage_if_due()
+            self.skill_consolidator.note_write(collection_name)
+
+            # 调试模式下验证操作是否成功
+            if self.verify_writes:
+                verification = await self.vector_store.get_document(collection_name, skill_data["id"])
+                if verification:
+                    logger.debug(f"验证成功: 文档 {skill_data['id']} 已正确存储到向量数据库")
+                else:
+                    logger.warning(f"警告: 无法验证文档 {skill_data['id']} 是否正确存储到向量数据库")
 
         except Exception as e:
             logger.error(f"更新技能记忆失败: {str(e)}")
             traceback.print_exc()
             raise StateError("技能记忆更新失败") from e
 
+    def _schedule_json_write(self, collection_name: str, document: Dict[str, Any]):
+        """
+        在后台线程中把文档写入JSON文件
+
+        Args:
+            collection_name: 集合名称
+            document: 文档
+        """
+        async def _write():
+            async with self._json_write_lock:
+                success = await asyncio.to_thread(self.json_store.add_document, collection_name, document)
+            if not success:
+                logger.error(f"后台写入JSON文件失败: {collection_name}/{document.get('id')}")
+
+        task = asyncio.create_task(_write())
+        self._pending_json_writes.add(task)
+        task.add_done_callback(self._pending_json_writes.discard)
+
+    def skill_write_lock(self, collection_name: str) -> asyncio.Lock:
+        """获取技能集合的写锁"""
+        if collection_name not in self._skill_write_locks:
+            self._skill_write_locks[collection_name] = asyncio.Lock()
+        return self._skill_write_locks[collection_name]
+
+    async def _save_skill_usage_if_due(self):
+        """距上次保存足够久时在后台线程中保存技能使用统计"""
+        if self.skill_usage.save_due():
+            await asyncio.to_thread(self.skill_usage.save)
+            await asyncio.to_thread(self.json_store.save_manifest)
+
+    async def replace_skills(self, collection_name: str, documents: List[Dict[str, Any]],
+                             removed_ids: List[str]):
+        """
+        批量写入合并后的技能并删除被合并或淘汰的技能（向量数据库、JSON文件和词法索引）
+
+        Args:
+            collection_name: 技能集合名称
+            documents: 需要写入的技能
+            removed_ids: 需要删除的技能ID
+        """
+        async with self.skill_write_lock(collection_name):
+            await self.write_skill_changes(collection_name, documents, removed_ids)
+
+    async def write_skill_changes(self, collection_name: str, documents: List[Dict[str, Any]],
+                                  removed_ids: List[str]):
+        """
+        replace_skills 的写入部分，调用方需持有该集合的 skill_write_lock
+
+        Args:
+            collection_name: 技能集合名称
+            documents: 需要写入的技能
+            removed_ids: 需要删除的技能ID
+        """
+        # 先等待后台JSON写入完成，避免旧的写入覆盖本次结果
+        await self.flush_pending_writes()
+
+        if documents:
+            metadatas = [_build_skill_metadata(doc.get("agent_type", "none"), doc.get("therapy_type"))
+                         for doc in documents]
+            await self.vector_store.upsert_documents(
+                collection_name, [doc["id"] for doc in documents], documents, metadatas
+            )
+        if removed_ids:
+            await self.vector_store.delete_documents(collection_name, removed_ids)
+
+        async with self._json_write_lock:
+            if documents:
+                await asyncio.to_thread(self.json_store.add_documents, collection_name, documents)
+            if removed_ids:
+                await asyncio.to_thread(self.json_store.remove_documents, collection_name, removed_ids)
+
+        await self._index_documents(collection_name, documents)
+        await asyncio.to_thread(self.lexical_index.remove_documents, collection_name, removed_ids)
+
+    async def consolidate_skills(self, collection_name: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        立即整理技能集合
+
+        Args:
+            collection_name: 集合名称，为None时整理所有技能集合
+
+        Returns:
+            Dict[str, Dict[str, int]]: 集合名称 -> 整理结果
+        """
+        names = [collection_name] if collection_name else [
+            name for name in self._collection_mapping.values() if name.endswith("_skills")
+        ]
+        results = {}
+        for name in names:
+            results[name] = await self.skill_consolidator.schedule(name)
+        return results
+
+    async def flush_pending_writes(self):
+        """等待所有后台JSON写入完成"""
+        if not self._pending_json_writes:
+            return
+        pending = list(self._pending_json_writes)
+        logger.info(f"等待 {len(pending)} 个后台JSON写入任务完成")
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"后台JSON写入任务失败: {str(result)}")
+
     # === 电子病历管理 ===
     async def create_medical_record(self, student_id: str, record_data) -> str:
         """创建电子病历 (先存入JSON，然后存入向量数据库)"""
@@ -293,6 +515,9 @@ class EnhancedMemoryManager:
                 full_record,
                 metadata
             )
+            await self._index_documents(collection_name, [full_record])
+            await asyncio.to_thread(self.record_index.upsert, [full_record])
+            await asyncio.to_thread(self.outcome_model.upsert, [full_record])
             logger.info(f"创建了学生 {student_id} 的医疗记录: {record_id}")
             return record_id
         except Exception as e:
@@ -345,6 +570,9 @@ class EnhancedMemoryManager:
                 full_record,
                 metadata
             )
+            await self._index_documents(collection_name, [full_record])
+            await asyncio.to_thread(self.record_index.upsert, [full_record])
+            await asyncio.to_thread(self.outcome_model.upsert, [full_record])
             logger.info(f"更新了医疗记录: {record_id}")
             return True
         except Exception as e:
@@ -352,21 +580,37 @@ class EnhancedMemoryManager:
             traceback.print_exc()
             return False
 
-    async def get_student_medical_records(self, student_id: str) -> List[Dict[str, Any]]:
-        """获取学生的所有医疗记录 (从向量数据库查询)"""
-        try:
-            # 构建过滤条件
-            filter_dict = {"student_id": student_id}
+    async def recommend_therapy(self, basic_info: Dict[str, Any],
+                                therapy_types: List[str]) -> Dict[str, Any]:
+        """
+        根据治疗效果模型推荐治疗流派（只读取学生所在的特征桶，与病历数量无关）
 
-            # 从向量数据库查询
-            records = await self.vector_store.search_documents(
-                "medical_records",
-                query="",
-                filter_dict=filter_dict,
-                limit=100
-            )
+        Args:
+            basic_info: 学生基本信息
+            therapy_types: 候选治疗流派
+
+        Returns:
+            Dict[str, Any]: {"therapy_type", "expected_improvement", "confidence", "estimates"}
+        """
+        return await asyncio.to_thread(self.outcome_model.recommend, basic_info, therapy_types)
+
+    async def get_student_medical_records(self, student_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        获取学生的医疗记录（通过二级索引定位，再批量读取）
+
+        Args:
+            student_id: 学生ID
+            limit: 最多返回的数量（取最新的limit条），为None时返回全部
 
-            return records
+        Returns:
+            List[Dict[str, Any]]: 按创建时间从早到晚排列的医疗记录
+        """
+        try:
+            record_ids, _ = await asyncio.to_thread(
+                self.record_index.query, student_id=student_id, limit=limit, descending=True
+            )
+            record_ids.reverse()
+            return await self.get_medical_records(record_ids)
         except Exception as e:
             logger.error(f"查询学生医疗记录失败: {str(e)}")
 
@@ -377,9 +621,97 @@ class EnhancedMemoryManager:
             except:
                 return []
 
+    async def query_medical_records(self, student_id: Optional[str] = None, therapy_type: Optional[str] = None,
+                                    start: Optional[float] = None, end: Optional[float] = None,
+                                    page_size: int = 50, cursor: Optional[RecordCursor] = None,
+                                    descending: bool = True) -> Dict[str, Any]:
+        """
+        按学生、治疗流派和创建时间范围分页查询医疗记录
+
+        Args:
+            student_id: 学生ID
+            therapy_type: 治疗流派（therapyType）
+            start: 创建时间下限（时间戳，包含）
+            end: 创建时间上限（时间戳，不包含）
+            page_size: 每页数量
+            cursor: 上一页返回的next_cursor
+            descending: 是否从新到旧排列
+
+        Returns:
+            Dict[str, Any]: {"records": 医疗记录列表, "next_cursor": 下一页游标（没有下一页时为None）}
+        """
+        record_ids, next_cursor = await asyncio.to_thread(
+            self.record_index.query, student_id, therapy_type, start, end, page_size, cursor, descending
+        )
+        return {"records": await self.get_medical_records(record_ids), "next_cursor": next_cursor}
+
+    async def get_medical_records(self, record_ids: List[str],
+                                  fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        批量获取医疗记录（一次向量数据库往返，缺失的从JSON文件补齐）
+
+        Args:
+            record_ids: 病历ID列表
+            fields: 需要返回的字段（例如 ["therapyType", "totalImprovementScore"]），
+                    为None时返回完整记录；结果中总是包含id
+
+        Returns:
+            List[Dict[str, Any]]: 按record_ids顺序排列的医疗记录，不存在的记录被跳过
+        """
+        if not record_ids:
+            return []
+        include = None if fields is None else ["id"] + [field for field in fields if field != "id"]
+
+        try:
+            records = await self.vector_store.get_documents("medical_records", record_ids, include=include)
+        except Exception as e:
+            logger.error(f"批量获取医疗记录失败: {str(e)}")
+            records = []
+
+        if len(records) < len(record_ids):
+            found = {record.get("id") for record in records}
+            missing = [record_id for record_id in record_ids if record_id not in found]
+            fallback = self.json_store.get_documents("medical_records", missing)
+            if include is not None:
+                fallback = [{key: doc[key] for key in include if key in doc} for doc in fallback]
+            by_id = {record.get("id"): record for record in records}
+            by_id.update((doc["id"], doc) for doc in fallback)
+            records = [by_id[record_id] for record_id in record_ids if record_id in by_id]
+        return records
+
+    async def search_medical_records(self, query_text: str, student_id: Optional[str] = None,
+                                     limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        按文本检索医疗记录（BM25词法检索，不依赖嵌入服务）
+
+        Args:
+            query_text: 查询文本
+            student_id: 只检索该学生的记录
+            limit: 返回数量
+
+        Returns:
+            List[Dict[str, Any]]: 医疗记录列表，similarity为归一化的词法分数
+        """
+        try:
+            candidate_ids = None
+            if student_id is not None:
+                candidate_ids, _ = await asyncio.to_thread(
+                    self.record_index.query, student_id=student_id, limit=None
+                )
+            return await self.hybrid_search("medical_records", query_text, None, limit,
+                                            candidate_ids=candidate_ids)
+        except Exception as e:
+            logger.error(f"检索医疗记录失败: {str(e)}")
+            return []
+
     async def persist_memories(self):
         """确保记忆数据被持久化"""
         try:
+            # 先等待后台整理和JSON写入完成
+            await self.skill_consolidator.wait_idle()
+            await self.flush_pending_writes()
+            await asyncio.to_thread(self.skill_usage.save)
+
             # 在ChromaDB 0.6.3中，数据会自动持久化
             # 此方法保留为兼容接口
             await self.vector_store.cleanup()
@@ -4,14 +4,17 @@
 负责检查JSON文件和向量数据库，并在必要时执行同步
 """
 import os
-import json
-import shutil
+import asyncio
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional
 
 from src.memory.json_store import JSONMemoryStore
-from src.memory.long_term_store import LongTermMemoryStore
+from src.memory.long_term_store import create_long_term_store, BATCH_SIZE
+from src.memory.vector_store_base import VectorStoreBase
+from src.memory.sync_manifest import diff_manifests
+from src.memory.student_vector_index import StudentVectorIndex
+from src.utils.therapist_config import TherapistConfig, load_therapist_config
 from src.utils.logger import logger
 
 
@@ -22,64 +25,41 @@ class MemoryInitializer:
     """
 
     def __init__(self, json_store: Optional[JSONMemoryStore] = None,
-                 vector_store: Optional[LongTermMemoryStore] = None):
+                 vector_store: Optional[VectorStoreBase] = None,
+                 vector_index: Optional[StudentVectorIndex] = None,
+                 therapist_config: Optional[TherapistConfig] = None):
         """
         初始化记忆系统初始化器
 
         Args:
             json_store: 可选的JSON存储对象，如果为None则创建新的
             vector_store: 可选的向量存储对象，如果为None则创建新的
+            vector_index: 可选的学生特征向量索引，如果为None则在JSON目录下打开
+            therapist_config: 咨询师配置，为None时加载默认配置文件
         """
-        self.json_store = json_store if json_store else JSONMemoryStore()
-        self.vector_store = vector_store if vector_store else LongTermMemoryStore()
+        therapist_config = therapist_config or load_therapist_config()
+        self.json_store = json_store if json_store else JSONMemoryStore(therapist_config=therapist_config)
+        self.vector_store = vector_store if vector_store else create_long_term_store(
+            therapist_config=therapist_config)
+        self.vector_index = vector_index if vector_index else StudentVectorIndex(self.json_store.base_dir)
 
         # 获取向量数据库目录路径
         self.vector_db_dir = Path(self.vector_store.persist_directory)
 
         logger.info(f"记忆初始化器创建完成，JSON路径: {self.json_store.base_dir}, 向量库路径: {self.vector_db_dir}")
 
-        # 获取可用的治疗流派
-        self.therapy_types = self._get_available_therapy_types()
+        # 可用的治疗流派
+        self.therapy_types = list(therapist_config.therapy_types)
 
-    def _get_available_therapy_types(self) -> List[str]:
-        """
-        从配置文件获取所有可用的治疗流派
-
-        Returns:
-            List[str]: 可用的治疗流派列表
-        """
-        therapy_types = ["cbt", "psychodynamic"]  # 默认支持的流派
-
-        try:
-            # 尝试从配置文件加载流派
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 获取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
-
-                logger.info(f"从配置文件加载了 {len(therapy_types)} 个治疗流派")
-
-        except Exception as e:
-            logger.warning(f"加载治疗流派配置失败: {str(e)}，将使用默认流派")
-
-        return therapy_types
-
-    async def initialize(self):
+    async def initialize(self, verify: bool = False):
         """
         初始化记忆系统
 
-        检查JSON和向量数据库状态，执行必要的同步
+        检查JSON和向量数据库状态，执行必要的同步。向量数据库的集合在首次使用时才打开，
+        两侧清单一致的集合不会被打开
+
+        Args:
+            verify: 是否列出向量数据库中的文档ID校验清单（较慢，用于手动完整同步）
         """
         # 检查向量数据库目录是否存在
         vector_db_exists = self.vector_db_dir.exists() and any(os.listdir(self.vector_db_dir))
@@ -90,18 +70,15 @@ class MemoryInitializer:
         else:
             logger.info("向量数据库已存在，检查是否需要更新")
 
-            # 获取所有集合
-            await self.vector_store.init_collections()
-
             # 执行增量同步确保两种存储保持一致
-            await self._sync_json_and_vector_db()
-
-        # 确保所有必要的集合都已创建
-        await self._ensure_all_collections()
+            await self._sync_json_and_vector_db(verify)
 
-    async def _sync_json_and_vector_db(self):
+    async def _sync_json_and_vector_db(self, verify: bool = False):
         """
         同步JSON文件和向量数据库，确保两者数据一致
+
+        Args:
+            verify: 是否列出向量数据库中的文档ID校验清单
         """
         logger.info("开始同步JSON文件和向量数据库")
 
@@ -116,56 +93,62 @@ class MemoryInitializer:
         for therapy_type in self.therapy_types:
             collections.append(f"therapist_{therapy_type}_skills")
 
-        # 同步每个集合
-        for collection_name in collections:
-            await self._sync_collection(collection_name)
+        # 各集合互不影响，并发同步
+        await asyncio.gather(*(self._sync_collection(name, verify) for name in collections))
+        # 同步过程中的写入只更新了内存中的清单，这里统一保存一次
+        await self.vector_store.save_manifest()
+        await asyncio.to_thread(self.json_store.save_manifest)
 
-    async def _sync_collection(self, collection_name: str):
+    async def _sync_collection(self, collection_name: str, verify: bool = False):
         """
         同步单个集合
 
         Args:
             collection_name: 集合名称
+            verify: 是否先用向量数据库中实际存在的文档ID校正向量数据库一侧的清单
         """
         try:
             logger.info(f"同步集合: {collection_name}")
 
-            # 从JSON获取所有文档
-            json_docs = self.json_store.get_all_documents(collection_name)
-            if not json_docs:
+            # JSON一侧的清单在文件未变化时无需读取JSON文件
+            json_manifest = self.json_store.get_manifest(collection_name)
+            if not json_manifest:
                 logger.info(f"JSON文件 {collection_name} 为空，无需同步")
                 return
 
-            # 获取向量数据库中的所有文档
-            vector_docs = await self.vector_store.search_documents(
-                collection_name=collection_name,
-                query="",
-                filter_dict=None,
-                limit=10000  # 足够大的限制以获取所有文档
-            )
+            # 向量数据库的清单随每次写入更新，与JSON清单一致时无需打开集合
+            vector_manifest = await self.vector_store.get_manifest(collection_name)
+            diff = diff_manifests(json_manifest, vector_manifest)
+            if verify or diff["missing"] or diff["changed"]:
+                # 只获取向量数据库中的文档ID（include=[]），并据此校正向量数据库一侧的清单
+                vector_doc_ids = await self.vector_store.get_document_ids(collection_name)
+                vector_manifest = await self.vector_store.get_manifest(collection_name, live_ids=vector_doc_ids)
 
-            # 创建向量文档ID集合以便快速查找
-            vector_doc_ids = {doc.get("id") for doc in vector_docs if doc.get("id")}
+                # 清单中没有记录的已有文档视为需要重新写入
+                diff = diff_manifests(json_manifest, vector_manifest)
 
-            # 找出需要添加到向量数据库的文档
-            for doc in json_docs:
-                doc_id = doc.get("id")
-                if not doc_id:
-                    continue
+            pending_ids = diff["missing"] + diff["changed"]
+            if not pending_ids:
+                logger.info(f"集合 {collection_name} 已同步，共 {len(json_manifest)} 个文档")
+                return
 
-                if doc_id not in vector_doc_ids:
-                    logger.info(f"将文档 {doc_id} 从JSON同步到向量数据库")
+            logger.info(
+                f"集合 {collection_name} 需要同步 {len(pending_ids)} 个文档"
+                f"（缺失 {len(diff['missing'])}，已变化 {len(diff['changed'])}）"
+            )
 
-                    # 构建元数据
-                    metadata = self._build_metadata_for_document(collection_name, doc)
+            # 只读取需要同步的文档（附加向量矩阵中的向量，以便写入向量数据库）
+            pending_docs = self.json_store.get_documents(collection_name, pending_ids, with_vectors=True)
 
-                    # 添加到向量数据库
-                    await self.vector_store.add_document(
-                        collection_name=collection_name,
-                        doc_id=doc_id,
-                        content=doc,
-                        metadata=metadata
-                    )
+            # 按固定大小分批写入向量数据库
+            for start in range(0, len(pending_docs), BATCH_SIZE):
+                chunk = pending_docs[start:start + BATCH_SIZE]
+                await self.vector_store.upsert_documents(
+                    collection_name=collection_name,
+                    doc_ids=[doc["id"] for doc in chunk],
+                    contents=chunk,
+                    metadatas=[self._build_metadata_for_document(collection_name, doc) for doc in chunk]
+                )
 
         except Exception as e:
             logger.error(f"同步集合 {collection_name} 失败: {str(e)}")
@@ -202,47 +185,24 @@ class MemoryInitializer:
                 "type": "medical_record"
             }
         elif collection_name == "student_vectors":
+            # 学生和病历的关联保存在向量索引中，文档自身的metadata通常只有创建时间
+            entry = self.vector_index.get(doc.get("id", "")) or {}
             metadata = {
-                "student_id": doc.get("metadata", {}).get("student_id", ""),
+                "student_id": entry.get("student_id") or doc.get("metadata", {}).get("student_id", ""),
                 "created_at": doc.get("metadata", {}).get("created_at", ""),
-                "record_id": doc.get("metadata", {}).get("record_id", ""),
+                "record_id": entry.get("record_id") or doc.get("metadata", {}).get("record_id", ""),
                 "type": "student_vector"
             }
 
         return metadata
 
-    async def _ensure_all_collections(self):
-        """确保所有必要的集合都已创建"""
-        collections = [
-            "profiler_skills",
-            "medical_records",
-            "student_vectors"  # 添加学生特征向量集合
-        ]
-
-        # 添加所有治疗师流派的集合
-        for therapy_type in self.therapy_types:
-            collections.append(f"therapist_{therapy_type}_skills")
-
-        # 确保每个集合都存在于向量数据库中
-        for collection_name in collections:
-            if collection_name not in self.vector_store._collections:
-                try:
-                    self.vector_store._collections[collection_name] = self.vector_store.client.create_collection(
-                        name=collection_name
-                    )
-                    logger.info(f"创建了缺失的集合: {collection_name}")
-                except Exception as e:
-                    logger.error(f"创建集合 {collection_name} 失败: {str(e)}")
-
     async def rebuild_vector_db_from_json(self):
         """
         从JSON文件重建向量数据库
         """
-        # 如果向量数据库目录存在但为空，确保它是完全空的
-        if self.vector_db_dir.exists():
-            shutil.rmtree(self.vector_db_dir)
-            os.makedirs(self.vector_db_dir)
-            logger.info(f"清空并重新创建向量数据库目录: {self.vector_db_dir}")
+        # 通过存储后端清空所有集合（不直接删除正在使用的数据库目录）
+        await self.vector_store.reset()
+        logger.info(f"已清空向量数据库: {self.vector_db_dir}")
 
         # 初始化向量数据库集合
         await self.vector_store.init_collections()
@@ -270,75 +230,65 @@ class MemoryInitializer:
         logger.info("已从JSON文件重建完成向量数据库")
 
     async def _rebuild_student_vectors_if_needed(self):
-        """重建学生特征向量（如果需要）"""
+        """向量索引为空时从医疗记录重建学生特征向量"""
         try:
-            # 检查索引文件是否存在
-            index_path = Path(self.json_store.base_dir).joinpath("vector_index.json")
-            if not index_path.exists():
-                logger.info("向量索引文件不存在，将创建空索引文件")
-                with open(index_path, 'w', encoding='utf-8') as f:
-                    json.dump({}, f, ensure_ascii=False, indent=2)
+            if self.vector_index.count() > 0:
+                return
+
+            logger.info("向量索引为空，尝试从病历重建特征向量")
+
+            # 获取所有医疗记录
+            medical_records = self.json_store.get_all_documents("medical_records")
+            if not medical_records:
+                logger.info("没有医疗记录，无法重建特征向量")
                 return
 
-            # 读取索引文件
-            with open(index_path, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-
-            if not index_data:
-                logger.info("向量索引为空，尝试从病历重建特征向量")
-
-                # 获取所有医疗记录
-                medical_records = self.json_store.get_all_documents("medical_records")
-                if not medical_records:
-                    logger.info("没有医疗记录，无法重建特征向量")
-                    return
-
-                # 导入向量工具
-                from src.utils.vector_utils import VectorUtils
-
-                # 重建每个医疗记录的特征向量
-                for record in medical_records:
-                    student_id = record.get("studentId", record.get("student_id"))
-                    record_id = record.get("id")
-                    basic_info = record.get("basic_info", {})
-                    portrait = record.get("portrait", {})
-
-                    if not student_id or not record_id or not basic_info:
-                        continue
-
-                    # 创建特征向量
-                    vector_data = VectorUtils.create_student_feature_vector(basic_info, portrait)
-                    vector_id = vector_data["id"]
-
-                    # 添加到向量数据库
-                    metadata = {
-                        "student_id": student_id,
-                        "record_id": record_id,
-                        "created_at": vector_data.get("metadata", {}).get("created_at", ""),
-                        "type": "student_vector"
-                    }
-
-                    await self.vector_store.add_document(
-                        collection_name="student_vectors",
-                        doc_id=vector_id,
-                        content=vector_data,
-                        metadata=metadata
-                    )
-
-                    # 更新索引
-                    index_data[vector_id] = {
-                        "student_id": student_id,
-                        "record_id": record_id,
-                        "updated_at": datetime.now().timestamp()
-                    }
-
-                    logger.info(f"从病历 {record_id} 重建特征向量 {vector_id}")
-
-                # 保存更新后的索引
-                with open(index_path, 'w', encoding='utf-8') as f:
-                    json.dump(index_data, ensure_ascii=False, indent=2, fp=f)
-
-                logger.info(f"重建了 {len(index_data)} 个特征向量")
+            # 导入向量工具
+            from src.utils.vector_utils import VectorUtils
+
+            # 重建每个医疗记录的特征向量
+            rebuilt_vectors = []
+            index_entries = []
+            for record in medical_records:
+                student_id = record.get("studentId", record.get("student_id"))
+                record_id = record.get("id")
+                basic_info = record.get("basic_info", {})
+                portrait = record.get("portrait", {})
+
+                if not student_id or not record_id or not basic_info:
+                    continue
+
+                # 创建特征向量
+                vector_data = VectorUtils.create_student_feature_vector(basic_info, portrait)
+                vector_id = vector_data["id"]
+
+                # 构建元数据，稍后批量写入向量数据库
+                metadata = {
+                    "student_id": student_id,
+                    "record_id": record_id,
+                    "created_at": vector_data.get("metadata", {}).get("created_at", ""),
+                    "type": "student_vector"
+                }
+
+                rebuilt_vectors.append((vector_id, vector_data, metadata))
+                index_entries.append((vector_id, student_id, record_id, datetime.now().timestamp()))
+
+                logger.info(f"从病历 {record_id} 重建特征向量 {vector_id}")
+
+            # 分批写入向量数据库
+            for start in range(0, len(rebuilt_vectors), BATCH_SIZE):
+                ids, contents, metadatas = zip(*rebuilt_vectors[start:start + BATCH_SIZE])
+                await self.vector_store.add_documents(
+                    collection_name="student_vectors",
+                    doc_ids=list(ids),
+                    contents=list(contents),
+                    metadatas=list(metadatas)
+                )
+
+            # 一次事务写入索引
+            self.vector_index.put_many(index_entries)
+
+            logger.info(f"重建了 {len(index_entries)} 个特征向量")
         except Exception as e:
             logger.error(f"重建特征向量失败: {str(e)}")
 
@@ -358,40 +308,16 @@ class MemoryInitializer:
 
         logger.info(f"从JSON导入 {len(formatted_docs)} 条文档到向量数据库集合: {collection_name}")
 
-        # 遍历文档并添加到向量数据库
-        for doc in formatted_docs:
-            doc_id = doc["id"]
-            # 构建元数据
-            metadata = {}
-
-            # 根据集合类型设置适当的元数据
-            if collection_name == "profiler_skills":
-                metadata = {
-                    "agent_type": "profiler",
-                    "updated_at": doc.get("timestamp", ""),
-                }
-            elif collection_name.startswith("therapist_"):
-                therapy_type = collection_name.split("_")[1]
-                metadata = {
-                    "agent_type": "therapist",
-                    "therapy_type": therapy_type,
-                    "updated_at": doc.get("timestamp", ""),
-                }
-            elif collection_name == "medical_records":
-                metadata = {
-                    "student_id": doc.get("student_id", ""),
-                    "created_at": doc.get("created_at", ""),
-                    "type": "medical_record"
-                }
-
-            # 将文档添加到向量数据库
+        # 按固定大小分批添加到向量数据库
+        for start in range(0, len(formatted_docs), BATCH_SIZE):
+            chunk = formatted_docs[start:start + BATCH_SIZE]
             try:
-                await self.vector_store.add_document(
+                await self.vector_store.add_documents(
                     collection_name=collection_name,
-                    doc_id=doc_id,
-                    content=doc,
-                    metadata=metadata
+                    doc_ids=[doc["id"] for doc in chunk],
+                    contents=chunk,
+                    metadatas=[self._build_metadata_for_document(collection_name, doc) for doc in chunk]
                 )
-                logger.info(f"已导入文档 {doc_id} 到集合 {collection_name}")
+                logger.info(f"已导入 {start + len(chunk)}/{len(formatted_docs)} 条文档到集合 {collection_name}")
             except Exception as e:
-                logger.error(f"导入文档 {doc_id} 到集合 {collection_name} 时出错: {str(e)}")
\ No newline at end of file
+                logger.error(f"导入集合 {collection_name} 的第 {start} 至 {start + len(chunk)} 条文档时出错: {str(e)}")
@@ -6,24 +6,43 @@ JSON记忆存储功能
 import os
 import json
 import time
-from typing import Dict, Any, List, Optional
+import tempfile
+import threading
+from functools import wraps
+from typing import Dict, Any, List, Optional, Iterable
 from pathlib import Path
 
+from src.memory.vector_matrix_store import VectorMatrixStore, VectorMatrix, get_vector_field
+from src.memory.sync_manifest import SyncManifest, ManifestEntries
+from src.utils.therapist_config import TherapistConfig, load_therapist_config
 from src.utils.logger import logger
 
 
+def _synchronized(method):
+    """串行化对JSON文件的读-改-写操作（写入可能来自后台线程）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class JSONMemoryStore:
     """JSON记忆存储管理器
 
     负责读写JSON文件作为向量数据库的中间表示
+    嵌入向量不写入JSON，而是保存在base_dir/vectors下的内存映射矩阵中
     """
 
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(self, base_dir: Optional[str] = None, vector_dtype: str = "float32",
+                 therapist_config: Optional[TherapistConfig] = None):
         """
         初始化JSON记忆存储
 
         Args:
             base_dir: JSON文件基础目录，默认为src/json-memories
+            vector_dtype: 向量矩阵的数据类型，float32或float16
+            therapist_config: 咨询师配置，为None时加载默认配置文件
         """
         # 如果没有指定基础目录，使用默认路径
         if base_dir is None:
@@ -35,8 +54,18 @@ class JSONMemoryStore:
         # 确保基础目录存在
         os.makedirs(self.base_dir, exist_ok=True)
 
-        # 获取可用的治疗流派
-        self.therapy_types = self._get_available_therapy_types()
+        # 写操作锁
+        self._write_lock = threading.RLock()
+
+        # 嵌入向量矩阵存储
+        self.vectors = VectorMatrixStore(self.base_dir.joinpath("vectors"), dtype=vector_dtype)
+
+        # 同步清单（文档ID、内容哈希、更新时间），每次写文件时在内存中更新，由 save_manifest 保存
+        self.manifest = SyncManifest.open(self.base_dir)
+
+        # 可用的治疗流派
+        therapist_config = therapist_config or load_therapist_config()
+        self.therapy_types = list(therapist_config.therapy_types)
 
         # 各类记忆的文件路径
         self.memory_files = self._initialize_memory_files()
@@ -46,40 +75,6 @@ class JSONMemoryStore:
 
         logger.info(f"JSON记忆存储初始化完成，基础目录: {self.base_dir}")
 
-    def _get_available_therapy_types(self) -> List[str]:
-        """
-        从配置文件获取所有可用的治疗流派
-
-        Returns:
-            List[str]: 可用的治疗流派列表
-        """
-        therapy_types = ["cbt", "psychodynamic"]  # 默认支持的流派
-
-        try:
-            # 尝试从配置文件加载流派
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 获取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
-
-                logger.info(f"从配置文件加载了 {len(therapy_types)} 个治疗流派")
-
-        except Exception as e:
-            logger.info(f"加载治疗流派配置失败: {str(e)}，将使用默认流派")
-
-        return therapy_types
-
     def _initialize_memory_files(self) -> Dict[str, Path]:
         """
         初始化记忆文件路径，包括动态加载的治疗流派
@@ -102,41 +97,183 @@ class JSONMemoryStore:
 
     def _init_files(self):
         """初始化所有JSON文件"""
-        for file_path in self.memory_files.values():
+        for collection_name, file_path in self.memory_files.items():
             if not file_path.exists():
                 # 如果文件不存在，创建带有空列表的初始文件
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
+                self._write_documents(collection_name, [])
                 logger.info(f"创建初始JSON文件: {file_path}")
             else:
                 logger.info(f"已存在JSON文件: {file_path}")
+                self._migrate_inline_vectors(collection_name)
+
+    def _migrate_inline_vectors(self, collection_name: str):
+        """
+        将旧版JSON文件中内联保存的向量迁移到向量矩阵中
 
-    def get_all_documents(self, collection_name: str) -> List[Dict[str, Any]]:
+        Args:
+            collection_name: 集合名称
+        """
+        field = get_vector_field(collection_name)
+        if field is None:
+            return
+
+        documents = self.get_all_documents(collection_name)
+        if not any(field in doc for doc in documents):
+            return
+
+        items = [(doc["id"], doc[field]) for doc in documents if doc.get("id") and doc.get(field) is not None]
+        self.vectors.get_matrix(collection_name).put_many(items)
+
+        stripped = [{k: v for k, v in doc.items() if k != field} for doc in documents]
+        self._write_documents(collection_name, stripped)
+
+        logger.info(f"已将 {collection_name} 中的 {len(items)} 个内联向量迁移到向量矩阵")
+
+    def _split_vector(self, collection_name: str, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        将文档中的向量写入向量矩阵，并返回不含向量的文档副本
+
+        Args:
+            collection_name: 集合名称
+            document: 文档
+
+        Returns:
+            Dict[str, Any]: 不含向量字段的文档
+        """
+        field = get_vector_field(collection_name)
+        if field is None or field not in document:
+            return document
+
+        document = dict(document)
+        vector = document.pop(field)
+        if vector is not None and document.get("id"):
+            self.vectors.get_matrix(collection_name).put(document["id"], vector)
+        return document
+
+    def _ensure_collection_file(self, collection_name: str):
+        """
+        治疗师技能集合不存在时动态创建其JSON文件
+
+        Args:
+            collection_name: 集合名称
+        """
+        if collection_name in self.memory_files or not collection_name.startswith("therapist_"):
+            return
+
+        # 提取治疗流派
+        therapy_type = collection_name.split("_")[1]
+        if therapy_type not in self.therapy_types:
+            self.therapy_types.append(therapy_type)
+            logger.info(f"添加新的治疗流派: {therapy_type}")
+
+        # 添加新的文件路径
+        self.memory_files[collection_name] = self.base_dir.joinpath(f"{collection_name}.json")
+
+        # 初始化文件
+        if not self.memory_files[collection_name].exists():
+            self._write_documents(collection_name, [])
+            logger.info(f"创建新的治疗流派JSON文件: {self.memory_files[collection_name]}")
+
+    def _write_documents(self, collection_name: str, documents: List[Dict[str, Any]],
+                         changed: Optional[List[Dict[str, Any]]] = None,
+                         removed: Optional[Iterable[str]] = None):
+        """
+        将整个集合写回JSON文件
+
+        提供 changed/removed 时只更新清单中对应的条目，否则按全部文档重建清单；
+        清单只在内存中标记为脏，由 save_manifest 统一保存
+
+        Args:
+            collection_name: 集合名称
+            documents: 不含向量字段的文档列表
+            changed: 本次新增或修改的文档
+            removed: 本次删除的文档ID
+        """
+        path = self.memory_files[collection_name]
+        # 清单与写入前的文件不一致（文件被外部修改过）时不能增量更新
+        incremental = path.exists() and self.manifest.source(collection_name) == self._file_state(collection_name)
+
+        # 先写临时文件再替换，并发读取（不持有写锁）只会看到完整的旧文件或新文件
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(documents, ensure_ascii=False, indent=2, fp=f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        source = self._file_state(collection_name)
+        if not incremental or (changed is None and removed is None):
+            self.manifest.replace(collection_name, documents, source=source)
+            return
+        if changed:
+            self.manifest.update(collection_name, [(doc["id"], doc) for doc in changed if doc.get("id")])
+        if removed:
+            self.manifest.remove(collection_name, removed)
+        self.manifest.set_source(collection_name, source)
+
+    def save_manifest(self):
+        """保存同步清单中有变化的集合"""
+        if self.manifest.dirty:
+            self.manifest.save()
+
+    def _file_state(self, collection_name: str) -> Dict[str, int]:
+        """获取JSON文件的大小和修改时间，用于判断清单是否过期"""
+        stat = os.stat(self.memory_files[collection_name])
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    @_synchronized
+    def get_manifest(self, collection_name: str) -> ManifestEntries:
+        """
+        获取集合的同步清单
+
+        清单记录的文件状态与当前文件一致时直接返回，不读取JSON文件；
+        文件被外部修改过时重新读取文件并重建清单
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            ManifestEntries: 文档ID -> [内容哈希, 更新时间]
+        """
+        self._ensure_collection_file(collection_name)
+        if collection_name not in self.memory_files or not self.memory_files[collection_name].exists():
+            return {}
+
+        state = self._file_state(collection_name)
+        if self.manifest.source(collection_name) != state:
+            logger.info(f"集合 {collection_name} 的同步清单已过期，重新生成")
+            self.manifest.replace(collection_name, self.get_all_documents(collection_name), source=state)
+            self.manifest.save()
+
+        return self.manifest.entries(collection_name)
+
+    def get_vector_matrix(self, collection_name: str) -> VectorMatrix:
+        """
+        获取集合的向量矩阵，可直接在内存映射上进行相似度计算
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            VectorMatrix: 向量矩阵
+        """
+        return self.vectors.get_matrix(collection_name)
+
+    def get_all_documents(self, collection_name: str, with_vectors: bool = False) -> List[Dict[str, Any]]:
         """
         获取特定集合所有文档
 
         Args:
             collection_name: 集合名称 (例如 "profiler_skills")
+            with_vectors: 是否从向量矩阵中附加向量字段
 
         Returns:
             List[Dict[str, Any]]: 文档列表
         """
         # 如果请求的集合不存在但是是治疗师技能集合，则动态创建
-        if collection_name not in self.memory_files and collection_name.startswith("therapist_"):
-            # 提取治疗流派
-            therapy_type = collection_name.split("_")[1]
-            if therapy_type not in self.therapy_types:
-                self.therapy_types.append(therapy_type)
-                logger.info(f"添加新的治疗流派: {therapy_type}")
-
-            # 添加新的文件路径
-            self.memory_files[collection_name] = self.base_dir.joinpath(f"{collection_name}.json")
-
-            # 初始化文件
-            if not self.memory_files[collection_name].exists():
-                with open(self.memory_files[collection_name], 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
-                logger.info(f"创建新的治疗流派JSON文件: {self.memory_files[collection_name]}")
+        self._ensure_collection_file(collection_name)
 
         if collection_name not in self.memory_files:
             logger.info(f"警告: 未找到集合 {collection_name} 的JSON文件")
@@ -144,18 +281,22 @@ class JSONMemoryStore:
 
         try:
             with open(self.memory_files[collection_name], 'r', encoding='utf-8') as f:
-                return json.load(f)
+                documents = json.load(f)
+            if with_vectors:
+                documents = self.vectors.attach_vectors(collection_name, documents)
+            return documents
         except Exception as e:
             logger.info(f"读取JSON文件 {self.memory_files[collection_name]} 时出错: {str(e)}")
             return []
 
-    def get_document(self, collection_name: str, doc_id: str) -> Optional[Dict[str, Any]]:
+    def get_document(self, collection_name: str, doc_id: str, with_vectors: bool = False) -> Optional[Dict[str, Any]]:
         """
         获取特定文档
 
         Args:
             collection_name: 集合名称
             doc_id: 文档ID
+            with_vectors: 是否从向量矩阵中附加向量字段
 
         Returns:
             Optional[Dict[str, Any]]: 找到的文档，未找到返回None
@@ -164,10 +305,32 @@ class JSONMemoryStore:
 
         for doc in documents:
             if doc.get("id") == doc_id:
+                if with_vectors:
+                    return self.vectors.attach_vectors(collection_name, [doc])[0]
                 return doc
 
         return None
 
+    def get_documents(self, collection_name: str, doc_ids: List[str],
+                      with_vectors: bool = False) -> List[Dict[str, Any]]:
+        """
+        批量获取文档，只读取一次JSON文件
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+            with_vectors: 是否从向量矩阵中附加向量字段
+
+        Returns:
+            List[Dict[str, Any]]: 找到的文档，按JSON文件中的顺序排列
+        """
+        wanted = set(doc_ids)
+        documents = [doc for doc in self.get_all_documents(collection_name) if doc.get("id") in wanted]
+        if with_vectors:
+            documents = self.vectors.attach_vectors(collection_name, documents)
+        return documents
+
+    @_synchronized
     def add_document(self, collection_name: str, document: Dict[str, Any]) -> bool:
         """
         添加文档到集合
@@ -180,27 +343,16 @@ class JSONMemoryStore:
             bool: 添加是否成功
         """
         # 如果集合不存在但是是治疗师技能集合，则动态创建
-        if collection_name not in self.memory_files and collection_name.startswith("therapist_"):
-            # 提取治疗流派
-            therapy_type = collection_name.split("_")[1]
-            if therapy_type not in self.therapy_types:
-                self.therapy_types.append(therapy_type)
-                logger.info(f"添加新的治疗流派: {therapy_type}")
-
-            # 添加新的文件路径
-            self.memory_files[collection_name] = self.base_dir.joinpath(f"{collection_name}.json")
-
-            # 初始化文件
-            if not self.memory_files[collection_name].exists():
-                with open(self.memory_files[collection_name], 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
-                logger.info(f"创建新的治疗流派JSON文件: {self.memory_files[collection_name]}")
+        self._ensure_collection_file(collection_name)
 
         if collection_name not in self.memory_files:
             logger.info(f"警告: 未找到集合 {collection_name} 的JSON文件")
             return False
 
         try:
+            # 向量写入向量矩阵，JSON只保留元数据
+            document = self._split_vector(collection_name, document)
+
             # 读取现有文档
             documents = self.get_all_documents(collection_name)
 
@@ -215,8 +367,7 @@ class JSONMemoryStore:
                 documents.append(document)
 
             # 写回文件
-            with open(self.memory_files[collection_name], 'w', encoding='utf-8') as f:
-                json.dump(documents, ensure_ascii=False, indent=2, fp=f)
+            self._write_documents(collection_name, documents, changed=[document])
 
             logger.info(f"已添加/更新文档到 {collection_name}, ID: {document.get('id')}")
             return True
@@ -225,6 +376,64 @@ class JSONMemoryStore:
             logger.info(f"添加文档到 {collection_name} 时出错: {str(e)}")
             return False
 
+    @_synchronized
+    def add_documents(self, collection_name: str, documents: List[Dict[str, Any]]) -> int:
+        """
+        批量添加或更新文档，只读写一次JSON文件
+
+        Args:
+            collection_name: 集合名称
+            documents: 要添加的文档列表，已存在相同ID的文档将被替换
+
+        Returns:
+            int: 写入的文档数量
+        """
+        self._ensure_collection_file(collection_name)
+
+        if collection_name not in self.memory_files:
+            logger.info(f"警告: 未找到集合 {collection_name} 的JSON文件")
+            return 0
+
+        try:
+            field = get_vector_field(collection_name)
+            incoming: Dict[str, Dict[str, Any]] = {}
+            vector_items = []
+            for document in documents:
+                doc_id = document.get("id")
+                if not doc_id:
+                    logger.warning(f"跳过没有ID的文档: {document}")
+                    continue
+                if field is not None and field in document:
+                    document = dict(document)
+                    vector = document.pop(field)
+                    if vector is not None:
+                        vector_items.append((doc_id, vector))
+                incoming[doc_id] = document
+
+            if not incoming:
+                return 0
+            written = len(incoming)
+            changed = list(incoming.values())
+
+            # 向量批量写入向量矩阵，JSON只保留元数据
+            if vector_items:
+                self.vectors.get_matrix(collection_name).put_many(vector_items)
+
+            # 按ID合并：已有文档原地替换，新文档追加到末尾
+            existing = self.get_all_documents(collection_name)
+            merged = [incoming.pop(doc.get("id")) if doc.get("id") in incoming else doc for doc in existing]
+            merged.extend(incoming.values())
+
+            self._write_documents(collection_name, merged, changed=changed)
+
+            logger.info(f"已批量写入 {written} 个文档到 {collection_name}，其中新增 {len(incoming)} 个")
+            return written
+
+        except Exception as e:
+            logger.info(f"批量添加文档到 {collection_name} 时出错: {str(e)}")
+            return 0
+
+    @_synchronized
     def update_document(self, collection_name: str, doc_id: str, document: Dict[str, Any]) -> bool:
         """
         更新特定文档
@@ -242,6 +451,9 @@ class JSONMemoryStore:
             return False
 
         try:
+            # 向量写入向量矩阵，JSON只保留元数据
+            document = self._split_vector(collection_name, dict(document, id=doc_id))
+
             # 读取现有文档
             documents = self.get_all_documents(collection_name)
             updated = False
@@ -260,8 +472,7 @@ class JSONMemoryStore:
                 return False
 
             # 写回文件
-            with open(self.memory_files[collection_name], 'w', encoding='utf-8') as f:
-                json.dump(documents, ensure_ascii=False, indent=2, fp=f)
+            self._write_documents(collection_name, documents, changed=[document])
 
             logger.info(f"已更新文档 {doc_id} 在 {collection_name}")
             return True
@@ -270,6 +481,7 @@ class JSONMemoryStore:
             logger.info(f"更新文档 {doc_id} 时出错: {str(e)}")
             return False
 
+    @_synchronized
     def remove_document(self, collection_name: str, doc_id: str) -> bool:
         """
         从集合中移除文档
@@ -298,8 +510,10 @@ class JSONMemoryStore:
                 return False
 
             # 写回文件
-            with open(self.memory_files[collection_name], 'w', encoding='utf-8') as f:
-                json.dump(documents, ensure_ascii=False, indent=2, fp=f)
+            self._write_documents(collection_name, documents, removed=[doc_id])
+
+            if get_vector_field(collection_name):
+                self.vectors.get_matrix(collection_name).remove(doc_id)
 
             logger.info(f"已从 {collection_name} 中删除文档 {doc_id}")
             return True
@@ -308,6 +522,39 @@ class JSONMemoryStore:
             logger.info(f"删除文档 {doc_id} 时出错: {str(e)}")
             return False
 
+    @_synchronized
+    def remove_documents(self, collection_name: str, doc_ids: List[str]) -> int:
+        """
+        从集合中批量移除文档，只写一次文件
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 要移除的文档ID列表
+
+        Returns:
+            int: 实际移除的文档数量
+        """
+        if collection_name not in self.memory_files:
+            logger.info(f"警告: 未找到集合 {collection_name} 的JSON文件")
+            return 0
+
+        targets = set(doc_ids)
+        documents = self.get_all_documents(collection_name)
+        remaining = [doc for doc in documents if doc.get("id") not in targets]
+        removed = len(documents) - len(remaining)
+        if removed == 0:
+            return 0
+
+        self._write_documents(collection_name, remaining, removed=targets)
+
+        if get_vector_field(collection_name):
+            matrix = self.vectors.get_matrix(collection_name)
+            for doc_id in targets:
+                matrix.remove(doc_id)
+
+        logger.info(f"已从 {collection_name} 中删除 {removed} 个文档")
+        return removed
+
     def json_to_vector_db_format(self, collection_name: str) -> List[Dict[str, Any]]:
         """
         将JSON格式转换为向量数据库可接受的格式
@@ -318,7 +565,7 @@ class JSONMemoryStore:
         Returns:
             List[Dict[str, Any]]: 格式化后的文档列表
         """
-        documents = self.get_all_documents(collection_name)
+        documents = self.get_all_documents(collection_name, with_vectors=True)
         formatted_docs = []
 
         for doc in documents:
@@ -0,0 +1,392 @@
+# src/memory/lexical_index.py
+"""
+词法倒排索引
+中文按字符一元/二元组切分、英文和数字按单词切分，使用BM25打分；
+在嵌入服务不可用时仍能返回top-k结果，嵌入可用时与向量相似度融合。
+索引以追加写的日志文件持久化，技能或病历更新时增量写入。
+"""
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from src.memory.sync_manifest import compute_content_hash
+from src.memory.vector_matrix_store import get_vector_field
+from src.utils.logger import logger
+
+
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 中文字符（含扩展A区）连续片段，或英文/数字单词
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+|[a-z0-9]+")
+
+# 日志中的过期行超过有效文档数的倍数时重写日志
+_COMPACT_RATIO = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索词：中文片段取单字和相邻二字组，英文和数字取整个单词
+
+    Args:
+        text: 文本
+
+    Returns:
+        List[str]: 检索词列表（保留重复，用于计算词频）
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        segment = match.group()
+        if segment[0].isascii():
+            tokens.append(segment)
+            continue
+        tokens.extend(segment)
+        tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def fuse_scores(vector_hits: List[Tuple[str, float]], lexical_hits: List[Tuple[str, float]],
+                alpha: float) -> List[Tuple[str, float]]:
+    """
+    融合向量相似度和BM25分数，两者分别按各自的最大值归一化后加权求和
+
+    Args:
+        vector_hits: (文档ID, 向量相似度) 列表
+        lexical_hits: (文档ID, BM25分数) 列表
+        alpha: 向量相似度的权重，词法分数的权重为 1 - alpha
+
+    Returns:
+        List[Tuple[str, float]]: (文档ID, 融合分数) 列表，按分数降序排列
+    """
+    scores: Dict[str, float] = {}
+    for hits, weight in ((vector_hits, alpha), (lexical_hits, 1.0 - alpha)):
+        top = max((score for _, score in hits), default=0.0)
+        if top <= 0 or weight <= 0:
+            continue
+        for doc_id, score in hits:
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * score / top
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _collect_strings(value: Any, parts: List[str]):
+    """递归收集嵌套结构中的字符串"""
+    if isinstance(value, str):
+        parts.append(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_strings(item, parts)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_strings(item, parts)
+
+
+def get_index_text(collection_name: str, document: Dict[str, Any]) -> str:
+    """
+    提取文档中参与词法检索的文本
+
+    Args:
+        collection_name: 集合名称
+        document: 文档
+
+    Returns:
+        str: 检索文本（技能取content，学生向量取feature_text，其余集合取所有字符串字段）
+    """
+    if collection_name.endswith("_skills"):
+        return str(document.get("content") or "")
+    if collection_name == "student_vectors":
+        return str(document.get("feature_text") or "")
+
+    field = get_vector_field(collection_name)
+    parts: List[str] = []
+    for key, value in document.items():
+        if key in ("id", field):
+            continue
+        _collect_strings(value, parts)
+    return "\n".join(parts)
+
+
+class LexicalIndex:
+    """单个集合的BM25倒排索引
+
+    文件 {name}.lexical.jsonl 每行一条记录:
+    - {"id": 文档ID, "hash": 内容哈希, "tf": {检索词: 词频}}  写入或更新
+    - {"id": 文档ID, "deleted": true}                       删除
+    加载时按顺序重放，后写入的记录覆盖先前的记录
+    """
+
+    def __init__(self, base_dir: Path, name: str):
+        """
+        初始化倒排索引
+
+        Args:
+            base_dir: 索引文件所在目录
+            name: 索引名称（通常为集合名称）
+        """
+        self.name = name
+        self.path = Path(base_dir).joinpath(f"{name}.lexical.jsonl")
+
+        # 检索词 -> {文档ID: 词频}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # 文档ID -> (内容哈希, 文档长度, 词频)
+        self._docs: Dict[str, Tuple[str, int, Dict[str, int]]] = {}
+        self._total_length = 0
+        self._log_lines = 0
+
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """重放日志文件，损坏的行跳过"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                self._log_lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("deleted"):
+                    self._remove(record["id"])
+                else:
+                    self._add(record["id"], record["hash"], record["tf"])
+
+    def _add(self, doc_id: str, content_hash: str, term_freqs: Dict[str, int]):
+        """在内存中写入文档（已存在时先删除旧的倒排项）"""
+        self._remove(doc_id)
+        length = sum(term_freqs.values())
+        self._docs[doc_id] = (content_hash, length, term_freqs)
+        self._total_length += length
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+
+    def _remove(self, doc_id: str) -> bool:
+        """在内存中删除文档"""
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return False
+        self._total_length -= entry[1]
+        for term in entry[2]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        return True
+
+    def _append(self, records: List[Dict[str, Any]]):
+        """追加日志记录，过期行过多时重写日志"""
+        if not records:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self._log_lines += len(records)
+        if self._log_lines > _COMPACT_RATIO * max(len(self._docs), 1) + 100:
+            self._compact()
+
+    def _compact(self):
+        """用当前有效文档重写日志"""
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for doc_id, (content_hash, _, term_freqs) in self._docs.items():
+                f.write(json.dumps({"id": doc_id, "hash": content_hash, "tf": term_freqs}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self._docs)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def hashes(self) -> Dict[str, str]:
+        """返回 文档ID -> 内容哈希"""
+        with self._lock:
+            return {doc_id: entry[0] for doc_id, entry in self._docs.items()}
+
+    def upsert(self, items: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        写入或更新文档
+
+        Args:
+            items: (文档ID, 内容哈希, 检索文本) 列表
+
+        Returns:
+            int: 实际写入的文档数量（内容哈希未变化的文档跳过）
+        """
+        with self._lock:
+            records = []
+            for doc_id, content_hash, text in items:
+                entry = self._docs.get(doc_id)
+                if entry is not None and entry[0] == content_hash:
+                    continue
+                term_freqs = dict(Counter(tokenize(text)))
+                self._add(doc_id, content_hash, term_freqs)
+                records.append({"id": doc_id, "hash": content_hash, "tf": term_freqs})
+            self._append(records)
+            return len(records)
+
+    def remove(self, doc_ids: Iterable[str]) -> int:
+        """
+        删除文档
+
+        Args:
+            doc_ids: 文档ID列表
+
+        Returns:
+            int: 删除的文档数量
+        """
+        with self._lock:
+            records = [{"id": doc_id, "deleted": True} for doc_id in doc_ids if self._remove(doc_id)]
+            self._append(records)
+            return len(records)
+
+    def search(self, query_text: str, limit: int = 5,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        BM25检索
+
+        Args:
+            query_text: 查询文本
+            limit: 返回数量
+            candidate_ids: 只在这些文档中检索，为None时检索全部文档
+
+        Returns:
+            List[Tuple[str, float]]: (文档ID, BM25分数) 列表，按分数降序排列
+        """
+        query_terms = set(tokenize(query_text))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._docs)
+            if doc_count == 0:
+                return []
+            avg_length = self._total_length / doc_count
+            allowed = set(candidate_ids) if candidate_ids is not None else None
+
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, freq in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    length = self._docs[doc_id][1]
+                    norm = freq + BM25_K1 * (1.0 - BM25_B + BM25_B * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1.0) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def delete_files(self):
+        """删除索引文件并清空内存"""
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._total_length = 0
+            self._log_lines = 0
+            if self.path.exists():
+                self.path.unlink()
+
+
+def _locked(method):
+    """在索引存储锁内执行"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class LexicalIndexStore:
+    """按集合管理词法倒排索引"""
+
+    def __init__(self, base_dir: Path):
+        """
+        初始化词法索引存储
+
+        Args:
+            base_dir: 索引文件目录
+        """
+        self.base_dir = Path(base_dir)
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._indexes: Dict[str, LexicalIndex] = {}
+        self._lock = threading.RLock()
+
+    @_locked
+    def get_index(self, collection_name: str) -> LexicalIndex:
+        """获取（必要时加载）集合的倒排索引"""
+        if collection_name not in self._indexes:
+            self._indexes[collection_name] = LexicalIndex(self.base_dir, collection_name)
+        return self._indexes[collection_name]
+
+    def index_documents(self, collection_name: str, documents: Iterable[Dict[str, Any]]) -> int:
+        """
+        增量索引文档
+
+        Args:
+            collection_name: 集合名称
+            documents: 文档列表（必须包含id）
+
+        Returns:
+            int: 实际写入的文档数量
+        """
+        items = [
+            (doc["id"], compute_content_hash(collection_name, doc), get_index_text(collection_name, doc))
+            for doc in documents if doc.get("id")
+        ]
+        return self.get_index(collection_name).upsert(items)
+
+    def remove_documents(self, collection_name: str, doc_ids: Iterable[str]) -> int:
+        """从集合索引中删除文档"""
+        return self.get_index(collection_name).remove(doc_ids)
+
+    def search(self, collection_name: str, query_text: str, limit: int = 5,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """在集合索引中进行BM25检索"""
+        return self.get_index(collection_name).search(query_text, limit, candidate_ids)
+
+    def sync_collection(self, json_store, collection_name: str) -> Dict[str, int]:
+        """
+        按JSON同步清单的内容哈希增量同步索引
+
+        Args:
+            json_store: JSON记忆存储（索引的数据来源）
+            collection_name: 集合名称
+
+        Returns:
+            Dict[str, int]: 新增/更新（indexed）和删除（removed）的文档数量
+        """
+        index = self.get_index(collection_name)
+        source = json_store.get_manifest(collection_name)
+        indexed = index.hashes()
+
+        pending = [doc_id for doc_id, entry in source.items() if indexed.get(doc_id) != entry[0]]
+        orphaned = [doc_id for doc_id in indexed if doc_id not in source]
+
+        written = 0
+        if pending:
+            written = self.index_documents(collection_name, json_store.get_documents(collection_name, pending))
+        removed = index.remove(orphaned) if orphaned else 0
+
+        if written or removed:
+            logger.info(f"词法索引 {collection_name} 同步完成: 写入 {written} 个文档，删除 {removed} 个文档")
+        return {"indexed": written, "removed": removed}
+
+    @_locked
+    def reset(self):
+        """删除所有索引文件"""
+        for index in self._indexes.values():
+            index.delete_files()
+        self._indexes = {}
+        for path in self.base_dir.glob("*.lexical.jsonl"):
+            path.unlink()
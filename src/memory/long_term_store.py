@@ -1,289 +1,615 @@
 # src/memory/long_term_store.py
-from typing import Dict, Any, List, Optional
-import json
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 import os
-from datetime import datetime
-import chromadb
-from chromadb import Collection
+import threading
 
+from src.memory.vector_matrix_store import get_vector_field
+from src.memory.vector_store_base import VectorStoreBase, BATCH_SIZE, DEFAULT_MAX_WORKERS, _BODYLESS_FIELDS
+from src.utils.therapist_config import TherapistConfig
 from src.utils.logger import logger
 
+if TYPE_CHECKING:
+    # chromadb导入较慢，只在首次访问数据库时导入
+    from chromadb import Collection
 
-class LongTermMemoryStore:
-    """底层存储实现 - 直接负责与数据库的交互"""
+# 集合的距离度量，bge向量是归一化的，余弦距离与内积排序一致
+COLLECTION_SPACE = "cosine"
 
-    def __init__(self, persist_directory=None):
+# 不含向量字段的集合（如medical_records）只按ID和元数据读取，写入固定的占位向量
+PLACEHOLDER_EMBEDDING = [1.0]
+
+
+def create_long_term_store(persist_directory: Optional[str] = None,
+                           backend: Optional[str] = None,
+                           therapist_config: Optional[TherapistConfig] = None) -> VectorStoreBase:
+    """
+    按配置创建长期记忆向量存储
+
+    Args:
+        persist_directory: 持久化目录，为None时使用后端的默认路径
+        backend: 后端名称（chroma或numpy），为None时读取配置 MEMORY_VECTOR_BACKEND
+        therapist_config: 咨询师配置，为None时加载默认配置文件
+
+    Returns:
+        VectorStoreBase: 向量存储实例
+    """
+    from src.utils.config import Config
+
+    backend = (backend or Config.MEMORY_VECTOR_BACKEND).lower()
+    if backend == "numpy":
+        from src.memory.numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore(persist_directory, ivf_threshold=Config.MEMORY_IVF_THRESHOLD,
+                                therapist_config=therapist_config)
+    if backend != "chroma":
+        logger.warning(f"未知的向量存储后端: {backend}，将使用ChromaDB")
+    return LongTermMemoryStore(persist_directory, therapist_config=therapist_config)
+
+
+class LongTermMemoryStore(VectorStoreBase):
+    """底层存储实现 - 直接负责与数据库的交互（ChromaDB后端）"""
+
+    def __init__(self, persist_directory=None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 therapist_config: Optional[TherapistConfig] = None):
         """
         初始化长期记忆存储
 
         Args:
-            persist_directory: 持久化目录，如果为None则使用内存模式
+            persist_directory: 持久化目录，如果为None则使用默认路径
+            max_workers: 执行ChromaDB调用的线程池大小
+            therapist_config: 咨询师配置，为None时加载默认配置文件
         """
         # 如果没有指定持久化目录，使用默认路径
         if persist_directory is None:
             # 在src目录下创建long-term-memories文件夹
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            self.persist_directory = os.path.join(base_dir, "long-term-memories")
-        else:
-            self.persist_directory = persist_directory
+            persist_directory = os.path.join(base_dir, "long-term-memories")
 
-        # 确保持久化目录存在
-        os.makedirs(self.persist_directory, exist_ok=True)
+        super().__init__(persist_directory, max_workers, therapist_config)
 
         logger.info(f"向量数据库持久化目录: {self.persist_directory}")
 
-        # 使用最新的ChromaDB客户端创建方式
-        self.client = chromadb.PersistentClient(path=self.persist_directory)
-        self._collections: Dict[str, Collection] = {}
+        # ChromaDB客户端在首次访问数据库时才创建
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._collections: Dict[str, "Collection"] = {}
 
-        # 获取可用的治疗流派
-        self.therapy_types = self._get_available_therapy_types()
+    @property
+    def client(self):
+        """ChromaDB客户端，首次访问时导入chromadb并创建"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import chromadb
 
-    def _get_available_therapy_types(self) -> List[str]:
-        """
-        从配置文件获取所有可用的治疗流派
+                    # 使用最新的ChromaDB客户端创建方式
+                    self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
 
-        Returns:
-            List[str]: 可用的治疗流派列表
-        """
-        therapy_types = ["cbt", "psychodynamic"]  # 默认支持的流派
+    async def init_collections(self):
+        """打开所有默认集合（通常不需要调用，集合会在首次使用时打开）"""
+        def _open_all():
+            for name in self._collection_names():
+                if name not in self._collections:
+                    self._open_collection(name)
+
+        await self._run("init_collections", _open_all)
 
+    def _open_collection(self, collection_name: str):
+        """打开或创建集合（在线程池中执行），旧版本创建的集合会先迁移"""
+        # 获取或创建集合
         try:
-            # 尝试从配置文件加载流派
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
+            collection = self.client.get_collection(name=collection_name, embedding_function=None)
+        except Exception:
+            # 如果集合不存在，创建新集合
+            self._collections[collection_name] = self.client.create_collection(
+                name=collection_name, **self._collection_options()
             )
+            logger.info(f"创建新集合: {collection_name}")
+            return
+
+        if self._needs_migration(collection):
+            collection = self._migrate_collection(collection)
+        self._collections[collection_name] = collection
+        logger.info(f"成功加载现有集合: {collection_name}")
 
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+    @staticmethod
+    def _collection_options() -> Dict[str, Any]:
+        """
+        创建集合的参数：不配置embedding函数，向量全部由调用方提供，
+        使用与归一化的bge向量匹配的余弦距离
+        """
+        return {"embedding_function": None, "configuration": {"hnsw": {"space": COLLECTION_SPACE}}}
 
-                # 获取所有流派ID
-                therapy_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
+    @staticmethod
+    def _needs_migration(collection: "Collection") -> bool:
+        """集合是否由旧版本创建（配置了默认embedding函数或使用l2距离）"""
+        configuration = collection.configuration or {}
+        space = (configuration.get("hnsw") or {}).get("space")
+        return configuration.get("embedding_function") is not None or space != COLLECTION_SPACE
 
-                logger.info(f"向量数据库: 从配置文件加载了 {len(therapy_types)} 个治疗流派")
+    def _migrate_collection(self, collection: "Collection") -> "Collection":
+        """
+        把旧集合迁移为不带embedding函数的余弦距离集合（在线程池中执行）
 
-        except Exception as e:
-            logger.info(f"向量数据库: 加载治疗流派配置失败: {str(e)}，将使用默认流派")
+        先把文档和已有向量复制到临时集合，再删除旧集合并重命名临时集合，
+        复制过程中出错时旧集合保持不变
 
-        return therapy_types
+        Args:
+            collection: 旧集合
 
-    async def init_collections(self):
-        """初始化所有集合"""
-        # 构建集合配置
-        skills_collections = ["profiler_skills"]
-
-        # 为每个治疗流派添加集合
-        for therapy_type in self.therapy_types:
-            skills_collections.append(f"therapist_{therapy_type}_skills")
-
-        collections_config = {
-            "skills": skills_collections,
-            "records": ["medical_records"],
-            "vectors": ["student_vectors"]  # 新增向量集合
-        }
-
-        # 导入embedding函数
-        import chromadb.utils.embedding_functions as embedding_functions
-
-        for category, names in collections_config.items():
-            for name in names:
-                # 获取或创建集合
-                try:
-                    self._collections[name] = self.client.get_collection(name=name)
-                    logger.info(f"成功加载现有集合: {name}")
-                except Exception:
-                    # 如果集合不存在，创建新集合
-                    # 对于需要向量支持的集合，指定embedding函数
-                    if name == "student_vectors" or name.endswith("_skills"):
-                        # 创建支持1024维向量的集合
-                        # 使用默认的embedding函数，但不进行额外的embedding处理
-                        ef = embedding_functions.DefaultEmbeddingFunction()
-                        self._collections[name] = self.client.create_collection(
-                            name=name,
-                            embedding_function=ef
-                        )
-                        logger.info(f"创建新的向量集合: {name} (支持1024维)")
-                    else:
-                        self._collections[name] = self.client.create_collection(name=name)
-                        logger.info(f"创建新集合: {name}")
-
-    async def add_document(self, collection_name: str, doc_id: str, content: Dict[str, Any],
-                           metadata: Dict[str, Any]) -> None:
-        """添加文档到指定集合"""
-        # 如果集合不存在，首先确保所有集合已初始化
+        Returns:
+            Collection: 迁移后的集合
+        """
+        name = collection.name
+        has_vectors = get_vector_field(name) is not None
+        temp_name = f"{name}__migrating"
+        try:
+            self.client.delete_collection(name=temp_name)
+        except Exception:
+            pass
+        migrated = self.client.create_collection(name=temp_name, **self._collection_options())
+
+        include = ["documents", "metadatas"] + (["embeddings"] if has_vectors else [])
+        offset = 0
+        copied = 0
+        while True:
+            page = collection.get(limit=BATCH_SIZE, offset=offset, include=include)
+            if page["ids"]:
+                # 不含向量字段的集合原本保存的是默认embedding函数计算的文本向量，迁移时换成占位向量
+                embeddings = page["embeddings"] if has_vectors else [PLACEHOLDER_EMBEDDING] * len(page["ids"])
+                migrated.add(ids=page["ids"], documents=page["documents"], metadatas=page["metadatas"],
+                             embeddings=embeddings)
+                copied += len(page["ids"])
+            if len(page["ids"]) < BATCH_SIZE:
+                break
+            offset += BATCH_SIZE
+
+        self.client.delete_collection(name=name)
+        migrated.modify(name=name)
+        logger.info(f"已将集合 {name} 迁移为余弦距离且不使用embedding函数，共 {copied} 个文档")
+        return migrated
+
+    def has_collection(self, collection_name: str) -> bool:
+        """集合是否已加载"""
+        return collection_name in self._collections
+
+    async def ensure_collection(self, collection_name: str) -> "Collection":
+        """
+        确保集合存在，不存在时创建
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            Collection: 集合对象
+        """
         if collection_name not in self._collections:
-            logger.info(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
-
-            # 如果仍不存在，则是一个新的治疗流派集合，需要创建
-            if collection_name not in self._collections and collection_name.startswith("therapist_"):
-                therapy_type = collection_name.split("_")[1]
-                if therapy_type not in self.therapy_types:
-                    self.therapy_types.append(therapy_type)
-                    logger.info(f"添加新的治疗流派集合: {therapy_type}")
-
-                # 创建新集合
-                self._collections[collection_name] = self.client.create_collection(name=collection_name)
-                logger.info(f"创建新的治疗流派集合: {collection_name}")
-
-        collection = self._collections[collection_name]
-
-        # 检查是否需要提供embedding向量
-        embedding_vector = None
-        if collection_name == "student_vectors" and "feature_vector" in content:
-            embedding_vector = content.get("feature_vector")
-        elif collection_name.endswith("_skills") and "skill_vector" in content:
-            # 技能记忆集合使用skill_vector
-            embedding_vector = content.get("skill_vector")
-
-        if embedding_vector is not None:
-            collection.add(
-                documents=[json.dumps(content)],
-                metadatas=[metadata],
-                ids=[doc_id],
-                embeddings=[embedding_vector]  # 直接提供embedding向量
-            )
+            await self._run("create_collection", self._open_collection, collection_name)
+        return self._collections[collection_name]
+
+    async def add_documents(self, collection_name: str, doc_ids: List[str], contents: List[Dict[str, Any]],
+                            metadatas: List[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> int:
+        """
+        批量添加文档到指定集合，每批只调用一次collection.add
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+            contents: 文档内容列表
+            metadatas: 元数据列表
+            batch_size: 每批写入的文档数量
+
+        Returns:
+            int: 写入的文档数量
+        """
+        return await self._write_documents("add", collection_name, doc_ids, contents, metadatas, batch_size)
+
+    async def upsert_documents(self, collection_name: str, doc_ids: List[str], contents: List[Dict[str, Any]],
+                               metadatas: List[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> int:
+        """
+        批量插入或更新文档，每批只调用一次collection.upsert
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+            contents: 文档内容列表
+            metadatas: 元数据列表
+            batch_size: 每批写入的文档数量
+
+        Returns:
+            int: 写入的文档数量
+        """
+        return await self._write_documents("upsert", collection_name, doc_ids, contents, metadatas, batch_size)
+
+    async def _write_documents(self, operation: str, collection_name: str, doc_ids: List[str],
+                               contents: List[Dict[str, Any]], metadatas: List[Dict[str, Any]],
+                               batch_size: int) -> int:
+        """
+        按批次执行add/upsert
+
+        集合不使用embedding函数，每个文档都要带向量写入：没有向量的文档使用占位向量或已保存的向量，
+        向量集合中从未保存过向量的文档会被跳过
+        """
+        if not doc_ids:
+            return 0
+
+        collection = await self._get_collection(collection_name, create=True)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建，无法写入文档")
+            return 0
+
+        write = collection.add if operation == "add" else collection.upsert
+        batch_size = max(1, min(batch_size, self.client.get_max_batch_size()))
+
+        # 向量只通过embeddings传入，不写入文档正文
+        with_vectors: List[Tuple[str, str, Optional[Dict[str, Any]], List[float]]] = []
+        without_vectors: List[Tuple[str, str, Optional[Dict[str, Any]]]] = []
+        for doc_id, content, metadata in zip(doc_ids, contents, metadatas):
+            body, embedding_vector = self._split_embedding(collection_name, content)
+            # ChromaDB不接受空的元数据字典
+            metadata = metadata or None
+            if embedding_vector is not None:
+                with_vectors.append((doc_id, body, metadata, embedding_vector))
+            else:
+                without_vectors.append((doc_id, body, metadata))
+
+        # 集合不使用embedding函数，没有向量的文档改用占位向量或已保存的向量
+        skipped: List[str] = []
+        if without_vectors:
+            fallback = await self._run("get", self._fallback_embeddings, collection, collection_name,
+                                       [item[0] for item in without_vectors])
+            for doc_id, body, metadata in without_vectors:
+                if doc_id in fallback:
+                    with_vectors.append((doc_id, body, metadata, fallback[doc_id]))
+                else:
+                    skipped.append(doc_id)
+            if skipped:
+                logger.warning(f"{len(skipped)} 个文档没有向量，未写入 {collection_name}（仍可通过JSON文件和词法索引检索）: {', '.join(skipped[:5])}")
+
+        for start in range(0, len(with_vectors), batch_size):
+            ids, bodies, metas, embeddings = zip(*with_vectors[start:start + batch_size])
+            await self._run_write(collection_name, operation, write, ids=list(ids), documents=list(bodies),
+                                  metadatas=list(metas), embeddings=list(embeddings))  # 直接提供embedding向量
+
+        skipped_ids = set(skipped)
+        written_docs = [(doc_id, content) for doc_id, content in zip(doc_ids, contents) if doc_id not in skipped_ids]
+        await self._run("manifest", self._update_manifest, collection_name, written_docs)
+
+        written = len(with_vectors)
+        if written == 1:
+            logger.info(f"已添加文档到 {collection_name}")
         else:
-            collection.add(
-                documents=[json.dumps(content)],
-                metadatas=[metadata],
-                ids=[doc_id]
+            logger.info(f"已批量写入 {written} 个文档到 {collection_name}")
+        return written
+
+    @staticmethod
+    def _to_l2_distances(distances: List[float]) -> List[float]:
+        """
+        把余弦距离换算为归一化向量的平方L2距离（2 - 2·cos），
+        相似度分数与NumPy后端及旧版本的l2集合保持一致
+        """
+        return [2.0 * distance for distance in distances]
+
+    @staticmethod
+    def _fallback_embeddings(collection: "Collection", collection_name: str,
+                             doc_ids: List[str]) -> Dict[str, List[float]]:
+        """
+        为没有向量的文档提供写入用的向量（在线程池中执行）
+
+        Args:
+            collection: 集合对象
+            collection_name: 集合名称
+            doc_ids: 没有向量的文档ID
+
+        Returns:
+            Dict[str, List[float]]: 文档ID -> 向量。不含向量字段的集合使用占位向量；
+            向量集合沿用已保存的向量，尚未保存过的文档不在结果中
+        """
+        if get_vector_field(collection_name) is None:
+            return {doc_id: PLACEHOLDER_EMBEDDING for doc_id in doc_ids}
+        existing = collection.get(ids=list(doc_ids), include=["embeddings"])
+        if existing.get("embeddings") is None:
+            return {}
+        return {doc_id: list(vector) for doc_id, vector in zip(existing["ids"], existing["embeddings"])}
+
+    async def get_document_ids(self, collection_name: str, batch_size: int = BATCH_SIZE) -> List[str]:
+        """
+        分页获取集合中所有文档ID，不读取文档正文、元数据和向量
+
+        Args:
+            collection_name: 集合名称
+            batch_size: 每页数量
+
+        Returns:
+            List[str]: 文档ID列表
+        """
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return []
+
+        doc_ids: List[str] = []
+        offset = 0
+        while True:
+            page = await self._run("get", collection.get, limit=batch_size, offset=offset, include=[])
+            doc_ids.extend(page["ids"])
+            if len(page["ids"]) < batch_size:
+                break
+            offset += batch_size
+        return doc_ids
+
+    async def export_documents(self, collection_name: str, batch_size: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        分页导出集合中的所有文档，并把向量重新附加到向量字段
+
+        Args:
+            collection_name: 集合名称
+            batch_size: 每页数量
+
+        Returns:
+            List[Dict[str, Any]]: 完整文档列表（正文、元数据和向量）
+        """
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return []
+
+        field = get_vector_field(collection_name)
+        include = ["documents", "metadatas"] + (["embeddings"] if field else [])
+
+        documents: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            page = await self._run("get", collection.get, limit=batch_size, offset=offset, include=include)
+            page_docs = self._build_results(
+                collection_name, page["ids"], page.get("documents"), page.get("metadatas"), None, None
             )
-        logger.info(f"已添加文档到 {collection_name}")
+            if field and page.get("embeddings") is not None:
+                vectors = dict(zip(page["ids"], page["embeddings"]))
+                for doc in page_docs:
+                    vector = vectors.get(doc["id"])
+                    if vector is not None:
+                        doc[field] = [float(value) for value in vector]
+            documents.extend(page_docs)
+
+            if len(page["ids"]) < batch_size:
+                break
+            offset += batch_size
+
+        logger.info(f"从 {collection_name} 导出了 {len(documents)} 个文档")
+        return documents
 
     async def get_document(self, collection_name: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """获取指定文档"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            logger.info(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
-
-            # 如果仍不存在，则可能是新的治疗流派或者其他未知集合
-            if collection_name not in self._collections:
-                logger.info(f"集合 {collection_name} 不存在且无法创建")
-                return None
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建")
+            return None
 
-        collection = self._collections[collection_name]
-        results = collection.get(ids=[doc_id])
+        results = await self._run("get", collection.get, ids=[doc_id], include=["documents"])
         if results["documents"] and results["documents"][0]:
             logger.info(f"从 {collection_name} 成功获取文档 {doc_id}")
-            return json.loads(results["documents"][0])
+            return self._parse_document(collection_name, results["documents"][0])
         logger.info(f"在 {collection_name} 中未找到文档 {doc_id}")
         return None
 
+    async def get_documents(self, collection_name: str, doc_ids: List[str],
+                            include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        批量获取指定文档，一次往返完成
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+            include: 需要返回的字段，为None时返回完整文档
+
+        Returns:
+            List[Dict[str, Any]]: 按doc_ids顺序排列的文档列表，不存在的文档被跳过
+        """
+        if not doc_ids:
+            return []
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return []
+
+        chroma_include = ["metadatas"]
+        if include is None or set(include) - _BODYLESS_FIELDS:
+            chroma_include.append("documents")
+
+        results = await self._run("get", collection.get, ids=list(doc_ids), include=chroma_include)
+
+        # ChromaDB不保证按请求顺序返回，先按ID还原顺序再组装
+        position = {doc_id: i for i, doc_id in enumerate(results["ids"])}
+        order = [position[doc_id] for doc_id in doc_ids if doc_id in position]
+        documents = results.get("documents")
+        metadatas = results.get("metadatas")
+        return self._build_results(
+            collection_name,
+            [results["ids"][i] for i in order],
+            [documents[i] for i in order] if documents is not None else None,
+            [metadatas[i] for i in order] if metadatas is not None else None,
+            None,
+            include
+        )
+
     async def update_document(self, collection_name: str, doc_id: str, content: Dict[str, Any],
                               metadata: Dict[str, Any]) -> None:
         """更新指定文档"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            logger.info(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
-
-            # 如果仍不存在，则可能是新的治疗流派或者其他未知集合
-            if collection_name not in self._collections:
-                logger.info(f"集合 {collection_name} 不存在且无法创建，无法更新文档")
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建，无法更新文档")
+            return
+
+        # 向量只通过embeddings传入，不写入文档正文
+        body, embedding_vector = self._split_embedding(collection_name, content)
+
+        if embedding_vector is None:
+            # 集合不使用embedding函数，没有新向量时沿用已保存的向量
+            fallback = await self._run("get", self._fallback_embeddings, collection, collection_name, [doc_id])
+            if doc_id not in fallback:
+                logger.warning(f"文档 {doc_id} 没有向量，无法更新 {collection_name}")
                 return
+            embedding_vector = fallback[doc_id]
 
-        collection = self._collections[collection_name]
-
-        # 检查是否需要提供embedding向量
-        embedding_vector = None
-        if collection_name == "student_vectors" and "feature_vector" in content:
-            embedding_vector = content.get("feature_vector")
-        elif collection_name.endswith("_skills") and "skill_vector" in content:
-            # 技能记忆集合使用skill_vector
-            embedding_vector = content.get("skill_vector")
-
-        if embedding_vector is not None:
-            collection.update(
-                ids=[doc_id],
-                documents=[json.dumps(content)],
-                metadatas=[metadata],
-                embeddings=[embedding_vector]  # 直接提供embedding向量
-            )
-        else:
-            collection.update(
-                ids=[doc_id],
-                documents=[json.dumps(content)],
-                metadatas=[metadata]
-            )
+        await self._run_write(
+            collection_name, "update", collection.update,
+            ids=[doc_id],
+            documents=[body],
+            metadatas=[metadata],
+            embeddings=[embedding_vector]  # 直接提供embedding向量
+        )
+
+        await self._run("manifest", self._update_manifest, collection_name, [(doc_id, content)])
         logger.info(f"已更新文档 {doc_id}")
 
+    async def delete_documents(self, collection_name: str, doc_ids: List[str],
+                               batch_size: int = BATCH_SIZE) -> None:
+        """
+        批量删除文档
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+            batch_size: 每批删除的数量
+        """
+        if not doc_ids:
+            return
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在，无法删除文档")
+            return
+
+        for start in range(0, len(doc_ids), batch_size):
+            await self._run_write(collection_name, "delete", collection.delete,
+                                  ids=list(doc_ids[start:start + batch_size]))
+
+        await self._run("manifest", self._remove_from_manifest, collection_name, list(doc_ids))
+        logger.info(f"已从 {collection_name} 删除 {len(doc_ids)} 个文档")
+
     async def search_documents(self, collection_name: str, query_vector: Optional[List[float]] = None,
-                               filter_dict: Dict[str, Any] = None, limit: int = 5) -> List[Dict[str, Any]]:
-        """搜索文档，支持向量相似度检索"""
-        # 如果集合不存在，首先确保所有集合已初始化
-        if collection_name not in self._collections:
-            logger.info(f"集合 {collection_name} 不存在，正在初始化所有集合")
-            await self.init_collections()
+                               filter_dict: Dict[str, Any] = None, limit: int = 5,
+                               include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        搜索文档，支持向量相似度检索
 
-            # 如果仍不存在，则返回空列表
-            if collection_name not in self._collections:
-                logger.info(f"集合 {collection_name} 不存在且无法创建，无法搜索文档")
-                return []
+        Args:
+            collection_name: 集合名称
+            query_vector: 查询向量，为None时按存储顺序返回前limit个文档
+            filter_dict: 元数据过滤条件
+            limit: 返回数量
+            include: 需要返回的字段（例如 ["id", "content"]），为None时返回完整文档；
+                     只请求id/similarity时不会读取和解析文档正文
 
-        collection = self._collections[collection_name]
+        Returns:
+            List[Dict[str, Any]]: 文档列表
+        """
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建，无法搜索文档")
+            return []
+
+        # 只在需要时读取文档正文
+        chroma_include = ["metadatas"]
+        if include is None or set(include) - _BODYLESS_FIELDS:
+            chroma_include.append("documents")
 
         try:
             # 如果没有提供查询向量，则返回前limit个文档
             if query_vector is None:
-                results = collection.get(limit=limit, where=filter_dict)
-                if results["documents"]:
-                    logger.info(f"从 {collection_name} 获取了 {len(results['documents'])} 个文档")
-                    documents = []
-                    for i, doc in enumerate(results["documents"]):
-                        if not doc:
-                            continue
-                        try:
-                            parsed_doc = json.loads(doc)
-                            if "metadatas" in results and i < len(results["metadatas"]) and results["metadatas"][i]:
-                                parsed_doc.update(results["metadatas"][i])
-                            documents.append(parsed_doc)
-                        except json.JSONDecodeError:
-                            logger.info(f"无法解析文档: {doc}")
-                    return documents
+                results = await self._run("get", collection.get, limit=limit, where=filter_dict,
+                                          include=chroma_include)
+                documents = self._build_results(
+                    collection_name,
+                    results["ids"],
+                    results.get("documents"),
+                    results.get("metadatas"),
+                    None,
+                    include
+                )
+                logger.info(f"从 {collection_name} 获取了 {len(documents)} 个文档")
+                return documents
             else:
                 # 使用向量相似度搜索
-                results = collection.query(
+                results = await self._run(
+                    "query", collection.query,
                     query_embeddings=[query_vector],
                     n_results=limit,
-                    where=filter_dict
+                    where=filter_dict,
+                    include=chroma_include + ["distances"]
                 )
 
-                if results["documents"] and results["documents"][0]:
-                    logger.info(f"从 {collection_name} 通过向量检索获取了 {len(results['documents'][0])} 个文档")
-                    documents = []
-                    for i, doc in enumerate(results["documents"][0]):
-                        if not doc:
-                            continue
-                        try:
-                            parsed_doc = json.loads(doc)
-                            # 添加相似度分数（ChromaDB返回距离，需转换为相似度）
-                            if "distances" in results and i < len(results["distances"][0]):
-                                distance = results["distances"][0][i]
-                                similarity = 1.0 / (1.0 + distance)  # 距离转相似度
-                                parsed_doc["similarity"] = similarity
-
-                            if "metadatas" in results and i < len(results["metadatas"][0]) and results["metadatas"][0][
-                                i]:
-                                parsed_doc.update(results["metadatas"][0][i])
-
-                            documents.append(parsed_doc)
-                        except json.JSONDecodeError:
-                            logger.info(f"无法解析文档: {doc}")
+                if results["ids"] and results["ids"][0]:
+                    documents = self._build_results(
+                        collection_name,
+                        results["ids"][0],
+                        results["documents"][0] if results.get("documents") else None,
+                        results["metadatas"][0] if results.get("metadatas") else None,
+                        self._to_l2_distances(results["distances"][0]) if results.get("distances") else None,
+                        include
+                    )
+                    logger.info(f"从 {collection_name} 通过向量检索获取了 {len(documents)} 个文档")
                     return documents
         except Exception as e:
             logger.info(f"搜索文档时出错: {str(e)}")
 
         return []
 
-    async def cleanup(self):
-        """清理资源"""
-        # PersistentClient 会自动管理数据持久化，不需要特别的清理操作
-        logger.info("清理资源")
\ No newline at end of file
+
+    async def search_documents_batch(self, collection_name: str, query_vectors: List[List[float]],
+                                     filter_dict: Dict[str, Any] = None, limit: int = 5,
+                                     include: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        批量向量检索，多个查询向量只调用一次collection.query
+
+        Args:
+            collection_name: 集合名称
+            query_vectors: 查询向量列表
+            filter_dict: 元数据过滤条件
+            limit: 每个查询的返回数量
+            include: 需要返回的字段，为None时返回完整文档
+
+        Returns:
+            List[List[Dict[str, Any]]]: 每个查询向量对应的文档列表
+        """
+        collection = await self._get_collection(collection_name)
+        if collection is None or not query_vectors:
+            return [[] for _ in query_vectors]
+
+        chroma_include = ["metadatas", "distances"]
+        if include is None or set(include) - _BODYLESS_FIELDS:
+            chroma_include.append("documents")
+
+        try:
+            results = await self._run(
+                "query", collection.query,
+                query_embeddings=list(query_vectors),
+                n_results=limit,
+                where=filter_dict,
+                include=chroma_include
+            )
+        except Exception as e:
+            logger.info(f"批量搜索文档时出错: {str(e)}")
+            return [[] for _ in query_vectors]
+
+        return [
+            self._build_results(
+                collection_name,
+                ids,
+                results["documents"][i] if results.get("documents") else None,
+                results["metadatas"][i] if results.get("metadatas") else None,
+                self._to_l2_distances(results["distances"][i]) if results.get("distances") else None,
+                include
+            )
+            for i, ids in enumerate(results["ids"])
+        ]
+
+    async def reset(self):
+        """删除所有集合和同步清单，用于从JSON完整重建"""
+        def _delete_all():
+            for collection in self.client.list_collections():
+                name = collection if isinstance(collection, str) else collection.name
+                self.client.delete_collection(name=name)
+
+        await self._run("reset", _delete_all)
+        self._collections = {}
+        self.manifest.clear()
+        await self._run("manifest", self.manifest.save)
+        logger.info("已清空向量数据库中的所有集合")
@@ -1,12 +1,14 @@
 # src/memory/memory_manager.py
+import asyncio
 import traceback
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
-import json
-from pathlib import Path
 
 from src.memory.enhanced_memory_manager import EnhancedMemoryManager
+from src.memory.snapshot_store import MemorySnapshotStore, SNAPSHOT_DIRNAME, SnapshotRefs
+from src.memory.sync_manifest import compute_content_hash
 from src.schemas.memory_schemas import SkillMemory, MedicalRecord
+from src.utils.therapist_config import TherapistConfig
 from src.utils.logger import logger
 from src.utils.exceptions import StateError
 
@@ -18,10 +20,18 @@ class MemoryManager(EnhancedMemoryManager):
     保持原有接口不变，以确保兼容性
     """
 
-    def __init__(self):
-        """初始化记忆管理器"""
+    def __init__(self, base_dir: Optional[str] = None, therapist_config: Optional[TherapistConfig] = None):
+        """初始化记忆管理器
+
+        Args:
+            base_dir: 记忆数据根目录，为None时使用默认路径
+            therapist_config: 咨询师配置，为None时加载默认配置文件
+        """
         # 调用父类的初始化方法
-        super().__init__()
+        super().__init__(base_dir=base_dir, therapist_config=therapist_config)
+
+        # 命名记忆快照（文档按内容哈希共享，恢复时只回写差异）
+        self.snapshot_store = MemorySnapshotStore(self.json_store.base_dir.joinpath(SNAPSHOT_DIRNAME))
 
     # 以下方法保留原接口，但实现委托给父类
 
@@ -32,37 +42,137 @@ class MemoryManager(EnhancedMemoryManager):
     ) -> None:
         """重置工作记忆到指定点
 
+        会话的工作记忆保存在运行时状态中，这里把长期记忆中的技能恢复到
+        在该重置点创建的快照（create_memory_snapshot(session_id, reset_point)）
+
         Args:
             session_id: 会话ID
             reset_point: 重置点标识
         """
-        pass
+        if self.snapshot_store.load(session_id, reset_point) is None:
+            logger.warning(f"会话 {session_id} 没有重置点 {reset_point} 的快照，跳过重置")
+            return
+        await self.restore_memory_snapshot(session_id, reset_point)
+
+    def _snapshot_collections(self) -> List[str]:
+        """参与快照的集合（所有技能集合）"""
+        return [name for name in self._collection_mapping.values() if name.endswith("_skills")]
+
+    def _capture_snapshot(self, collections: List[str]) -> Tuple[SnapshotRefs, Dict[str, Any], int]:
+        """读取各集合的清单，把对象目录中还没有的文档（含向量）写入快照存储"""
+        refs: SnapshotRefs = {}
+        written = 0
+        for collection_name in collections:
+            entries = self.json_store.get_manifest(collection_name)
+            refs[collection_name] = {doc_id: entry[0] for doc_id, entry in entries.items()}
+
+            missing = set(self.snapshot_store.missing_objects(refs[collection_name].values()))
+            if missing:
+                doc_ids = [doc_id for doc_id, content_hash in refs[collection_name].items() if content_hash in missing]
+                documents = self.json_store.get_documents(collection_name, doc_ids, with_vectors=True)
+                written += self.snapshot_store.put_objects(
+                    {compute_content_hash(collection_name, doc): doc for doc in documents}
+                )
+
+        usage = {collection_name: self.skill_usage.export(collection_name) for collection_name in collections}
+        return refs, usage, written
 
     async def create_memory_snapshot(
             self,
             session_id: str,
-            snapshot_name: str
-    ) -> None:
+            snapshot_name: str,
+            collections: Optional[List[str]] = None
+    ) -> Dict[str, int]:
         """创建记忆快照
 
+        快照记录技能集合的 文档ID -> 内容哈希 和技能使用统计，文档内容按哈希共享保存，
+        与已有快照相同的文档不会重复写入
+
         Args:
             session_id: 会话ID
-            snapshot_name: 快照名称
+            snapshot_name: 快照名称（同名快照会被覆盖）
+            collections: 参与快照的集合，默认所有技能集合
+
+        Returns:
+            Dict[str, int]: 集合名称 -> 文档数量
         """
-        pass
+        # 等待后台整理和JSON写入完成，保证清单反映所有已提交的写入
+        await self.skill_consolidator.wait_idle()
+        await self.flush_pending_writes()
+
+        names = collections or self._snapshot_collections()
+        refs, usage, written = await asyncio.to_thread(self._capture_snapshot, names)
+        await asyncio.to_thread(self.snapshot_store.save, session_id, snapshot_name, refs, usage)
+
+        counts = {collection_name: len(ids) for collection_name, ids in refs.items()}
+        logger.info(f"已创建记忆快照 {session_id}/{snapshot_name}: {counts}，新写入 {written} 个文档对象")
+        return counts
 
     async def restore_memory_snapshot(
             self,
             session_id: str,
             snapshot_name: str
-    ) -> None:
+    ) -> Dict[str, Dict[str, int]]:
         """恢复记忆快照
 
+        与当前同步清单比较，只回写内容不同的文档、删除快照之后新增的文档，
+        并恢复技能使用统计
+
         Args:
             session_id: 会话ID
             snapshot_name: 快照名称
+
+        Returns:
+            Dict[str, Dict[str, int]]: 集合名称 -> {"written": 回写数量, "removed": 删除数量}
         """
-        pass
+        snapshot = await asyncio.to_thread(self.snapshot_store.load, session_id, snapshot_name)
+        if snapshot is None:
+            raise StateError(f"记忆快照不存在: {session_id}/{snapshot_name}")
+
+        await self.skill_consolidator.wait_idle()
+        await self.flush_pending_writes()
+
+        results = {}
+        for collection_name, refs in snapshot.get("collections", {}).items():
+            current = await asyncio.to_thread(self.json_store.get_manifest, collection_name)
+            removed_ids = [doc_id for doc_id in current if doc_id not in refs]
+            changed = {doc_id: content_hash for doc_id, content_hash in refs.items()
+                       if current.get(doc_id, [None])[0] != content_hash}
+
+            objects = await asyncio.to_thread(self.snapshot_store.get_objects, changed.values())
+            documents = [objects[content_hash] for content_hash in changed.values() if content_hash in objects]
+            if documents or removed_ids:
+                await self.replace_skills(collection_name, documents, removed_ids)
+
+            self.skill_usage.restore(collection_name, snapshot.get("usage", {}).get(collection_name, {}))
+            results[collection_name] = {"written": len(documents), "removed": len(removed_ids)}
+
+        await asyncio.to_thread(self.skill_usage.save)
+        logger.info(f"已恢复记忆快照 {session_id}/{snapshot_name}: {results}")
+        return results
+
+    async def list_memory_snapshots(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出记忆快照
+
+        Args:
+            session_id: 只列出该会话的快照，为None时列出全部
+
+        Returns:
+            List[Dict[str, Any]]: 快照列表
+        """
+        return await asyncio.to_thread(self.snapshot_store.list, session_id)
+
+    async def delete_memory_snapshot(self, session_id: str, snapshot_name: str) -> bool:
+        """删除记忆快照（并清理不再被引用的文档对象）
+
+        Args:
+            session_id: 会话ID
+            snapshot_name: 快照名称
+
+        Returns:
+            bool: 快照是否存在
+        """
+        return await asyncio.to_thread(self.snapshot_store.delete, session_id, snapshot_name)
 
     async def create_student_vector(self, student_id: str, vector_data: Dict[str, Any],
                                     record_id: Optional[str] = None) -> str:
@@ -96,14 +206,12 @@ class MemoryManager(EnhancedMemoryManager):
                 metadata=metadata
             )
 
-            # 确保索引文件存在
-            self._ensure_vector_index_exists()
-
-            # 更新索引文件
-            self._update_vector_index(vector_id, student_id, record_id)
+            # 更新向量索引（单行写入）
+            await asyncio.to_thread(self.vector_index.put, vector_id, student_id, record_id)
 
             # 将向量数据也保存到JSON文件
             self.json_store.add_document("student_vectors", vector_data)
+            await self._index_documents("student_vectors", [vector_data])
 
             logger.info(f"创建了学生 {student_id} 的特征向量: {vector_id}")
             return vector_id
@@ -112,42 +220,6 @@ class MemoryManager(EnhancedMemoryManager):
             traceback.print_exc()
             raise StateError("学生特征向量创建失败") from e
 
-    def _ensure_vector_index_exists(self):
-        """确保向量索引文件存在"""
-        index_path = Path(self.json_store.base_dir).joinpath("vector_index.json")
-        if not index_path.exists():
-            with open(index_path, 'w', encoding='utf-8') as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
-
-    def _update_vector_index(self, vector_id: str, student_id: str, record_id: Optional[str] = None):
-        """更新向量索引文件
-
-        Args:
-            vector_id: 向量ID
-            student_id: 学生ID
-            record_id: 可选的病历记录ID
-        """
-        index_path = Path(self.json_store.base_dir).joinpath("vector_index.json")
-        try:
-            # 读取现有索引
-            with open(index_path, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-
-            # 更新索引
-            index_data[vector_id] = {
-                "student_id": student_id,
-                "record_id": record_id,
-                "updated_at": datetime.now().timestamp()
-            }
-
-            # 写回索引文件
-            with open(index_path, 'w', encoding='utf-8') as f:
-                json.dump(index_data, ensure_ascii=False, indent=2, fp=f)
-
-        except Exception as e:
-            logger.error(f"更新向量索引失败: {str(e)}")
-            traceback.print_exc()
-
     async def get_vector_by_id(self, vector_id: str) -> Optional[Dict[str, Any]]:
         """根据向量ID获取向量数据
 
@@ -164,32 +236,38 @@ class MemoryManager(EnhancedMemoryManager):
             # 尝试从JSON获取
             return self.json_store.get_document("student_vectors", vector_id)
 
-    async def find_similar_vectors(self, feature_text: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def find_similar_vectors(self, feature_text: str, limit: int = 10,
+                                   include: Optional[List[str]] = None,
+                                   query_vector: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """查找与给定特征文本相似的向量
 
         Args:
             feature_text: 特征文本
             limit: 返回结果的最大数量
+            include: 需要返回的字段（例如 ["id", "similarity"]），为None时返回完整文档
+            query_vector: 已计算好的特征向量，提供时不再重复调用向量化服务
 
         Returns:
             List[Dict[str, Any]]: 相似向量列表，按相似度降序排列
         """
         try:
-            # 使用统一的向量化服务获取向量
-            from src.utils.embedding_service import get_text_embedding
+            if query_vector is None:
+                # 使用统一的向量化服务获取向量
+                from src.utils.embedding_service import get_text_embedding
 
-            query_vector = get_text_embedding(feature_text)
+                query_vector = await asyncio.to_thread(get_text_embedding, feature_text)
 
             if query_vector is None:
                 logger.error("文本向量化失败，使用文本匹配作为后备方案")
-                return await self._fallback_text_search(feature_text, limit)
+                return await self._fallback_text_search(feature_text, limit, include)
 
             # 使用向量在student_vectors集合中进行相似度检索
             results = await self.vector_store.search_documents(
                 collection_name="student_vectors",
                 query_vector=query_vector,
                 filter_dict=None,
-                limit=limit
+                limit=limit,
+                include=include
             )
 
             logger.info(f"向量检索返回 {len(results)} 个相似结果")
@@ -198,81 +276,55 @@ class MemoryManager(EnhancedMemoryManager):
         except Exception as e:
             logger.error(f"查找相似向量失败: {str(e)}")
             # 使用文本匹配作为后备方案
-            return await self._fallback_text_search(feature_text, limit)
+            return await self._fallback_text_search(feature_text, limit, include)
 
-    async def _fallback_text_search(self, feature_text: str, limit: int) -> List[Dict[str, Any]]:
-        """文本匹配的后备搜索方案"""
+    async def _fallback_text_search(self, feature_text: str, limit: int,
+                                    include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """文本匹配的后备搜索方案（基于特征文本的BM25词法索引）"""
         try:
-            # 获取所有学生向量进行文本匹配
-            all_vectors = await self.vector_store.search_documents(
+            results = await self.hybrid_search("student_vectors", feature_text, None, limit, include)
+            if results:
+                return results
+
+            # 词法索引没有命中时返回前limit个学生向量
+            return await self.vector_store.search_documents(
                 collection_name="student_vectors",
                 query_vector=None,
                 filter_dict=None,
-                limit=100  # 获取更多数据进行文本匹配
+                limit=limit,
+                include=include
             )
 
-            # 计算文本相似度并排序
-            scored_vectors = []
-            for vector in all_vectors:
-                vector_text = vector.get("feature_text", "")
-                similarity = self._calculate_text_similarity(feature_text, vector_text)
-                vector["similarity"] = similarity
-                scored_vectors.append(vector)
-
-            # 按相似度排序并返回前limit个
-            scored_vectors.sort(key=lambda x: x.get("similarity", 0), reverse=True)
-            return scored_vectors[:limit]
-
         except Exception as e:
             logger.error(f"后备文本搜索失败: {str(e)}")
             return []
 
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """计算两个文本的相似度（词袋模型 + 余弦相似度）"""
-        if not text1 or not text2:
-            return 0.0
-
-        # 分词
-        words1 = text1.split()
-        words2 = text2.split()
-
-        # 构建词汇表
-        vocabulary = sorted(set(words1).union(set(words2)))
-
-        # 构建词袋向量
-        vector1 = [words1.count(word) for word in vocabulary]
-        vector2 = [words2.count(word) for word in vocabulary]
-
-        # 计算向量的点积
-        dot_product = sum(a * b for a, b in zip(vector1, vector2))
-
-        # 计算向量的范数
-        magnitude1 = sum(a * a for a in vector1) ** 0.5
-        magnitude2 = sum(b * b for b in vector2) ** 0.5
+    async def get_vector_index(self, student_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """获取向量索引
 
-        # 避免除以零
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
+        Args:
+            student_id: 只返回该学生的向量，为None时返回全部
 
-        # 计算余弦相似度
-        similarity = dot_product / (magnitude1 * magnitude2)
+        Returns:
+            Dict[str, Dict[str, Any]]: 向量ID -> {"student_id", "record_id", "updated_at"}
+        """
+        try:
+            return await asyncio.to_thread(self.vector_index.find, student_id)
+        except Exception as e:
+            logger.error(f"获取向量索引失败: {str(e)}")
+            return {}
 
-        return similarity
+    async def get_vector_index_entries(self, vector_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按向量ID批量点查向量索引
 
-    async def get_vector_index(self) -> Dict[str, Dict[str, Any]]:
-        """获取向量索引
+        Args:
+            vector_ids: 向量ID列表
 
         Returns:
-            Dict[str, Dict[str, Any]]: 向量索引数据
+            Dict[str, Dict[str, Any]]: 向量ID -> {"student_id", "record_id", "updated_at"}，不存在的ID被省略
         """
-        index_path = Path(self.json_store.base_dir).joinpath("vector_index.json")
         try:
-            if not index_path.exists():
-                self._ensure_vector_index_exists()
-                return {}
-
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return await asyncio.to_thread(self.vector_index.get_many, list(vector_ids))
         except Exception as e:
-            logger.error(f"获取向量索引失败: {str(e)}")
-            return {}
\ No newline at end of file
+            logger.error(f"查询向量索引失败: {str(e)}")
+            return {}
@@ -0,0 +1,722 @@
+# src/memory/numpy_vector_store.py
+"""
+进程内NumPy向量存储
+向量以L2归一化的float32矩阵常驻内存，检索只需一次矩阵乘法和argpartition；
+向量通过内存映射矩阵持久化，文档正文和元数据保存在追加写的日志文件中。
+集合较大时可以启用IVF倒排索引，只扫描最接近查询向量的若干个聚类。
+"""
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.memory.vector_matrix_store import VectorMatrix, get_vector_field
+from src.memory.vector_store_base import VectorStoreBase, BATCH_SIZE, DEFAULT_MAX_WORKERS, _BODYLESS_FIELDS
+from src.utils.therapist_config import TherapistConfig
+from src.utils.logger import logger
+
+
+# 默认启用IVF索引的向量数量，0表示始终使用精确的暴力检索
+DEFAULT_IVF_THRESHOLD = 0
+
+# IVF检索时探查的聚类数量
+DEFAULT_IVF_NPROBE = 32
+
+
+def _matches(metadata: Optional[Dict[str, Any]], filter_dict: Optional[Dict[str, Any]]) -> bool:
+    """
+    判断元数据是否满足过滤条件，支持等值、$eq、$ne、$in以及$and/$or组合
+
+    Args:
+        metadata: 元数据
+        filter_dict: 过滤条件（ChromaDB的where语法子集）
+
+    Returns:
+        bool: 是否满足
+    """
+    if not filter_dict:
+        return True
+    metadata = metadata or {}
+    for key, condition in filter_dict.items():
+        if key == "$and":
+            if not all(_matches(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, expected in condition.items():
+                if op == "$eq" and value != expected:
+                    return False
+                if op == "$ne" and value == expected:
+                    return False
+                if op == "$in" and value not in expected:
+                    return False
+                if op == "$nin" and value in expected:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class _IVFIndex:
+    """基于球面k-means的IVF倒排索引
+
+    建立索引后新增或修改的行不会重新分配聚类，而是作为"尾部"在每次检索时全量扫描，
+    尾部过大时由集合重新建立索引
+    """
+
+    def __init__(self, centroids: np.ndarray, lists: List[np.ndarray], built_rows: int):
+        self.centroids = centroids
+        self.lists = lists
+        self.built_rows = built_rows
+        self.dirty_rows: set = set()
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, rows: np.ndarray, iterations: int = 10, seed: int = 0) -> "_IVFIndex":
+        """
+        建立索引
+
+        Args:
+            vectors: 归一化后的向量矩阵
+            rows: 参与建索引的有效行号
+            iterations: k-means迭代次数
+            seed: 随机种子
+
+        Returns:
+            _IVFIndex: 索引
+        """
+        data = vectors[rows]
+        nlist = max(1, int(np.sqrt(len(rows))))
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(rows), size=nlist, replace=False)].copy()
+
+        assignment = np.zeros(len(rows), dtype=np.int64)
+        for _ in range(iterations):
+            assignment = cls._assign(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # 空聚类保留原来的中心
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        lists = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(nlist)]
+        return cls(centroids, lists, built_rows=vectors.shape[0])
+
+    @staticmethod
+    def _assign(data: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        """分块计算每个向量最近的聚类中心"""
+        result = np.empty(len(data), dtype=np.int64)
+        for start in range(0, len(data), chunk):
+            result[start:start + chunk] = np.argmax(data[start:start + chunk] @ centroids.T, axis=1)
+        return result
+
+    def candidates(self, query: np.ndarray, total_rows: int, nprobe: int) -> np.ndarray:
+        """
+        获取查询向量的候选行
+
+        Args:
+            query: 归一化后的查询向量
+            total_rows: 当前矩阵总行数
+            nprobe: 探查的聚类数量
+
+        Returns:
+            np.ndarray: 候选行号
+        """
+        nprobe = min(nprobe, len(self.lists))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        parts = [self.lists[i] for i in probe]
+        parts.append(np.arange(self.built_rows, total_rows))
+        if self.dirty_rows:
+            parts.append(np.fromiter(self.dirty_rows, dtype=np.int64))
+        return np.unique(np.concatenate(parts))
+
+    def tail_size(self, total_rows: int) -> int:
+        """建立索引后新增或修改的行数"""
+        return total_rows - self.built_rows + len(self.dirty_rows)
+
+
+class _NumpyCollection:
+    """单个集合：向量矩阵 + 文档日志
+
+    文件布局（位于持久化目录下）:
+    - {name}.bin / {name}.ids / {name}.meta.json: 原始向量的内存映射矩阵
+    - {name}.docs.jsonl: 文档日志，每行一次写入或删除，加载时按顺序回放
+    """
+
+    def __init__(self, base_dir: Path, name: str, ivf_threshold: int, ivf_nprobe: int):
+        self.name = name
+        # 同一组矩阵文件只有一个实例，行数和写锁在所有使用者之间一致
+        self.vectors = VectorMatrix.open(base_dir, name)
+        self.log_path = Path(base_dir).joinpath(f"{name}.docs.jsonl")
+        self.ivf_threshold = ivf_threshold
+        self.ivf_nprobe = ivf_nprobe
+
+        # 文档ID -> (正文JSON, 元数据)，保持写入顺序
+        self.documents: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self._log_lines = 0
+
+        # 归一化向量缓冲区（按容量倍增），前 len(vectors._row_ids) 行有效
+        self._normed: Optional[np.ndarray] = None
+        self._valid: Optional[np.ndarray] = None
+        self._ivf: Optional[_IVFIndex] = None
+
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """回放文档日志"""
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 最后一行可能因中断而不完整
+                    logger.warning(f"跳过 {self.log_path} 中无法解析的日志行")
+                    continue
+                self._log_lines += 1
+                if entry.get("deleted"):
+                    self.documents.pop(entry["id"], None)
+                else:
+                    self.documents[entry["id"]] = (entry["document"], entry.get("metadata"))
+
+    @property
+    def _rows(self) -> int:
+        return len(self.vectors._row_ids)
+
+    def _ensure_normed(self) -> Optional[np.ndarray]:
+        """从内存映射矩阵构建归一化向量缓冲区"""
+        if self._normed is None:
+            matrix = self.vectors.matrix()
+            if matrix is None:
+                return None
+            normed = np.array(matrix, dtype=np.float32)
+            norms = np.linalg.norm(normed, axis=1, keepdims=True)
+            np.divide(normed, norms, out=normed, where=norms > 0)
+            self._normed = normed
+        return self._normed
+
+    def _write_normed(self, rows: Dict[int, np.ndarray]):
+        """把新写入的向量同步到归一化缓冲区"""
+        if self._normed is None:
+            return
+        needed = self._rows
+        if needed > self._normed.shape[0]:
+            capacity = max(needed, self._normed.shape[0] * 2)
+            grown = np.zeros((capacity, self.vectors.dim), dtype=np.float32)
+            grown[:self._normed.shape[0]] = self._normed
+            self._normed = grown
+        for row, vector in rows.items():
+            norm = np.linalg.norm(vector)
+            self._normed[row] = vector / norm if norm > 0 else vector
+
+    def _valid_rows(self) -> np.ndarray:
+        """有效行（未删除）的掩码"""
+        if self._valid is None or self._valid.shape[0] != self._rows:
+            self._valid = np.array([doc_id is not None for doc_id in self.vectors._row_ids], dtype=bool)
+        return self._valid
+
+    def write(self, items: List[Tuple[str, str, Optional[Dict[str, Any]], Optional[List[float]]]]):
+        """
+        写入文档（已存在的ID会被覆盖）
+
+        Args:
+            items: (文档ID, 正文JSON, 元数据, 向量) 列表
+        """
+        with self._lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for doc_id, body, metadata, _ in items:
+                    f.write(json.dumps({"id": doc_id, "document": body, "metadata": metadata},
+                                       ensure_ascii=False) + "\n")
+            self._log_lines += len(items)
+            for doc_id, body, metadata, _ in items:
+                self.documents[doc_id] = (body, metadata)
+
+            vector_items = [(doc_id, vector) for doc_id, _, _, vector in items if vector is not None]
+            if vector_items:
+                existing = {doc_id: self.vectors._id_to_row[doc_id]
+                            for doc_id, _ in vector_items if doc_id in self.vectors}
+                self.vectors.put_many(vector_items)
+                changed = {self.vectors._id_to_row[doc_id]: np.asarray(vector, dtype=np.float32)
+                           for doc_id, vector in vector_items if doc_id in self.vectors}
+                self._write_normed(changed)
+                self._valid = None
+                if self._ivf is not None:
+                    self._ivf.dirty_rows.update(row for row in existing.values())
+
+            self._maybe_compact()
+
+    def remove(self, doc_ids: List[str]) -> int:
+        """
+        删除文档
+
+        Args:
+            doc_ids: 文档ID列表
+
+        Returns:
+            int: 删除的文档数量
+        """
+        with self._lock:
+            removed = [doc_id for doc_id in doc_ids if doc_id in self.documents]
+            if not removed:
+                return 0
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for doc_id in removed:
+                    f.write(json.dumps({"id": doc_id, "deleted": True}) + "\n")
+            self._log_lines += len(removed)
+            for doc_id in removed:
+                self.documents.pop(doc_id, None)
+                self.vectors.remove(doc_id)
+            self._valid = None
+            self._maybe_compact()
+            return len(removed)
+
+    def _maybe_compact(self):
+        """日志中过期的行过多时重写日志并压缩向量矩阵"""
+        if self._log_lines <= 2 * len(self.documents) + 1000:
+            return
+        tmp_path = self.log_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for doc_id, (body, metadata) in self.documents.items():
+                f.write(json.dumps({"id": doc_id, "document": body, "metadata": metadata},
+                                   ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.log_path)
+        self._log_lines = len(self.documents)
+
+        self.vectors.compact()
+        self._normed = None
+        self._valid = None
+        self._ivf = None
+        logger.info(f"NumPy向量集合 {self.name} 压缩完成，剩余 {len(self.documents)} 个文档")
+
+    def _filter_mask(self, filter_dict: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """按元数据过滤条件构建行掩码"""
+        if not filter_dict:
+            return None
+        mask = np.zeros(self._rows, dtype=bool)
+        for row, doc_id in enumerate(self.vectors._row_ids):
+            if doc_id is not None and doc_id in self.documents and _matches(self.documents[doc_id][1], filter_dict):
+                mask[row] = True
+        return mask
+
+    def _maybe_build_ivf(self):
+        """向量数量超过阈值时建立（或在尾部过大时重建）IVF索引"""
+        valid = self._valid_rows()
+        live = int(valid.sum())
+        if self.ivf_threshold <= 0 or live < self.ivf_threshold:
+            self._ivf = None
+            return
+        if self._ivf is not None and self._ivf.tail_size(self._rows) <= 0.2 * self._ivf.built_rows:
+            return
+        rows = np.flatnonzero(valid)
+        self._ivf = _IVFIndex.build(self._normed[:self._rows], rows)
+        logger.info(f"NumPy向量集合 {self.name} 建立IVF索引: {len(self._ivf.lists)} 个聚类，{live} 个向量")
+
+    def query(self, query_vectors: np.ndarray, limit: int,
+              filter_dict: Optional[Dict[str, Any]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        批量检索
+
+        Args:
+            query_vectors: 查询向量矩阵 (查询数, 维度)
+            limit: 每个查询的返回数量
+            filter_dict: 元数据过滤条件
+
+        Returns:
+            List[List[Tuple[str, float]]]: 每个查询的 (文档ID, 平方L2距离) 列表，按距离升序
+        """
+        with self._lock:
+            normed = self._ensure_normed()
+            if normed is None or limit <= 0:
+                return [[] for _ in range(len(query_vectors))]
+            if query_vectors.shape[1] != self.vectors.dim:
+                logger.warning(f"查询向量维度不匹配: {query_vectors.shape[1]} != {self.vectors.dim}")
+                return [[] for _ in range(len(query_vectors))]
+
+            norms = np.linalg.norm(query_vectors, axis=1, keepdims=True)
+            queries = np.divide(query_vectors, norms, out=np.zeros_like(query_vectors), where=norms > 0)
+
+            rows = self._rows
+            matrix = normed[:rows]
+            mask = self._valid_rows()
+            filter_mask = self._filter_mask(filter_dict)
+            if filter_mask is not None:
+                mask = mask & filter_mask
+
+            # 过滤查询只扫描满足条件的行，无需IVF
+            if filter_mask is None:
+                self._maybe_build_ivf()
+            use_ivf = self._ivf is not None and filter_mask is None
+
+            results = []
+            if use_ivf:
+                for query in queries:
+                    candidates = self._ivf.candidates(query, rows, self.ivf_nprobe)
+                    candidates = candidates[mask[candidates]]
+                    scores = matrix[candidates] @ query
+                    results.append(self._top_k(candidates, scores, limit))
+            else:
+                candidates = np.flatnonzero(mask)
+                if len(candidates) == len(mask):
+                    # 一次矩阵乘法得到所有查询的得分
+                    score_matrix = matrix @ queries.T
+                else:
+                    score_matrix = matrix[candidates] @ queries.T
+                for i in range(len(queries)):
+                    results.append(self._top_k(candidates, score_matrix[:, i], limit))
+            return results
+
+    def _top_k(self, candidates: np.ndarray, scores: np.ndarray, limit: int) -> List[Tuple[str, float]]:
+        """用argpartition选出得分最高的limit个结果，并把余弦相似度换算为平方L2距离"""
+        if len(candidates) == 0:
+            return []
+        k = min(limit, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        row_ids = self.vectors._row_ids
+        # 归一化向量的平方L2距离 = 2 - 2·cos，与ChromaDB后端换算后的距离保持一致
+        return [(row_ids[candidates[i]], float(max(0.0, 2.0 - 2.0 * scores[i]))) for i in top]
+
+    def get(self, doc_ids: Optional[List[str]] = None, filter_dict: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, str, Optional[Dict[str, Any]]]]:
+        """
+        按ID或元数据条件获取文档
+
+        Returns:
+            List[Tuple[str, str, Optional[Dict[str, Any]]]]: (文档ID, 正文JSON, 元数据) 列表
+        """
+        with self._lock:
+            if doc_ids is not None:
+                items = [(doc_id, *self.documents[doc_id]) for doc_id in doc_ids if doc_id in self.documents]
+            else:
+                items = [(doc_id, body, metadata) for doc_id, (body, metadata) in self.documents.items()
+                         if _matches(metadata, filter_dict)]
+            end = None if limit is None else offset + limit
+            return items[offset:end]
+
+    def ids(self) -> List[str]:
+        """所有文档ID，按写入顺序"""
+        with self._lock:
+            return list(self.documents.keys())
+
+    def get_vector(self, doc_id: str) -> Optional[List[float]]:
+        """获取原始向量"""
+        with self._lock:
+            return self.vectors.get(doc_id)
+
+    def delete_files(self):
+        """删除集合的所有文件"""
+        with self._lock:
+            # 共享的矩阵实例同时清空内存中的行号映射，之后重新打开的集合不会读到旧的行
+            self.vectors.clear()
+            if self.log_path.exists():
+                os.remove(self.log_path)
+
+
+class NumpyVectorStore(VectorStoreBase):
+    """进程内NumPy向量存储，与LongTermMemoryStore提供相同的接口"""
+
+    def __init__(self, persist_directory=None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 ivf_threshold: int = DEFAULT_IVF_THRESHOLD, ivf_nprobe: int = DEFAULT_IVF_NPROBE,
+                 therapist_config: Optional[TherapistConfig] = None):
+        """
+        初始化NumPy向量存储
+
+        Args:
+            persist_directory: 持久化目录，如果为None则使用默认路径
+            max_workers: 执行检索和写入的线程池大小
+            ivf_threshold: 集合向量数量达到该值时启用IVF索引，0表示不启用
+            ivf_nprobe: IVF检索时探查的聚类数量
+            therapist_config: 咨询师配置，为None时加载默认配置文件
+        """
+        if persist_directory is None:
+            # 在src目录下创建long-term-memories-numpy文件夹
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            persist_directory = os.path.join(base_dir, "long-term-memories-numpy")
+
+        super().__init__(persist_directory, max_workers, therapist_config)
+
+        logger.info(f"NumPy向量存储持久化目录: {self.persist_directory}")
+
+        self.ivf_threshold = ivf_threshold
+        self.ivf_nprobe = ivf_nprobe
+        self._collections: Dict[str, _NumpyCollection] = {}
+
+    def _open(self, collection_name: str) -> _NumpyCollection:
+        """打开（必要时创建）集合"""
+        if collection_name not in self._collections:
+            self._collections[collection_name] = _NumpyCollection(
+                Path(self.persist_directory), collection_name, self.ivf_threshold, self.ivf_nprobe
+            )
+        return self._collections[collection_name]
+
+    def _open_collection(self, collection_name: str):
+        """打开（必要时创建）默认集合（在线程池中执行）"""
+        self._open(collection_name)
+
+    async def init_collections(self):
+        """打开所有默认集合（通常不需要调用，集合会在首次使用时打开）"""
+        def _open_all():
+            for name in self._collection_names():
+                self._open(name)
+
+        await self._run("init_collections", _open_all)
+        logger.info(f"NumPy向量存储加载了 {len(self._collections)} 个集合")
+
+    def has_collection(self, collection_name: str) -> bool:
+        """集合是否已加载"""
+        return collection_name in self._collections
+
+    async def ensure_collection(self, collection_name: str) -> _NumpyCollection:
+        """确保集合存在，不存在时创建"""
+        if collection_name not in self._collections:
+            await self._run("create_collection", self._open, collection_name)
+        return self._collections[collection_name]
+
+    async def add_documents(self, collection_name: str, doc_ids: List[str], contents: List[Dict[str, Any]],
+                            metadatas: List[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> int:
+        """批量添加文档（已存在的ID会被覆盖）"""
+        return await self._write_documents(collection_name, doc_ids, contents, metadatas, batch_size)
+
+    async def upsert_documents(self, collection_name: str, doc_ids: List[str], contents: List[Dict[str, Any]],
+                               metadatas: List[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> int:
+        """批量插入或更新文档"""
+        return await self._write_documents(collection_name, doc_ids, contents, metadatas, batch_size)
+
+    async def _write_documents(self, collection_name: str, doc_ids: List[str], contents: List[Dict[str, Any]],
+                               metadatas: List[Dict[str, Any]], batch_size: int) -> int:
+        """按批次写入文档"""
+        if not doc_ids:
+            return 0
+
+        collection = await self._get_collection(collection_name, create=True)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建，无法写入文档")
+            return 0
+
+        items = []
+        for doc_id, content, metadata in zip(doc_ids, contents, metadatas):
+            body, embedding_vector = self._split_embedding(collection_name, content)
+            items.append((doc_id, body, metadata or None, embedding_vector))
+
+        for start in range(0, len(items), batch_size):
+            await self._run_write(collection_name, "upsert", collection.write, items[start:start + batch_size])
+
+        await self._run("manifest", self._update_manifest, collection_name, list(zip(doc_ids, contents)))
+
+        if len(items) == 1:
+            logger.info(f"已添加文档到 {collection_name}")
+        else:
+            logger.info(f"已批量写入 {len(items)} 个文档到 {collection_name}")
+        return len(items)
+
+    async def update_document(self, collection_name: str, doc_id: str, content: Dict[str, Any],
+                              metadata: Dict[str, Any]) -> None:
+        """更新指定文档"""
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建，无法更新文档")
+            return
+        await self._write_documents(collection_name, [doc_id], [content], [metadata], BATCH_SIZE)
+        logger.info(f"已更新文档 {doc_id}")
+
+    async def get_document(self, collection_name: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """获取指定文档"""
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建")
+            return None
+        items = await self._run("get", collection.get, doc_ids=[doc_id])
+        if items:
+            logger.info(f"从 {collection_name} 成功获取文档 {doc_id}")
+            return self._parse_document(collection_name, items[0][1])
+        logger.info(f"在 {collection_name} 中未找到文档 {doc_id}")
+        return None
+
+    async def get_documents(self, collection_name: str, doc_ids: List[str],
+                            include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """批量获取指定文档，按doc_ids顺序返回，不存在的文档被跳过"""
+        collection = await self._get_collection(collection_name)
+        if collection is None or not doc_ids:
+            return []
+        items = await self._run("get", collection.get, doc_ids=list(doc_ids))
+        return self._build_results(
+            collection_name,
+            [item[0] for item in items],
+            self._bodies(items, include),
+            [item[2] for item in items],
+            None,
+            include
+        )
+
+    async def get_document_ids(self, collection_name: str, batch_size: int = BATCH_SIZE) -> List[str]:
+        """获取集合中所有文档ID"""
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return []
+        return await self._run("get", collection.ids)
+
+    async def export_documents(self, collection_name: str, batch_size: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+        """导出集合中的所有文档，并把向量重新附加到向量字段"""
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            return []
+
+        field = get_vector_field(collection_name)
+        items = await self._run("export", collection.get)
+        documents = self._build_results(
+            collection_name, [item[0] for item in items], [item[1] for item in items],
+            [item[2] for item in items], None, None
+        )
+        if field:
+            def _attach_vectors():
+                for doc in documents:
+                    vector = collection.get_vector(doc["id"])
+                    if vector is not None:
+                        doc[field] = vector
+
+            await self._run("export", _attach_vectors)
+
+        logger.info(f"从 {collection_name} 导出了 {len(documents)} 个文档")
+        return documents
+
+    async def delete_documents(self, collection_name: str, doc_ids: List[str],
+                               batch_size: int = BATCH_SIZE) -> None:
+        """批量删除文档"""
+        if not doc_ids:
+            return
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在，无法删除文档")
+            return
+
+        removed = await self._run_write(collection_name, "delete", collection.remove, list(doc_ids))
+        await self._run("manifest", self._remove_from_manifest, collection_name, list(doc_ids))
+        logger.info(f"已从 {collection_name} 删除 {removed} 个文档")
+
+    async def search_documents(self, collection_name: str, query_vector: Optional[List[float]] = None,
+                               filter_dict: Dict[str, Any] = None, limit: int = 5,
+                               include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        搜索文档，支持向量相似度检索
+
+        Args:
+            collection_name: 集合名称
+            query_vector: 查询向量，为None时按存储顺序返回前limit个文档
+            filter_dict: 元数据过滤条件
+            limit: 返回数量
+            include: 需要返回的字段，为None时返回完整文档
+
+        Returns:
+            List[Dict[str, Any]]: 文档列表
+        """
+        collection = await self._get_collection(collection_name)
+        if collection is None:
+            logger.info(f"集合 {collection_name} 不存在且无法创建，无法搜索文档")
+            return []
+
+        try:
+            if query_vector is None:
+                items = await self._run("get", collection.get, filter_dict=filter_dict, limit=limit)
+                documents = self._build_results(
+                    collection_name,
+                    [item[0] for item in items],
+                    self._bodies(items, include),
+                    [item[2] for item in items],
+                    None,
+                    include
+                )
+                logger.info(f"从 {collection_name} 获取了 {len(documents)} 个文档")
+                return documents
+
+            results = await self.search_documents_batch(collection_name, [query_vector], filter_dict, limit, include)
+            documents = results[0] if results else []
+            logger.info(f"从 {collection_name} 通过向量检索获取了 {len(documents)} 个文档")
+            return documents
+        except Exception as e:
+            logger.info(f"搜索文档时出错: {str(e)}")
+            return []
+
+    async def search_documents_batch(self, collection_name: str, query_vectors: List[List[float]],
+                                     filter_dict: Dict[str, Any] = None, limit: int = 5,
+                                     include: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        批量向量检索，所有查询共用一次矩阵乘法
+
+        Args:
+            collection_name: 集合名称
+            query_vectors: 查询向量列表
+            filter_dict: 元数据过滤条件
+            limit: 每个查询的返回数量
+            include: 需要返回的字段，为None时返回完整文档
+
+        Returns:
+            List[List[Dict[str, Any]]]: 每个查询向量对应的文档列表
+        """
+        collection = await self._get_collection(collection_name)
+        if collection is None or not query_vectors:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        hits = await self._run("query", collection.query, queries, limit, filter_dict)
+
+        # 所有查询命中的文档一次性在线程池中读取
+        hit_ids = list(dict.fromkeys(doc_id for matches in hits for doc_id, _ in matches))
+        items = await self._run("get", collection.get, doc_ids=hit_ids)
+        by_id = {item[0]: item for item in items}
+
+        results = []
+        for matches in hits:
+            ids = [doc_id for doc_id, _ in matches]
+            ids = [doc_id for doc_id in ids if doc_id in by_id]
+            distances = {doc_id: distance for doc_id, distance in matches}
+            results.append(self._build_results(
+                collection_name,
+                ids,
+                self._bodies([by_id[doc_id] for doc_id in ids], include),
+                [by_id[doc_id][2] for doc_id in ids],
+                [distances[doc_id] for doc_id in ids],
+                include
+            ))
+        return results
+
+    @staticmethod
+    def _bodies(items: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+                include: Optional[List[str]]) -> Optional[List[str]]:
+        """只在需要正文字段时返回正文，避免解析JSON"""
+        if include is not None and not set(include) - _BODYLESS_FIELDS:
+            return None
+        return [item[1] for item in items]
+
+    async def reset(self):
+        """删除所有集合的数据和同步清单"""
+        def _delete_all():
+            for collection in self._collections.values():
+                collection.delete_files()
+            # 未加载的集合可能仍有共享的矩阵实例，同样清空
+            for path in Path(self.persist_directory).glob("*.bin"):
+                VectorMatrix.open(path.parent, path.stem).clear()
+            # 未加载的集合文件也一并删除
+            for pattern in ("*.docs.jsonl", "*.bin", "*.ids", "*.meta.json"):
+                for path in Path(self.persist_directory).glob(pattern):
+                    os.remove(path)
+
+        await self._run("reset", _delete_all)
+        self._collections = {}
+        self.manifest.clear()
+        await self._run("manifest", self.manifest.save)
+        logger.info("已清空NumPy向量存储中的所有集合")
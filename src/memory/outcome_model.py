@@ -0,0 +1,404 @@
+# src/memory/outcome_model.py
+"""
+治疗效果模型
+按特征桶（学生基本信息中的每个 字段:取值，以及全体记录）增量维护各治疗流派
+totalImprovementScore 的计数、总和与平方和，创建或更新病历时只修改该病历涉及的桶。
+推荐治疗流派只需读取当前学生所在的少量桶，与病历数量无关。
+"""
+import ast
+import json
+import math
+import sqlite3
+import threading
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from src.memory.sync_manifest import compute_content_hash
+from src.utils.logger import logger
+
+
+# 模型数据库文件名
+OUTCOME_MODEL_FILENAME = "therapy_outcomes.sqlite3"
+
+# 集合名称（用于计算内容哈希）
+RECORD_COLLECTION = "medical_records"
+
+# 全体记录所在的桶
+GLOBAL_BUCKET = "*"
+
+# 标识个人身份、不参与分桶的基本信息字段
+IGNORED_FIELDS = {"id", "name", "student_id", "studentId"}
+
+# 先验强度：相当于多少条全局平均水平的伪观测
+DEFAULT_PRIOR_STRENGTH = 5.0
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS record_outcomes (
+        id TEXT PRIMARY KEY,
+        therapy_type TEXT,
+        score REAL,
+        buckets TEXT,
+        content_hash TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS outcome_buckets (
+        bucket TEXT NOT NULL,
+        therapy_type TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        total REAL NOT NULL,
+        total_sq REAL NOT NULL,
+        PRIMARY KEY (bucket, therapy_type)
+    ) WITHOUT ROWID""",
+]
+
+_ACCUMULATE_SQL = (
+    "INSERT INTO outcome_buckets (bucket, therapy_type, n, total, total_sq) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(bucket, therapy_type) DO UPDATE SET "
+    "n = n + excluded.n, total = total + excluded.total, total_sq = total_sq + excluded.total_sq"
+)
+
+# 单条病历对模型的贡献: (治疗流派, 改善分数, 特征桶列表)
+Outcome = Tuple[str, float, List[str]]
+
+
+def _parse_mapping(value: Any) -> Dict[str, Any]:
+    """基本信息可能以字典或其字符串形式保存"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value.strip().startswith("{"):
+        try:
+            parsed = ast.literal_eval(value)
+            return parsed if isinstance(parsed, dict) else {}
+        except (ValueError, SyntaxError):
+            return {}
+    return {}
+
+
+def feature_buckets(basic_info: Any) -> List[str]:
+    """
+    计算学生所属的特征桶
+
+    Args:
+        basic_info: 学生基本信息（字典或其字符串形式）
+
+    Returns:
+        List[str]: 特征桶列表（不含全局桶），格式与特征文本一致，如 "gender:女"
+    """
+    buckets = []
+    for key, value in _parse_mapping(basic_info).items():
+        if key in IGNORED_FIELDS or isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            continue
+        if value == "":
+            continue
+        buckets.append(f"{key}:{value}")
+    return sorted(set(buckets))
+
+
+def extract_outcome(record: Dict[str, Any]) -> Optional[Outcome]:
+    """
+    提取病历对模型的贡献
+
+    Args:
+        record: 医疗记录
+
+    Returns:
+        Optional[Outcome]: 缺少治疗流派或改善分数无法解析时返回None
+    """
+    therapy_type = record.get("therapyType") or record.get("therapy_type")
+    try:
+        score = float(record.get("totalImprovementScore"))
+    except (TypeError, ValueError):
+        return None
+    if not therapy_type or math.isnan(score):
+        return None
+    return therapy_type, score, feature_buckets(record.get("basic_info"))
+
+
+def _locked(method):
+    """在连接锁内执行（sqlite连接在线程池和事件循环之间共享）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _normal_cdf(x: float) -> float:
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+def rank_estimates(estimates: Dict[str, Dict[str, float]]) -> Tuple[Optional[str], float]:
+    """
+    选出期望改善分数最高的治疗流派，并给出置信度
+
+    置信度为最优流派的真实期望高于次优流派的近似概率（正态近似）；
+    只有一个流派有数据时为其有效样本量占比。
+
+    Args:
+        estimates: 治疗流派 -> {"expected_improvement", "stderr", "effective_n", "support", ...}
+
+    Returns:
+        Tuple[Optional[str], float]: (最优流派, 置信度)；没有任何数据时为 (None, 0.0)
+    """
+    observed = {t: e for t, e in estimates.items() if e.get("support", 0) > 0}
+    if not observed:
+        return None, 0.0
+
+    ranked = sorted(observed.items(), key=lambda item: item[1]["expected_improvement"], reverse=True)
+    best_type, best = ranked[0]
+    if len(ranked) == 1:
+        effective_n = best["effective_n"]
+        return best_type, effective_n / (effective_n + DEFAULT_PRIOR_STRENGTH)
+
+    runner_up = ranked[1][1]
+    spread = math.sqrt(best["stderr"] ** 2 + runner_up["stderr"] ** 2)
+    gap = best["expected_improvement"] - runner_up["expected_improvement"]
+    if spread <= 0:
+        return best_type, 1.0 if gap > 0 else 0.5
+    return best_type, _normal_cdf(gap / spread)
+
+
+def blend_cases(estimates: Dict[str, Dict[str, float]],
+                cases: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    用相似历史案例修正模型估计（按相似度加权的附加观测）
+
+    Args:
+        estimates: 模型给出的各流派估计
+        cases: 相似案例列表，每项包含 therapy_type、similarity、improvement_score
+
+    Returns:
+        Dict[str, Dict[str, float]]: 修正后的估计（不修改输入）
+    """
+    blended = {therapy_type: dict(estimate) for therapy_type, estimate in estimates.items()}
+    for case in cases:
+        estimate = blended.get(case["therapy_type"])
+        similarity = max(float(case.get("similarity", 0.0)), 0.0)
+        if estimate is None or similarity == 0.0:
+            continue
+        weight = estimate["weight"] + similarity
+        estimate["expected_improvement"] = (
+            estimate["expected_improvement"] * estimate["weight"] + similarity * case["improvement_score"]
+        ) / weight
+        estimate["weight"] = weight
+        estimate["effective_n"] += similarity
+        estimate["stderr"] = math.sqrt(estimate["variance"] / max(estimate["effective_n"], 1.0))
+        estimate["support"] = estimate.get("support", 0) + 1
+    return blended
+
+
+class TherapyOutcomeModel:
+    """按特征桶聚合的治疗效果模型（SQLite物化聚合，随病历写入增量更新）"""
+
+    def __init__(self, directory: str, prior_strength: float = DEFAULT_PRIOR_STRENGTH):
+        """
+        初始化模型数据库
+
+        Args:
+            directory: 数据库文件所在目录（通常为json-memories）
+            prior_strength: 先验强度，桶内样本较少时估计向该流派的全局平均收缩
+        """
+        self.path = Path(directory).joinpath(OUTCOME_MODEL_FILENAME)
+        self.prior_strength = prior_strength
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    def _accumulate(self, outcome: Outcome, sign: int):
+        """把一条病历的贡献加到（sign=1）或移出（sign=-1）其所在的桶"""
+        therapy_type, score, buckets = outcome
+        self._conn.executemany(
+            _ACCUMULATE_SQL,
+            [(bucket, therapy_type, sign, sign * score, sign * score * score)
+             for bucket in [GLOBAL_BUCKET] + buckets]
+        )
+
+    def _retract(self, record_id: str) -> bool:
+        """移出已记录病历的贡献，返回该病历之前是否存在"""
+        row = self._conn.execute(
+            "SELECT therapy_type, score, buckets FROM record_outcomes WHERE id = ?", (record_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        if row[0] is not None:
+            self._accumulate((row[0], row[1], json.loads(row[2])), -1)
+        return True
+
+    @_locked
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        写入或更新病历的贡献（先移出旧贡献，再加入新贡献）
+
+        Args:
+            records: 医疗记录列表（必须包含id）
+
+        Returns:
+            int: 计入模型的病历数量
+        """
+        counted = 0
+        with self._conn:
+            for record in records:
+                record_id = record.get("id")
+                if not record_id:
+                    continue
+                self._retract(record_id)
+                outcome = extract_outcome(record)
+                if outcome is not None:
+                    self._accumulate(outcome, 1)
+                    counted += 1
+                therapy_type, score, buckets = outcome if outcome is not None else (None, None, [])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO record_outcomes (id, therapy_type, score, buckets, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (record_id, therapy_type, score, json.dumps(buckets, ensure_ascii=False),
+                     compute_content_hash(RECORD_COLLECTION, record))
+                )
+        return counted
+
+    @_locked
+    def remove(self, record_ids: Iterable[str]) -> int:
+        """
+        移出病历的贡献
+
+        Args:
+            record_ids: 记录ID列表
+
+        Returns:
+            int: 移出的数量
+        """
+        removed = 0
+        with self._conn:
+            for record_id in record_ids:
+                if self._retract(record_id):
+                    self._conn.execute("DELETE FROM record_outcomes WHERE id = ?", (record_id,))
+                    removed += 1
+            self._conn.execute("DELETE FROM outcome_buckets WHERE n <= 0")
+        return removed
+
+    @_locked
+    def hashes(self) -> Dict[str, str]:
+        """返回 记录ID -> 内容哈希"""
+        return dict(self._conn.execute("SELECT id, content_hash FROM record_outcomes"))
+
+    @_locked
+    def _bucket_stats(self, buckets: List[str],
+                      therapy_types: List[str]) -> Dict[Tuple[str, str], Tuple[int, float, float]]:
+        """读取指定桶和流派的聚合值"""
+        bucket_marks = ",".join("?" * len(buckets))
+        type_marks = ",".join("?" * len(therapy_types))
+        rows = self._conn.execute(
+            f"SELECT bucket, therapy_type, n, total, total_sq FROM outcome_buckets "
+            f"WHERE bucket IN ({bucket_marks}) AND therapy_type IN ({type_marks})",
+            buckets + therapy_types
+        )
+        return {(row[0], row[1]): (row[2], row[3], row[4]) for row in rows}
+
+    def estimate(self, basic_info: Any, therapy_types: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        估计各治疗流派对该学生的期望改善分数
+
+        学生所在的各特征桶合并计算（与学生共有特征越多的病历权重越大），
+        再向该流派的全局平均收缩，收缩强度为 prior_strength。
+
+        Args:
+            basic_info: 学生基本信息
+            therapy_types: 候选治疗流派
+
+        Returns:
+            Dict[str, Dict[str, float]]: 流派 -> {"expected_improvement", "stderr", "variance",
+                                               "weight", "effective_n", "support"}
+        """
+        buckets = feature_buckets(basic_info)
+        stats = self._bucket_stats([GLOBAL_BUCKET] + buckets, list(therapy_types))
+
+        # 样本不足以估计方差时，退回到所有候选流派合并的方差
+        overall = [stats[(GLOBAL_BUCKET, t)] for t in therapy_types if (GLOBAL_BUCKET, t) in stats]
+        overall_n = sum(row[0] for row in overall)
+        overall_var = 1.0
+        if overall_n >= 2:
+            overall_mean = sum(row[1] for row in overall) / overall_n
+            overall_var = max(sum(row[2] for row in overall) / overall_n - overall_mean ** 2, 0.0) or 1.0
+
+        estimates = {}
+        for therapy_type in therapy_types:
+            global_n, global_total, global_sq = stats.get((GLOBAL_BUCKET, therapy_type), (0, 0.0, 0.0))
+            global_mean = global_total / global_n if global_n else 0.0
+            global_var = max(global_sq / global_n - global_mean ** 2, 0.0) if global_n >= 2 else 0.0
+
+            n = total = total_sq = 0.0
+            for bucket in buckets:
+                bucket_n, bucket_total, bucket_sq = stats.get((bucket, therapy_type), (0, 0.0, 0.0))
+                n += bucket_n
+                total += bucket_total
+                total_sq += bucket_sq
+            if not buckets:
+                n, total, total_sq = global_n, global_total, global_sq
+
+            # 每个特征桶都会计入同一条病历，有效样本量按桶数折算
+            effective_n = n / max(len(buckets), 1)
+            weight = effective_n + self.prior_strength
+            mean = (total / max(len(buckets), 1) + self.prior_strength * global_mean) / weight
+            variance = max(total_sq / n - (total / n) ** 2, 0.0) if effective_n >= 2 else 0.0
+            variance = variance or global_var or overall_var
+            estimates[therapy_type] = {
+                "expected_improvement": mean,
+                "stderr": math.sqrt(variance / max(effective_n, 1.0)),
+                "variance": variance,
+                "weight": weight,
+                "effective_n": effective_n,
+                "support": global_n,
+            }
+        return estimates
+
+    def recommend(self, basic_info: Any, therapy_types: List[str]) -> Dict[str, Any]:
+        """
+        推荐治疗流派
+
+        Args:
+            basic_info: 学生基本信息
+            therapy_types: 候选治疗流派（没有任何数据时返回第一个）
+
+        Returns:
+            Dict[str, Any]: {"therapy_type", "expected_improvement", "confidence", "estimates"}
+        """
+        estimates = self.estimate(basic_info, therapy_types)
+        best_type, confidence = rank_estimates(estimates)
+        if best_type is None:
+            best_type = therapy_types[0] if therapy_types else None
+        return {
+            "therapy_type": best_type,
+            "expected_improvement": estimates.get(best_type, {}).get("expected_improvement", 0.0),
+            "confidence": confidence,
+            "estimates": estimates,
+        }
+
+    def sync(self, json_store) -> Dict[str, int]:
+        """
+        按JSON同步清单的内容哈希增量同步模型
+
+        Args:
+            json_store: JSON记忆存储
+
+        Returns:
+            Dict[str, int]: 新增/更新（indexed）和删除（removed）的记录数量
+        """
+        source = json_store.get_manifest(RECORD_COLLECTION)
+        indexed = self.hashes()
+
+        pending = [record_id for record_id, entry in source.items() if indexed.get(record_id) != entry[0]]
+        orphaned = [record_id for record_id in indexed if record_id not in source]
+
+        written = self.upsert(json_store.get_documents(RECORD_COLLECTION, pending)) if pending else 0
+        removed = self.remove(orphaned) if orphaned else 0
+        if written or removed:
+            logger.info(f"治疗效果模型同步完成: 计入 {written} 条，移出 {removed} 条")
+        return {"indexed": written, "removed": removed}
+
+    @_locked
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
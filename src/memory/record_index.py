@@ -0,0 +1,237 @@
+# src/memory/record_index.py
+"""
+医疗记录二级索引
+在JSON记忆目录旁的SQLite数据库中按学生ID、治疗流派和创建时间索引医疗记录ID，
+支持按条件分页的范围查询，记录数量增长后查询仍为O(log n)。
+"""
+import sqlite3
+import threading
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from src.memory.sync_manifest import compute_content_hash
+from src.utils.logger import logger
+
+
+# 索引数据库文件名
+RECORD_INDEX_FILENAME = "medical_records_index.sqlite3"
+
+# 集合名称（用于计算内容哈希）
+RECORD_COLLECTION = "medical_records"
+
+# 分页游标: (创建时间, 记录ID)
+RecordCursor = Tuple[float, str]
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS medical_records (
+        id TEXT PRIMARY KEY,
+        student_id TEXT,
+        therapy_type TEXT,
+        created_at REAL NOT NULL,
+        content_hash TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_records_student ON medical_records(student_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_records_therapy ON medical_records(therapy_type, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_records_created ON medical_records(created_at, id)",
+]
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """只接受数值时间戳"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def extract_index_fields(record: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], float]:
+    """
+    提取医疗记录的索引字段（兼容驼峰和下划线两种写法）
+
+    Args:
+        record: 医疗记录
+
+    Returns:
+        Tuple[Optional[str], Optional[str], float]: (学生ID, 治疗流派, 创建时间戳)
+    """
+    student_id = record.get("student_id") or record.get("studentId")
+    therapy_type = record.get("therapyType") or record.get("therapy_type")
+    created_at = _timestamp(record.get("createdAt"))
+    if created_at is None:
+        created_at = _timestamp(record.get("created_at"))
+    return student_id, therapy_type, created_at if created_at is not None else 0.0
+
+
+def _locked(method):
+    """在连接锁内执行（sqlite连接在线程池和事件循环之间共享）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MedicalRecordIndex:
+    """医疗记录的SQLite二级索引（只保存ID和索引字段，记录内容仍在JSON和向量数据库中）"""
+
+    def __init__(self, directory: str):
+        """
+        初始化索引数据库
+
+        Args:
+            directory: 数据库文件所在目录（通常为json-memories）
+        """
+        self.path = Path(directory).joinpath(RECORD_INDEX_FILENAME)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    @_locked
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        写入或更新记录的索引项
+
+        Args:
+            records: 医疗记录列表（必须包含id）
+
+        Returns:
+            int: 写入的数量
+        """
+        rows = []
+        for record in records:
+            if not record.get("id"):
+                continue
+            student_id, therapy_type, created_at = extract_index_fields(record)
+            rows.append((record["id"], student_id, therapy_type, created_at,
+                         compute_content_hash(RECORD_COLLECTION, record)))
+        if rows:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO medical_records (id, student_id, therapy_type, created_at, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    @_locked
+    def remove(self, record_ids: Iterable[str]) -> int:
+        """
+        删除记录的索引项
+
+        Args:
+            record_ids: 记录ID列表
+
+        Returns:
+            int: 删除的数量
+        """
+        with self._conn:
+            cursor = self._conn.executemany("DELETE FROM medical_records WHERE id = ?",
+                                            [(record_id,) for record_id in record_ids])
+        return cursor.rowcount
+
+    @_locked
+    def hashes(self) -> Dict[str, str]:
+        """返回 记录ID -> 内容哈希"""
+        return dict(self._conn.execute("SELECT id, content_hash FROM medical_records"))
+
+    @staticmethod
+    def _conditions(student_id: Optional[str], therapy_type: Optional[str],
+                    start: Optional[float], end: Optional[float]) -> Tuple[List[str], List[Any]]:
+        """构建WHERE条件"""
+        clauses: List[str] = []
+        params: List[Any] = []
+        if student_id is not None:
+            clauses.append("student_id = ?")
+            params.append(student_id)
+        if therapy_type is not None:
+            clauses.append("therapy_type = ?")
+            params.append(therapy_type)
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("created_at < ?")
+            params.append(end)
+        return clauses, params
+
+    @_locked
+    def query(self, student_id: Optional[str] = None, therapy_type: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              limit: Optional[int] = 50, cursor: Optional[RecordCursor] = None,
+              descending: bool = True) -> Tuple[List[str], Optional[RecordCursor]]:
+        """
+        按条件分页查询记录ID（按创建时间排序，使用 (创建时间, ID) 游标翻页）
+
+        Args:
+            student_id: 学生ID
+            therapy_type: 治疗流派
+            start: 创建时间下限（包含）
+            end: 创建时间上限（不包含）
+            limit: 每页数量，为None时返回全部
+            cursor: 上一页返回的游标
+            descending: 是否按创建时间从新到旧排列
+
+        Returns:
+            Tuple[List[str], Optional[RecordCursor]]: (记录ID列表, 下一页游标；没有下一页时为None)
+        """
+        clauses, params = self._conditions(student_id, therapy_type, start, end)
+        if cursor is not None:
+            clauses.append(f"(created_at, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(cursor)
+
+        order = "DESC" if descending else "ASC"
+        sql = "SELECT id, created_at FROM medical_records"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY created_at {order}, id {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = self._conn.execute(sql, params).fetchall()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][1], rows[-1][0])
+        return [row[0] for row in rows], next_cursor
+
+    @_locked
+    def count(self, student_id: Optional[str] = None, therapy_type: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None) -> int:
+        """统计满足条件的记录数量"""
+        clauses, params = self._conditions(student_id, therapy_type, start, end)
+        sql = "SELECT COUNT(*) FROM medical_records"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self._conn.execute(sql, params).fetchone()[0]
+
+    def sync(self, json_store) -> Dict[str, int]:
+        """
+        按JSON同步清单的内容哈希增量同步索引
+
+        Args:
+            json_store: JSON记忆存储
+
+        Returns:
+            Dict[str, int]: 新增/更新（indexed）和删除（removed）的记录数量
+        """
+        source = json_store.get_manifest(RECORD_COLLECTION)
+        indexed = self.hashes()
+
+        pending = [record_id for record_id, entry in source.items() if indexed.get(record_id) != entry[0]]
+        orphaned = [record_id for record_id in indexed if record_id not in source]
+
+        written = self.upsert(json_store.get_documents(RECORD_COLLECTION, pending)) if pending else 0
+        removed = self.remove(orphaned) if orphaned else 0
+        if written or removed:
+            logger.info(f"医疗记录索引同步完成: 写入 {written} 条，删除 {removed} 条")
+        return {"indexed": written, "removed": removed}
+
+    @_locked
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
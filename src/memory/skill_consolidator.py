@@ -0,0 +1,433 @@
+# src/memory/skill_consolidator.py
+"""
+技能记忆整理
+按向量相似度把同一集合中的近似重复技能聚类合并，记录技能的使用次数和最近使用时间，
+并可按使用频率和时间衰减的综合得分淘汰超出容量的技能（默认关闭），使集合规模和提示词长度保持有界。
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+import traceback
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+
+from src.memory.vector_matrix_store import SKILL_VECTOR_FIELD
+from src.memory.sync_manifest import compute_content_hash
+from src.utils.config import Config
+from src.utils.logger import logger
+
+
+# 使用统计文件名
+SKILL_USAGE_FILENAME = "skill_usage.json"
+
+# 时间衰减的半衰期（天）
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+# 使用统计有变化时的最短保存间隔（秒）
+USAGE_SAVE_INTERVAL = 60.0
+
+# 合并技能时的LLM提示词
+MERGE_PROMPT = """以下是同一位心理咨询智能体积累的若干条内容相近的技能记忆：
+
+{skills}
+
+请将它们合并为一条技能记忆：保留所有不重复的要点和具体做法，去掉重复表述，语言简洁。
+只输出合并后的技能内容，不要添加任何解释。"""
+
+
+def _is_base_skill(document: Dict[str, Any]) -> bool:
+    """系统初始化的基础技能（时间戳为0）不参与合并和淘汰"""
+    return document.get("timestamp") == 0
+
+
+def _locked(method):
+    """在统计锁内执行"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SkillUsageTracker:
+    """技能使用统计
+
+    文件格式: {"集合名称": {"技能ID": [使用次数, 最近使用时间, 创建时间]}}
+    """
+
+    def __init__(self, directory: str):
+        """
+        初始化使用统计
+
+        Args:
+            directory: 统计文件所在目录
+        """
+        self.path = Path(directory).joinpath(SKILL_USAGE_FILENAME)
+        self._data: Dict[str, Dict[str, List[float]]] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """加载统计文件，文件损坏时视为空统计"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取技能使用统计 {self.path} 失败: {str(e)}，将重新统计")
+            self._data = {}
+
+    def save_due(self, interval: float = USAGE_SAVE_INTERVAL) -> bool:
+        """有未保存的变化且距上次保存已超过interval秒"""
+        return self._dirty and time.monotonic() - self._last_save >= interval
+
+    @_locked
+    def save(self):
+        """有变化时保存统计（先写临时文件再替换）"""
+        self._last_save = time.monotonic()
+        if not self._dirty:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def _entry(self, collection_name: str, doc_id: str, created: float) -> List[float]:
+        entries = self._data.setdefault(collection_name, {})
+        if doc_id not in entries:
+            entries[doc_id] = [0, 0.0, created]
+        return entries[doc_id]
+
+    @_locked
+    def record_created(self, collection_name: str, doc_id: str, timestamp: float):
+        """记录技能的创建时间"""
+        self._entry(collection_name, doc_id, timestamp)[2] = timestamp
+        self._dirty = True
+
+    @_locked
+    def record_use(self, collection_name: str, doc_ids: Iterable[str]):
+        """记录技能被检索并放入提示词"""
+        now = time.time()
+        for doc_id in doc_ids:
+            entry = self._entry(collection_name, doc_id, now)
+            entry[0] += 1
+            entry[1] = now
+            self._dirty = True
+
+    @_locked
+    def merge(self, collection_name: str, target_id: str, source_ids: Iterable[str]):
+        """把被合并技能的使用统计累加到合并后的技能上"""
+        entries = self._data.get(collection_name, {})
+        target = self._entry(collection_name, target_id, time.time())
+        for doc_id in source_ids:
+            source = entries.pop(doc_id, None)
+            if source is None:
+                continue
+            target[0] += source[0]
+            target[1] = max(target[1], source[1])
+            target[2] = max(target[2], source[2])
+        self._dirty = True
+
+    @_locked
+    def export(self, collection_name: str) -> Dict[str, List[float]]:
+        """导出集合的使用统计副本（用于记忆快照）"""
+        return {doc_id: list(entry) for doc_id, entry in self._data.get(collection_name, {}).items()}
+
+    @_locked
+    def restore(self, collection_name: str, entries: Dict[str, List[float]]):
+        """用快照中的使用统计替换集合的当前统计"""
+        self._data[collection_name] = {doc_id: list(entry) for doc_id, entry in entries.items()}
+        self._dirty = True
+
+    @_locked
+    def remove(self, collection_name: str, doc_ids: Iterable[str]):
+        """删除技能的使用统计"""
+        entries = self._data.get(collection_name, {})
+        for doc_id in doc_ids:
+            if entries.pop(doc_id, None) is not None:
+                self._dirty = True
+
+    @_locked
+    def score(self, collection_name: str, doc_id: str, created: float = 0.0,
+              now: Optional[float] = None) -> float:
+        """
+        计算技能的保留得分：(1 + 使用次数) × 0.5^(距最近使用或创建的天数 / 半衰期)
+
+        Args:
+            collection_name: 集合名称
+            doc_id: 技能ID
+            created: 没有统计记录时使用的创建时间
+            now: 当前时间
+
+        Returns:
+            float: 得分，越高越应保留
+        """
+        now = time.time() if now is None else now
+        uses, last_used, created = self._data.get(collection_name, {}).get(doc_id, [0, 0.0, created])
+        age_days = max(0.0, now - max(last_used, created)) / 86400.0
+        return (1.0 + uses) * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    @_locked
+    def rank(self, collection_name: str, doc_ids: Iterable[str]) -> List[str]:
+        """按得分从高到低排列技能ID"""
+        now = time.time()
+        return sorted(doc_ids, key=lambda doc_id: self.score(collection_name, doc_id, now=now), reverse=True)
+
+
+class SkillConsolidator:
+    """技能记忆整理器：近似重复合并 + 容量淘汰，在后台按集合执行"""
+
+    def __init__(self, memory_manager, llm_service=None, capacity: Optional[int] = None,
+                 merge_threshold: Optional[float] = None, consolidate_every: Optional[int] = None,
+                 use_llm: Optional[bool] = None):
+        """
+        初始化技能整理器
+
+        Args:
+            memory_manager: 记忆管理器（提供存储和使用统计）
+            llm_service: 合并技能时使用的LLM服务，为None时保留聚类中得分最高的技能
+            capacity: 每个集合的技能上限（0为不淘汰），默认读取配置 SKILL_CAPACITY
+            merge_threshold: 视为近似重复的余弦相似度，默认读取配置 SKILL_MERGE_THRESHOLD
+            consolidate_every: 新增多少条技能后自动整理，默认读取配置 SKILL_CONSOLIDATE_EVERY
+            use_llm: 是否使用LLM合并，默认读取配置 SKILL_MERGE_WITH_LLM
+        """
+        self.memory_manager = memory_manager
+        self.llm_service = llm_service
+        self.capacity = Config.SKILL_CAPACITY if capacity is None else capacity
+        self.merge_threshold = Config.SKILL_MERGE_THRESHOLD if merge_threshold is None else merge_threshold
+        self.consolidate_every = Config.SKILL_CONSOLIDATE_EVERY if consolidate_every is None else consolidate_every
+        self.use_llm = Config.SKILL_MERGE_WITH_LLM if use_llm is None else use_llm
+
+        # 各集合自上次整理以来新增的技能数量
+        self._writes_since: Dict[str, int] = {}
+        # 正在执行的整理任务（每个集合最多一个）
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def note_write(self, collection_name: str):
+        """
+        记录一次技能写入，达到阈值时在后台整理该集合
+
+        Args:
+            collection_name: 集合名称
+        """
+        if self.consolidate_every <= 0:
+            return
+        count = self._writes_since.get(collection_name, 0) + 1
+        self._writes_since[collection_name] = count
+        if count >= self.consolidate_every:
+            self.schedule(collection_name)
+
+    def schedule(self, collection_name: str) -> asyncio.Task:
+        """
+        在后台整理集合，同一集合已有任务在执行时直接复用
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            asyncio.Task: 整理任务
+        """
+        task = self._tasks.get(collection_name)
+        if task is not None and not task.done():
+            return task
+
+        self._writes_since[collection_name] = 0
+
+        async def _run():
+            try:
+                return await self.consolidate_collection(collection_name)
+            except Exception as e:
+                logger.error(f"后台整理技能集合 {collection_name} 失败: {str(e)}")
+                traceback.print_exc()
+                return None
+
+        task = asyncio.create_task(_run())
+        self._tasks[collection_name] = task
+        task.add_done_callback(
+            lambda done: self._tasks.pop(collection_name) if self._tasks.get(collection_name) is done else None
+        )
+        return task
+
+    async def wait_idle(self):
+        """等待所有后台整理任务完成"""
+        pending = [task for task in self._tasks.values() if not task.done()]
+        if pending:
+            logger.info(f"等待 {len(pending)} 个技能整理任务完成")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _cluster(self, vectors: np.ndarray, order: List[int]) -> List[List[int]]:
+        """
+        贪心聚类：按得分从高到低依次取未分配的技能作为中心，
+        把与其余弦相似度不低于阈值的未分配技能并入同一聚类
+
+        Args:
+            vectors: 技能向量矩阵
+            order: 按得分降序排列的行号
+
+        Returns:
+            List[List[int]]: 聚类列表，每个聚类的第一个元素为中心
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        normed = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        assigned = np.zeros(len(vectors), dtype=bool)
+
+        clusters = []
+        for row in order:
+            if assigned[row]:
+                continue
+            similarities = normed @ normed[row]
+            members = np.flatnonzero((similarities >= self.merge_threshold) & ~assigned)
+            assigned[members] = True
+            assigned[row] = True
+            clusters.append([row] + [int(member) for member in members if member != row])
+        return clusters
+
+    async def _merge_cluster(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        合并一个聚类中的技能
+
+        Args:
+            documents: 聚类中的技能，第一个为中心（得分最高）
+
+        Returns:
+            Dict[str, Any]: 合并后的技能（沿用中心技能的ID）
+        """
+        leader = documents[0]
+        merged = dict(leader)
+        merged_from = set(leader.get("merged_from", []))
+        for doc in documents[1:]:
+            merged_from.add(doc["id"])
+            merged_from.update(doc.get("merged_from", []))
+        merged["merged_from"] = sorted(merged_from)
+        merged["timestamp"] = max(doc.get("timestamp", 0) for doc in documents)
+
+        if self.use_llm and self.llm_service is not None:
+            skills_text = "\n".join(f"{i}. {doc.get('content', '')}" for i, doc in enumerate(documents, 1))
+            try:
+                content = (await self.llm_service.invoke(MERGE_PROMPT.format(skills=skills_text))).strip()
+                if content:
+                    from src.utils.embedding_service import get_text_embedding
+                    merged["content"] = content
+                    vector = await asyncio.to_thread(get_text_embedding, content)
+                    if vector is not None:
+                        merged[SKILL_VECTOR_FIELD] = vector
+            except Exception as e:
+                logger.warning(f"LLM合并技能失败，保留中心技能 {leader['id']}: {str(e)}")
+
+        return merged
+
+    async def consolidate_collection(self, collection_name: str) -> Dict[str, int]:
+        """
+        整理一个技能集合：合并近似重复的技能，再按容量淘汰得分最低的技能
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            Dict[str, int]: 合并（merged）、淘汰（evicted）的技能数量和剩余数量（remaining）
+        """
+        manager = self.memory_manager
+        usage = manager.skill_usage
+        documents = await manager.vector_store.export_documents(collection_name)
+        if not documents:
+            return {"merged": 0, "evicted": 0, "remaining": 0}
+
+        now = time.time()
+        scores = {
+            doc["id"]: usage.score(collection_name, doc["id"], created=doc.get("timestamp", 0) or 0, now=now)
+            for doc in documents
+        }
+
+        # 只对有向量、维度一致且不是基础技能的文档聚类
+        candidates = [doc for doc in documents
+                      if not _is_base_skill(doc) and isinstance(doc.get(SKILL_VECTOR_FIELD), list)]
+        dims = [len(doc[SKILL_VECTOR_FIELD]) for doc in candidates]
+        if dims:
+            dim = max(set(dims), key=dims.count)
+            candidates = [doc for doc in candidates if len(doc[SKILL_VECTOR_FIELD]) == dim]
+
+        # 1. 聚类：被并入的技能的得分累加到聚类中心上
+        clusters: List[List[Dict[str, Any]]] = []
+        if len(candidates) > 1:
+            vectors = np.asarray([doc[SKILL_VECTOR_FIELD] for doc in candidates], dtype=np.float32)
+            order = sorted(range(len(candidates)), key=lambda i: scores[candidates[i]["id"]], reverse=True)
+            for cluster in self._cluster(vectors, order):
+                if len(cluster) < 2:
+                    continue
+                members = [candidates[i] for i in cluster]
+                clusters.append(members)
+                scores[members[0]["id"]] += sum(scores.pop(doc["id"], 0.0) for doc in members[1:])
+
+        merged_away = {doc["id"] for members in clusters for doc in members[1:]}
+
+        # 2. 容量淘汰（先于合并，避免为即将淘汰的聚类调用LLM）；基础技能始终保留
+        remaining = [doc for doc in documents if doc["id"] not in merged_away]
+        evicted: List[str] = []
+        if self.capacity > 0 and len(remaining) > self.capacity:
+            evictable = sorted((doc for doc in remaining if not _is_base_skill(doc)),
+                               key=lambda doc: scores.get(doc["id"], 0.0))
+            evicted = [doc["id"] for doc in evictable[:len(remaining) - self.capacity]]
+
+        # 3. 合并保留下来的聚类（LLM调用在写锁外完成）
+        evicted_set = set(evicted)
+        # 每个改动: (写入的技能或None, 删除的技能ID, 涉及的技能ID)，涉及的技能在整理期间被修改时整个改动作废
+        changes = []
+        for members in clusters:
+            member_ids = [doc["id"] for doc in members]
+            if member_ids[0] in evicted_set:
+                changes.append((None, member_ids, member_ids))
+            else:
+                changes.append((await self._merge_cluster(members), member_ids[1:], member_ids))
+        merged_leaders = {members[0]["id"] for members in clusters}
+        changes.extend((None, [doc_id], [doc_id]) for doc_id in evicted if doc_id not in merged_leaders)
+
+        # 4. 在写锁内确认涉及的技能与导出时一致，再回写
+        applied = {"merged": 0, "evicted": 0}
+        if changes:
+            snapshot_hashes = {doc["id"]: compute_content_hash(collection_name, doc) for doc in documents}
+            async with manager.skill_write_lock(collection_name):
+                involved = sorted({doc_id for _, _, ids in changes for doc_id in ids})
+                current = await manager.vector_store.get_documents(collection_name, involved)
+                current_hashes = {doc["id"]: compute_content_hash(collection_name, doc) for doc in current}
+                modified = {doc_id for doc_id in involved if current_hashes.get(doc_id) != snapshot_hashes[doc_id]}
+                if modified:
+                    logger.info(f"技能集合 {collection_name} 中有 {len(modified)} 条技能在整理期间被修改，相关的合并和淘汰本次跳过")
+
+                updated: List[Dict[str, Any]] = []
+                removed = []
+                for merged, removed_ids, ids in changes:
+                    if modified.intersection(ids):
+                        continue
+                    if merged is not None:
+                        updated.append(merged)
+                        usage.merge(collection_name, merged["id"], removed_ids)
+                        applied["merged"] += len(removed_ids)
+                    else:
+                        usage.remove(collection_name, removed_ids)
+                        evicted_here = [doc_id for doc_id in removed_ids if doc_id in evicted_set]
+                        applied["evicted"] += len(evicted_here)
+                        applied["merged"] += len(removed_ids) - len(evicted_here)
+                    removed.extend(removed_ids)
+
+                if updated or removed:
+                    await manager.write_skill_changes(collection_name, updated, removed)
+        await asyncio.to_thread(usage.save)
+
+        result = {
+            "merged": applied["merged"],
+            "evicted": applied["evicted"],
+            "remaining": len(documents) - applied["merged"] - applied["evicted"],
+        }
+        logger.info(f"技能集合 {collection_name} 整理完成: 合并 {result['merged']} 条，"
+                    f"淘汰 {result['evicted']} 条，剩余 {result['remaining']} 条")
+        return result
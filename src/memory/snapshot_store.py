@@ -0,0 +1,244 @@
+# src/memory/snapshot_store.py
+"""
+记忆快照存储
+快照只记录每个集合的 文档ID -> 内容哈希（即同步清单），文档内容（含向量）按内容哈希
+保存在共享的对象目录中。创建快照时只写入对象目录中还没有的文档，多个快照之间
+未变化的文档只保存一份；恢复时与当前清单比较，只回写有差异的文档。
+"""
+import os
+import re
+import json
+import time
+import threading
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable
+
+from src.utils.logger import logger
+
+
+# 快照目录名（位于JSON记忆目录下）
+SNAPSHOT_DIRNAME = "snapshots"
+
+# 共享的文档对象目录名
+OBJECTS_DIRNAME = "objects"
+
+# 快照引用文件目录名（其下按会话ID分目录）
+SESSIONS_DIRNAME = "sessions"
+
+# 快照引用: 集合名称 -> {文档ID: 内容哈希}
+SnapshotRefs = Dict[str, Dict[str, str]]
+
+
+def _locked(method):
+    """在存储锁内执行"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _safe_name(name: str) -> str:
+    """把会话ID和快照名称转换为安全的文件名"""
+    return re.sub(r"[^\w.\-]", "_", name) or "_"
+
+
+def _write_json(path: Path, data: Any):
+    """先写临时文件再替换"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class MemorySnapshotStore:
+    """按会话和名称保存的记忆快照（文档对象按内容哈希共享）"""
+
+    def __init__(self, directory: str):
+        """
+        初始化快照存储
+
+        Args:
+            directory: 快照根目录（通常为 json-memories/snapshots）
+        """
+        self.directory = Path(directory)
+        self.objects_dir = self.directory.joinpath(OBJECTS_DIRNAME)
+        self.sessions_dir = self.directory.joinpath(SESSIONS_DIRNAME)
+        self._lock = threading.RLock()
+
+    def _snapshot_path(self, session_id: str, name: str) -> Path:
+        return self.sessions_dir.joinpath(_safe_name(session_id), f"{_safe_name(name)}.json")
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.objects_dir.joinpath(content_hash[:2], f"{content_hash}.json")
+
+    @_locked
+    def missing_objects(self, content_hashes: Iterable[str]) -> List[str]:
+        """
+        返回对象目录中还没有保存的内容哈希
+
+        Args:
+            content_hashes: 内容哈希列表
+
+        Returns:
+            List[str]: 缺失的内容哈希（去重）
+        """
+        return [h for h in dict.fromkeys(content_hashes) if not self._object_path(h).exists()]
+
+    @_locked
+    def put_objects(self, objects: Dict[str, Dict[str, Any]]) -> int:
+        """
+        写入文档对象（已存在的对象不会重写）
+
+        Args:
+            objects: 内容哈希 -> 文档（含向量）
+
+        Returns:
+            int: 新写入的数量
+        """
+        written = 0
+        for content_hash, document in objects.items():
+            path = self._object_path(content_hash)
+            if path.exists():
+                continue
+            os.makedirs(path.parent, exist_ok=True)
+            _write_json(path, document)
+            written += 1
+        return written
+
+    @_locked
+    def get_objects(self, content_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        读取文档对象
+
+        Args:
+            content_hashes: 内容哈希列表
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 内容哈希 -> 文档，缺失的对象不会出现在结果中
+        """
+        objects = {}
+        for content_hash in dict.fromkeys(content_hashes):
+            path = self._object_path(content_hash)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    objects[content_hash] = json.load(f)
+            except FileNotFoundError:
+                logger.warning(f"快照对象 {content_hash} 不存在")
+        return objects
+
+    @_locked
+    def save(self, session_id: str, name: str, refs: SnapshotRefs,
+             usage: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        保存快照引用（同名快照会被覆盖）
+
+        Args:
+            session_id: 会话ID
+            name: 快照名称
+            refs: 集合名称 -> {文档ID: 内容哈希}
+            usage: 集合名称 -> 技能使用统计
+
+        Returns:
+            Path: 快照文件路径
+        """
+        path = self._snapshot_path(session_id, name)
+        os.makedirs(path.parent, exist_ok=True)
+        _write_json(path, {
+            "session_id": session_id,
+            "name": name,
+            "created_at": time.time(),
+            "collections": refs,
+            "usage": usage or {},
+        })
+        return path
+
+    @_locked
+    def load(self, session_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        读取快照
+
+        Args:
+            session_id: 会话ID
+            name: 快照名称
+
+        Returns:
+            Optional[Dict[str, Any]]: 快照内容，不存在时返回None
+        """
+        path = self._snapshot_path(session_id, name)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @_locked
+    def list(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        列出快照
+
+        Args:
+            session_id: 只列出该会话的快照，为None时列出全部
+
+        Returns:
+            List[Dict[str, Any]]: 每项包含 session_id、name、created_at 和各集合的文档数量
+        """
+        pattern = f"{_safe_name(session_id)}/*.json" if session_id is not None else "*/*.json"
+        snapshots = []
+        for path in sorted(self.sessions_dir.glob(pattern)):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取快照 {path} 失败: {str(e)}")
+                continue
+            snapshots.append({
+                "session_id": data.get("session_id"),
+                "name": data.get("name"),
+                "created_at": data.get("created_at"),
+                "collections": {coll: len(refs) for coll, refs in data.get("collections", {}).items()},
+            })
+        return snapshots
+
+    @_locked
+    def delete(self, session_id: str, name: str) -> bool:
+        """
+        删除快照，并清理不再被任何快照引用的对象
+
+        Args:
+            session_id: 会话ID
+            name: 快照名称
+
+        Returns:
+            bool: 快照是否存在
+        """
+        path = self._snapshot_path(session_id, name)
+        if not path.exists():
+            return False
+        os.remove(path)
+        self.collect_garbage()
+        return True
+
+    @_locked
+    def collect_garbage(self) -> int:
+        """
+        删除不再被任何快照引用的对象
+
+        Returns:
+            int: 删除的对象数量
+        """
+        referenced = set()
+        for path in self.sessions_dir.glob("*/*.json"):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for refs in data.get("collections", {}).values():
+                referenced.update(refs.values())
+
+        removed = 0
+        for path in self.objects_dir.glob("*/*.json"):
+            if path.stem not in referenced:
+                os.remove(path)
+                removed += 1
+        if removed:
+            logger.info(f"清理了 {removed} 个不再被快照引用的对象")
+        return removed
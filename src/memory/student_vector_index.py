@@ -0,0 +1,214 @@
+# src/memory/student_vector_index.py
+"""
+学生特征向量索引
+在SQLite中保存 向量ID -> (学生ID, 病历ID) 的映射，支持按主键点查和批量写入，
+取代每次写入都整体重写的 vector_index.json（首次启动时自动迁移）。
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from src.utils.logger import logger
+
+
+# 索引数据库文件名
+VECTOR_INDEX_DB_FILENAME = "vector_index.sqlite3"
+
+# 旧版JSON索引文件名（迁移后重命名为 .migrated）
+LEGACY_INDEX_FILENAME = "vector_index.json"
+
+# 索引项: (向量ID, 学生ID, 病历ID, 更新时间)
+IndexEntry = Tuple[str, Optional[str], Optional[str], float]
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS student_vectors (
+        vector_id TEXT PRIMARY KEY,
+        student_id TEXT,
+        record_id TEXT,
+        updated_at REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_vectors_student ON student_vectors(student_id)",
+    "CREATE INDEX IF NOT EXISTS idx_vectors_record ON student_vectors(record_id)",
+]
+
+# SQLite单条语句的参数数量有上限，批量点查时分块
+_LOOKUP_CHUNK = 500
+
+
+def _locked(method):
+    """在连接锁内执行（sqlite连接在线程池和事件循环之间共享）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _row_to_entry(row: Tuple[str, Optional[str], Optional[str], Optional[float]]) -> Dict[str, Any]:
+    return {"student_id": row[1], "record_id": row[2], "updated_at": row[3]}
+
+
+class StudentVectorIndex:
+    """学生特征向量ID到学生和病历的映射"""
+
+    def __init__(self, directory: str):
+        """
+        初始化索引数据库，存在旧版JSON索引且数据库为空时自动迁移
+
+        Args:
+            directory: 数据库文件所在目录（通常为json-memories）
+        """
+        self.directory = Path(directory)
+        self.path = self.directory.joinpath(VECTOR_INDEX_DB_FILENAME)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        self._migrate_legacy_file()
+
+    def _migrate_legacy_file(self):
+        """把旧版 vector_index.json 导入数据库，并将原文件重命名为 .migrated 备份"""
+        legacy_path = self.directory.joinpath(LEGACY_INDEX_FILENAME)
+        if not legacy_path.exists():
+            return
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取旧版向量索引 {legacy_path} 失败: {str(e)}，跳过迁移")
+            return
+
+        if self.count() == 0 and legacy:
+            entries = [
+                (vector_id, info.get("student_id"), info.get("record_id"), info.get("updated_at") or time.time())
+                for vector_id, info in legacy.items() if isinstance(info, dict)
+            ]
+            self.put_many(entries)
+            logger.info(f"已将 {len(entries)} 条向量索引从 {legacy_path.name} 迁移到 {self.path.name}")
+        os.replace(legacy_path, legacy_path.with_suffix(".json.migrated"))
+
+    @_locked
+    def put_many(self, entries: Iterable[IndexEntry]) -> int:
+        """
+        批量写入索引项（已存在则覆盖）
+
+        Args:
+            entries: (向量ID, 学生ID, 病历ID, 更新时间) 列表
+
+        Returns:
+            int: 写入的数量
+        """
+        rows = [entry for entry in entries if entry[0]]
+        if rows:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO student_vectors (vector_id, student_id, record_id, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    def put(self, vector_id: str, student_id: Optional[str], record_id: Optional[str] = None):
+        """写入单个索引项"""
+        self.put_many([(vector_id, student_id, record_id, time.time())])
+
+    @_locked
+    def get(self, vector_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按向量ID点查
+
+        Args:
+            vector_id: 向量ID
+
+        Returns:
+            Optional[Dict[str, Any]]: {"student_id", "record_id", "updated_at"}，不存在时返回None
+        """
+        row = self._conn.execute(
+            "SELECT vector_id, student_id, record_id, updated_at FROM student_vectors WHERE vector_id = ?",
+            (vector_id,)
+        ).fetchone()
+        return _row_to_entry(row) if row else None
+
+    @_locked
+    def get_many(self, vector_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        按向量ID批量点查
+
+        Args:
+            vector_ids: 向量ID列表
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 向量ID -> 索引项，不存在的ID不会出现在结果中
+        """
+        result = {}
+        for start in range(0, len(vector_ids), _LOOKUP_CHUNK):
+            chunk = vector_ids[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT vector_id, student_id, record_id, updated_at FROM student_vectors "
+                f"WHERE vector_id IN ({placeholders})",
+                chunk
+            )
+            result.update((row[0], _row_to_entry(row)) for row in rows)
+        return result
+
+    @_locked
+    def find(self, student_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        列出索引项
+
+        Args:
+            student_id: 只列出该学生的向量，为None时列出全部
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 向量ID -> 索引项
+        """
+        sql = "SELECT vector_id, student_id, record_id, updated_at FROM student_vectors"
+        params: List[Any] = []
+        if student_id is not None:
+            sql += " WHERE student_id = ?"
+            params.append(student_id)
+        return {row[0]: _row_to_entry(row) for row in self._conn.execute(sql, params)}
+
+    @_locked
+    def count(self) -> int:
+        """索引项数量"""
+        return self._conn.execute("SELECT COUNT(*) FROM student_vectors").fetchone()[0]
+
+    @_locked
+    def replace_all(self, entries: Iterable[IndexEntry]) -> int:
+        """
+        用新的索引项替换全部内容（单个事务）
+
+        Args:
+            entries: (向量ID, 学生ID, 病历ID, 更新时间) 列表
+
+        Returns:
+            int: 写入的数量
+        """
+        rows = [entry for entry in entries if entry[0]]
+        with self._conn:
+            self._conn.execute("DELETE FROM student_vectors")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO student_vectors (vector_id, student_id, record_id, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def clear(self):
+        """清空索引"""
+        self.replace_all([])
+
+    @_locked
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
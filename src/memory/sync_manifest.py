@@ -0,0 +1,277 @@
+# src/memory/sync_manifest.py
+"""
+同步清单
+按集合记录每个文档的 (ID, 内容哈希, 更新时间)，JSON文件和向量数据库各自维护一份，
+启动同步时只需比较两份清单即可找出缺失或已变化的文档
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Set
+
+from src.memory.vector_matrix_store import get_vector_field
+from src.utils.logger import logger
+
+
+# 清单目录名，每个集合一个文件
+MANIFEST_DIRNAME = "sync_manifest"
+
+# 目录 -> 进程内共享的清单实例
+_open_manifests: Dict[str, "SyncManifest"] = {}
+_open_manifests_lock = threading.Lock()
+
+# 清单条目: 文档ID -> [内容哈希, 更新时间]
+ManifestEntries = Dict[str, List[Any]]
+
+
+def compute_content_hash(collection_name: str, document: Dict[str, Any]) -> str:
+    """
+    计算文档内容哈希（不包括向量字段，向量总是随内容一起更新）
+
+    Args:
+        collection_name: 集合名称
+        document: 文档
+
+    Returns:
+        str: 内容哈希
+    """
+    field = get_vector_field(collection_name)
+    if field is not None and field in document:
+        document = {key: value for key, value in document.items() if key != field}
+    body = json.dumps(document, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.md5(body.encode("utf-8")).hexdigest()
+
+
+def get_updated_at(document: Dict[str, Any]) -> float:
+    """
+    从文档中提取更新时间，没有可用的数值时间戳时使用当前时间
+
+    Args:
+        document: 文档
+
+    Returns:
+        float: 更新时间戳
+    """
+    for key in ("updated_at", "timestamp", "created_at", "createdAt"):
+        value = document.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return time.time()
+
+
+def _locked(method):
+    """在清单锁内执行"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SyncManifest:
+    """持久化的同步清单
+
+    每个集合保存为清单目录下的 {集合名称}.json:
+    {
+        "source": {...},                    # 可选，清单对应的源文件状态（大小、修改时间）
+        "entries": {"文档ID": ["哈希", 更新时间], ...}
+    }
+    修改只标记集合为脏，save 时只重写有变化的集合。
+    同一目录应通过 SyncManifest.open 获取共享实例，避免多个实例互相覆盖条目。
+    """
+
+    @classmethod
+    def open(cls, directory: str) -> "SyncManifest":
+        """
+        获取进程内共享的清单实例
+
+        Args:
+            directory: 清单所在目录
+
+        Returns:
+            SyncManifest: 同一目录对应的唯一实例
+        """
+        key = os.path.abspath(directory)
+        with _open_manifests_lock:
+            if key not in _open_manifests:
+                _open_manifests[key] = cls(directory)
+            return _open_manifests[key]
+
+    def __init__(self, directory: str):
+        """
+        初始化同步清单
+
+        Args:
+            directory: 清单所在目录
+        """
+        self.directory = Path(directory).joinpath(MANIFEST_DIRNAME)
+        self._data: Dict[str, Dict[str, Any]] = {}
+        # 有未保存修改的集合
+        self._dirty: Set[str] = set()
+        # 清单可能在多个线程中更新和保存
+        self._lock = threading.RLock()
+        self._load()
+
+    def _collection_path(self, collection_name: str) -> Path:
+        return self.directory.joinpath(f"{collection_name}.json")
+
+    def _load(self):
+        """加载各集合的清单文件，文件损坏时视为该集合没有清单"""
+        if self.directory.exists():
+            for path in self.directory.glob("*.json"):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        self._data[path.stem] = json.load(f)
+                except Exception as e:
+                    logger.warning(f"读取同步清单 {path} 失败: {str(e)}，将重新生成")
+
+    @property
+    def dirty(self) -> bool:
+        """是否有未保存的修改"""
+        return bool(self._dirty)
+
+    @_locked
+    def save(self):
+        """保存有变化的集合（先写临时文件再替换，避免中断时损坏）"""
+        if not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for collection_name in self._dirty:
+            path = self._collection_path(collection_name)
+            if collection_name not in self._data:
+                if path.exists():
+                    os.remove(path)
+                continue
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data[collection_name], f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        self._dirty = set()
+
+    def entries(self, collection_name: str) -> ManifestEntries:
+        """
+        获取集合的清单条目
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            ManifestEntries: 文档ID -> [内容哈希, 更新时间]
+        """
+        return self._data.get(collection_name, {}).get("entries", {})
+
+    def source(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """获取清单生成时源文件的状态"""
+        return self._data.get(collection_name, {}).get("source")
+
+    @_locked
+    def replace(self, collection_name: str, documents: Iterable[Dict[str, Any]],
+                source: Optional[Dict[str, Any]] = None):
+        """
+        用完整文档列表重建集合的清单
+
+        Args:
+            collection_name: 集合名称
+            documents: 集合中的全部文档
+            source: 源文件状态
+        """
+        previous = self.entries(collection_name)
+        entries: ManifestEntries = {}
+        for doc in documents:
+            doc_id = doc.get("id")
+            if not doc_id:
+                continue
+            content_hash = compute_content_hash(collection_name, doc)
+            old = previous.get(doc_id)
+            # 内容未变化的文档保留原来的更新时间
+            if old and old[0] == content_hash:
+                entries[doc_id] = old
+            else:
+                entries[doc_id] = [content_hash, get_updated_at(doc)]
+        self._data[collection_name] = {"source": source, "entries": entries}
+        self._dirty.add(collection_name)
+
+    @_locked
+    def set_source(self, collection_name: str, source: Optional[Dict[str, Any]]):
+        """
+        记录集合清单对应的源文件状态
+
+        Args:
+            collection_name: 集合名称
+            source: 源文件状态
+        """
+        collection = self._data.setdefault(collection_name, {"source": None, "entries": {}})
+        collection["source"] = source
+        self._dirty.add(collection_name)
+
+    @_locked
+    def update(self, collection_name: str, documents: Iterable[Tuple[str, Dict[str, Any]]]):
+        """
+        增量更新集合中部分文档的条目
+
+        Args:
+            collection_name: 集合名称
+            documents: (文档ID, 文档) 列表
+        """
+        collection = self._data.setdefault(collection_name, {"source": None, "entries": {}})
+        entries = collection.setdefault("entries", {})
+        for doc_id, doc in documents:
+            entries[doc_id] = [compute_content_hash(collection_name, doc), get_updated_at(doc)]
+        self._dirty.add(collection_name)
+
+    @_locked
+    def remove(self, collection_name: str, doc_ids: Iterable[str]) -> int:
+        """
+        删除集合中的条目
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+
+        Returns:
+            int: 删除的条目数量
+        """
+        entries = self.entries(collection_name)
+        removed = 0
+        for doc_id in doc_ids:
+            if entries.pop(doc_id, None) is not None:
+                removed += 1
+        if removed:
+            self._dirty.add(collection_name)
+        return removed
+
+    @_locked
+    def drop(self, collection_name: str):
+        """删除整个集合的清单"""
+        self._data.pop(collection_name, None)
+        self._dirty.add(collection_name)
+
+    @_locked
+    def clear(self):
+        """清空所有集合的清单"""
+        self._dirty.update(self._data)
+        if self.directory.exists():
+            self._dirty.update(path.stem for path in self.directory.glob("*.json"))
+        self._data = {}
+
+
+def diff_manifests(source: ManifestEntries, target: ManifestEntries) -> Dict[str, List[str]]:
+    """
+    比较两份清单
+
+    Args:
+        source: 源清单（JSON文件）
+        target: 目标清单（向量数据库）
+
+    Returns:
+        Dict[str, List[str]]: missing（目标中缺失）、changed（哈希不同）、orphaned（只存在于目标中）的文档ID
+    """
+    missing = [doc_id for doc_id in source if doc_id not in target]
+    changed = [doc_id for doc_id, entry in source.items()
+               if doc_id in target and target[doc_id][0] != entry[0]]
+    orphaned = [doc_id for doc_id in target if doc_id not in source]
+    return {"missing": missing, "changed": changed, "orphaned": orphaned}
@@ -4,7 +4,6 @@
 负责在应用启动时检查和同步JSON文件与向量数据库
 """
 import os
-import json
 import sys
 import asyncio
 import time
@@ -12,8 +11,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
-from src.memory.initializer import MemoryInitializer
 from src.memory.memory_manager import MemoryManager
+from src.utils.therapist_config import TherapistConfig
 from src.utils.logger import logger
 
 
@@ -24,7 +23,7 @@ class MemorySystemInitializer:
     """
 
     @staticmethod
-    async def initialize_memory_system() -> MemoryManager:
+    async def initialize_memory_system(therapist_config: Optional[TherapistConfig] = None) -> MemoryManager:
         """
         初始化整个记忆系统
 
@@ -32,18 +31,19 @@ class MemorySystemInitializer:
         2. 检查JSON文件和向量数据库状态
         3. 必要时执行同步
 
+        Args:
+            therapist_config: 咨询师配置，为None时加载默认配置文件
+
         Returns:
             MemoryManager: 初始化好的记忆管理器实例
         """
         logger.info("开始初始化记忆系统...")
 
-        # 获取动态咨询师配置
-        therapist_types = MemorySystemInitializer._get_therapist_types()
+        # 创建记忆管理器（咨询师配置只加载一次，注入到各存储）
+        memory_manager = MemoryManager(therapist_config=therapist_config)
+        therapist_types = list(memory_manager.therapy_types)
         logger.info(f"检测到 {len(therapist_types)} 个心理咨询流派: {', '.join(therapist_types)}")
 
-        # 创建记忆管理器
-        memory_manager = MemoryManager()
-
         # 检查向量数据库目录是否存在
         vector_db_dir = Path(memory_manager.vector_store.persist_directory)
         vector_db_exists = vector_db_dir.exists() and any(
@@ -59,21 +59,13 @@ class MemorySystemInitializer:
         # 根据检测结果决定初始化策略
         if vector_db_exists and json_exists:
             logger.info("向量数据库和JSON文件都存在，进行增量同步")
-            # 使用初始化器进行增量同步
-            initializer = MemoryInitializer(
-                json_store=memory_manager.json_store,
-                vector_store=memory_manager.vector_store
-            )
-            await initializer.initialize()
+            # 使用记忆管理器的初始化器进行增量同步
+            await memory_manager.initializer.initialize()
 
         elif json_exists and not vector_db_exists:
             logger.info("只有JSON文件存在，从JSON重建向量数据库")
-            # 使用初始化器从JSON重建向量数据库
-            initializer = MemoryInitializer(
-                json_store=memory_manager.json_store,
-                vector_store=memory_manager.vector_store
-            )
-            await initializer.rebuild_vector_db_from_json()
+            # 使用记忆管理器的初始化器从JSON重建向量数据库
+            await memory_manager.initializer.rebuild_vector_db_from_json()
 
         elif vector_db_exists and not json_exists:
             logger.info("只有向量数据库存在，从向量数据库生成JSON文件")
@@ -105,7 +97,7 @@ class MemorySystemInitializer:
         await memory_manager.vector_store.init_collections()
 
         # 获取所有治疗师流派
-        therapist_types = MemorySystemInitializer._get_therapist_types()
+        therapist_types = memory_manager.therapy_types
 
         # 定义要处理的集合列表
         collections = [
@@ -123,13 +115,8 @@ class MemorySystemInitializer:
             logger.info(f"从向量数据库导出集合: {collection_name}")
 
             try:
-                # 从向量数据库获取所有文档
-                documents = await memory_manager.vector_store.search_documents(
-                    collection_name,
-                    query="",
-                    filter_dict=None,
-                    limit=1000  # 设置较大的限制以获取所有文档
-                )
+                # 从向量数据库分页导出所有文档（包括向量）
+                documents = await memory_manager.vector_store.export_documents(collection_name)
 
                 if not documents:
                     logger.info(f"集合 {collection_name} 为空，跳过导出")
@@ -137,17 +124,10 @@ class MemorySystemInitializer:
 
                 logger.info(f"为集合 {collection_name} 导出 {len(documents)} 个文档")
 
-                # 将文档写入JSON
-                for doc in documents:
-                    # 确保文档有ID
-                    if "id" not in doc:
-                        logger.warning(f"跳过没有ID的文档: {doc}")
-                        continue
-
-                    # 将文档添加到JSON
-                    success = memory_manager.json_store.add_document(collection_name, doc)
-                    if not success:
-                        logger.warning(f"将文档 {doc['id']} 写入JSON失败")
+                # 一次性批量写入JSON，避免每个文档都重写整个文件
+                written = memory_manager.json_store.add_documents(collection_name, documents)
+                if written < len(documents):
+                    logger.warning(f"集合 {collection_name} 有 {len(documents) - written} 个文档写入JSON失败")
 
                 # 如果是学生特征向量集合，还需要重建索引文件
                 if collection_name == "student_vectors":
@@ -160,107 +140,79 @@ class MemorySystemInitializer:
 
     @staticmethod
     async def _rebuild_vector_index(memory_manager: MemoryManager, vector_documents: List[Dict[str, Any]]):
-        """重建向量索引文件"""
+        """根据导出的学生特征向量重建向量索引"""
         try:
-            index_path = Path(memory_manager.json_store.base_dir).joinpath("vector_index.json")
-            index_data = {}
-
+            entries = []
             for doc in vector_documents:
                 vector_id = doc.get("id")
                 if not vector_id:
                     continue
 
+                # 导出的文档中向量数据库元数据已合并到顶层，旧数据可能仍在metadata字段中
                 metadata = doc.get("metadata", {})
-                student_id = metadata.get("student_id")
-                record_id = metadata.get("record_id")
+                student_id = doc.get("student_id") or metadata.get("student_id")
+                record_id = doc.get("record_id") or metadata.get("record_id")
 
                 if not student_id:
                     continue
 
-                index_data[vector_id] = {
-                    "student_id": student_id,
-                    "record_id": record_id,
-                    "updated_at": metadata.get("created_at", datetime.now().timestamp())
-                }
+                updated_at = metadata.get("created_at")
+                if not isinstance(updated_at, (int, float)):
+                    updated_at = datetime.now().timestamp()
+                entries.append((vector_id, student_id, record_id, updated_at))
 
-            with open(index_path, 'w', encoding='utf-8') as f:
-                json.dump(index_data, ensure_ascii=False, indent=2, fp=f)
-
-            logger.info(f"重建了向量索引文件，包含 {len(index_data)} 个索引项")
+            count = await asyncio.to_thread(memory_manager.vector_index.replace_all, entries)
+            logger.info(f"重建了向量索引，包含 {count} 个索引项")
         except Exception as e:
-            logger.error(f"重建向量索引文件失败: {str(e)}")
+            logger.error(f"重建向量索引失败: {str(e)}")
 
     @staticmethod
-    def _get_therapist_types() -> List[str]:
-        """
-        从配置文件获取所有的治疗师流派类型
-
-        Returns:
-            List[str]: 治疗师流派类型列表
+    async def _ensure_therapist_collections(memory_manager: MemoryManager, therapist_types: List[str]) -> None:
         """
-        # 默认流派
-        therapist_types = ["cbt", "psychodynamic"]
-
-        try:
-            # 尝试加载治疗师配置文件
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "therapists_config.json"
-            )
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 提取所有流派ID
-                therapist_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
+        确保所有治疗师流派的记忆集合都已创建
 
-        except Exception as e:
-            logger.warning(f"加载治疗师配置失败: {str(e)}，将使用默认流派")
+        只按同步清单判断集合是否为空，空集合并发写入默认技能
 
-        return therapist_types
+        Args:
+            memory_manager: 记忆管理器
+            therapist_types: 治疗师流派类型列表
+        """
+        empty_types = [
+            therapy_type for therapy_type in therapist_types
+            if not memory_manager.has_skill_memory("therapist", therapy_type=therapy_type)
+        ]
+        await asyncio.gather(*(
+            MemorySystemInitializer._seed_therapist_collection(memory_manager, therapy_type)
+            for therapy_type in empty_types
+        ))
+        logger.info(f"已验证 {len(therapist_types)} 个治疗师流派的记忆集合，其中 {len(empty_types)} 个添加了默认技能")
 
     @staticmethod
-    async def _ensure_therapist_collections(memory_manager: MemoryManager, therapist_types: List[str]) -> None:
+    async def _seed_therapist_collection(memory_manager: MemoryManager, therapy_type: str) -> None:
         """
-        确保所有治疗师流派的记忆集合都已创建
+        为治疗师流派添加默认技能记忆
 
         Args:
             memory_manager: 记忆管理器
-            therapist_types: 治疗师流派类型列表
+            therapy_type: 治疗师流派类型
         """
-        # 为每个治疗师流派验证记忆集合
-        for therapy_type in therapist_types:
-            collection_name = f"therapist_{therapy_type}_skills"
-
-            try:
-                # 尝试从集合中获取技能
-                skills = await memory_manager.get_skill_memory("therapist", therapy_type=therapy_type)
-
-                # 如果集合为空，添加默认技能
-                if not skills:
-                    logger.info(f"为治疗师流派 {therapy_type} 添加默认技能记忆")
-
-                    # 创建基础技能
-                    skill_memory = {
-                        "id": f"{therapy_type}_base_skill_1",
-                        "content": f"作为{therapy_type}流派的心理咨询师，能够通过专业技能帮助来访者解决心理问题。",
-                        "timestamp": time.time() if 'time' in globals() else 0,
-                        "therapy_type": therapy_type
-                    }
-
-                    # 存储基础技能
-                    await memory_manager.update_skill_memory(
-                        "therapist",
-                        skill_memory,
-                        therapy_type=therapy_type
-                    )
-
-                logger.info(f"治疗师流派 {therapy_type} 的记忆集合已验证")
+        try:
+            logger.info(f"为治疗师流派 {therapy_type} 添加默认技能记忆")
+
+            # 创建基础技能
+            skill_memory = {
+                "id": f"{therapy_type}_base_skill_1",
+                "content": f"作为{therapy_type}流派的心理咨询师，能够通过专业技能帮助来访者解决心理问题。",
+                "timestamp": time.time(),
+                "therapy_type": therapy_type
+            }
+
+            # 存储基础技能
+            await memory_manager.update_skill_memory(
+                "therapist",
+                skill_memory,
+                therapy_type=therapy_type
+            )
 
-            except Exception as e:
-                logger.error(f"验证治疗师流派 {therapy_type} 的记忆集合时出错: {str(e)}")
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"验证治疗师流派 {therapy_type} 的记忆集合时出错: {str(e)}")
@@ -0,0 +1,401 @@
+# src/memory/vector_matrix_store.py
+"""
+向量矩阵存储
+将嵌入向量以内存映射的二进制矩阵形式保存，JSON文件只保留元数据
+"""
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+import numpy as np
+
+from src.utils.logger import logger
+
+
+# 各集合中保存嵌入向量的字段名
+STUDENT_VECTOR_FIELD = "feature_vector"
+SKILL_VECTOR_FIELD = "skill_vector"
+
+
+def get_vector_field(collection_name: str) -> Optional[str]:
+    """
+    获取集合中保存嵌入向量的字段名
+
+    Args:
+        collection_name: 集合名称
+
+    Returns:
+        Optional[str]: 向量字段名，集合不包含向量时返回None
+    """
+    if collection_name == "student_vectors":
+        return STUDENT_VECTOR_FIELD
+    if collection_name.endswith("_skills"):
+        return SKILL_VECTOR_FIELD
+    return None
+
+
+# 矩阵文件路径 -> 进程内共享的矩阵实例
+_open_matrices: Dict[str, "VectorMatrix"] = {}
+_open_matrices_lock = threading.Lock()
+
+
+class VectorMatrix:
+    """单个集合的向量矩阵
+
+    文件布局:
+    - {name}.bin: 按行连续存放的向量矩阵 (float32/float16)
+    - {name}.ids: 每行一个文档ID，行号即矩阵行号，空行表示已删除
+    - {name}.meta.json: 维度和数据类型
+
+    追加时先写矩阵再写ID，ID文件是提交记录：加载时多出的矩阵行会被截掉。
+    同一组文件应通过 VectorMatrix.open 获取共享实例，行号映射和写锁才能在多个存储之间一致。
+    """
+
+    @classmethod
+    def open(cls, base_dir: Path, name: str, dtype: str = "float32") -> "VectorMatrix":
+        """
+        获取进程内共享的向量矩阵实例
+
+        Args:
+            base_dir: 矩阵文件所在目录
+            name: 矩阵名称（通常为集合名称）
+            dtype: 新建矩阵时使用的数据类型，float32或float16
+
+        Returns:
+            VectorMatrix: 同一组文件对应的唯一实例
+        """
+        key = os.path.abspath(os.path.join(base_dir, f"{name}.bin"))
+        with _open_matrices_lock:
+            if key not in _open_matrices:
+                _open_matrices[key] = cls(base_dir, name, dtype)
+            return _open_matrices[key]
+
+    def __init__(self, base_dir: Path, name: str, dtype: str = "float32"):
+        """
+        初始化向量矩阵
+
+        Args:
+            base_dir: 矩阵文件所在目录
+            name: 矩阵名称（通常为集合名称）
+            dtype: 新建矩阵时使用的数据类型，float32或float16
+        """
+        self.base_dir = Path(base_dir)
+        self.name = name
+        self.matrix_path = self.base_dir.joinpath(f"{name}.bin")
+        self.ids_path = self.base_dir.joinpath(f"{name}.ids")
+        self.meta_path = self.base_dir.joinpath(f"{name}.meta.json")
+
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+
+        # 行号 -> 文档ID（None表示已删除）以及 文档ID -> 行号
+        self._row_ids: List[Optional[str]] = []
+        self._id_to_row: Dict[str, int] = {}
+
+        # 懒加载的只读内存映射和已删除行掩码
+        self._mmap: Optional[np.memmap] = None
+        self._deleted_mask: Optional[np.ndarray] = None
+
+        # 写入和读取行号映射时持有
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """加载元数据和ID映射"""
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.dtype = np.dtype(meta.get("dtype", self.dtype.name))
+            self.dim = meta.get("dim")
+
+        ids_complete = True
+        if self.ids_path.exists():
+            with open(self.ids_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            # 最后一行没有换行符说明写入被中断，这一行不算数
+            if lines and not lines[-1].endswith("\n"):
+                lines.pop()
+                ids_complete = False
+            self._row_ids = [line.rstrip("\n") or None for line in lines]
+
+        # 矩阵和ID文件可能因为异常中断而行数不一致，以较短者为准并把文件截断到一致，
+        # 否则下一次追加的行号会与矩阵中的实际位置错开
+        rows = len(self._row_ids)
+        if self.dim and self.matrix_path.exists():
+            matrix_rows = os.path.getsize(self.matrix_path) // self._row_bytes
+            if os.path.getsize(self.matrix_path) != rows * self._row_bytes:
+                rows = min(rows, matrix_rows)
+                with open(self.matrix_path, 'r+b') as f:
+                    f.truncate(rows * self._row_bytes)
+                logger.warning(f"向量矩阵 {self.name} 文件行数不一致，已截断为 {rows} 行")
+        if rows != len(self._row_ids) or not ids_complete:
+            self._row_ids = self._row_ids[:rows]
+            self._write_ids()
+
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._row_ids) if doc_id}
+
+    @property
+    def _row_bytes(self) -> int:
+        return int(self.dim) * self.dtype.itemsize
+
+    def _write_meta(self):
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump({"dtype": self.dtype.name, "dim": self.dim}, f)
+
+    def _invalidate(self):
+        """矩阵文件发生变化后丢弃旧的内存映射"""
+        self._mmap = None
+        self._deleted_mask = None
+
+    def __len__(self) -> int:
+        return len(self._id_to_row)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._id_to_row
+
+    def ids(self) -> List[str]:
+        """返回所有有效的文档ID"""
+        return list(self._id_to_row.keys())
+
+    def matrix(self) -> Optional[np.memmap]:
+        """
+        获取整个矩阵的只读内存映射（包含已删除的行）
+
+        Returns:
+            Optional[np.memmap]: 形状为 (行数, 维度) 的矩阵，为空时返回None
+        """
+        if not self.dim or not self._row_ids:
+            return None
+        if self._mmap is None or self._mmap.shape[0] != len(self._row_ids):
+            self._mmap = np.memmap(self.matrix_path, dtype=self.dtype, mode='r',
+                                   shape=(len(self._row_ids), self.dim))
+        return self._mmap
+
+    def get(self, doc_id: str) -> Optional[List[float]]:
+        """
+        获取单个向量
+
+        Args:
+            doc_id: 文档ID
+
+        Returns:
+            Optional[List[float]]: 向量，不存在时返回None
+        """
+        with self._lock:
+            row = self._id_to_row.get(doc_id)
+            if row is None:
+                return None
+            return self.matrix()[row].astype(np.float32).tolist()
+
+    def put(self, doc_id: str, vector: Iterable[float]) -> bool:
+        """
+        写入单个向量，已存在则原地覆盖
+
+        Args:
+            doc_id: 文档ID
+            vector: 向量
+
+        Returns:
+            bool: 写入是否成功
+        """
+        return self.put_many([(doc_id, vector)]) == 1
+
+    def put_many(self, items: Iterable[Tuple[str, Iterable[float]]]) -> int:
+        """
+        批量写入向量，新向量追加到矩阵末尾，已有向量原地覆盖
+
+        Args:
+            items: (文档ID, 向量) 列表
+
+        Returns:
+            int: 成功写入的数量
+        """
+        with self._lock:
+            updates: Dict[int, np.ndarray] = {}
+            appends: Dict[str, np.ndarray] = {}
+
+            for doc_id, vector in items:
+                array = np.asarray(vector, dtype=np.float32).reshape(-1)
+                if self.dim is None:
+                    self.dim = int(array.shape[0])
+                    self._write_meta()
+                if array.shape[0] != self.dim:
+                    logger.warning(f"向量维度不匹配: {self.name}/{doc_id} 为 {array.shape[0]} 维，期望 {self.dim} 维")
+                    continue
+
+                row = self._id_to_row.get(doc_id)
+                if row is not None:
+                    updates[row] = array
+                else:
+                    appends[doc_id] = array
+
+            if updates:
+                matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode='r+',
+                                   shape=(len(self._row_ids), self.dim))
+                for row, array in updates.items():
+                    matrix[row] = array
+                matrix.flush()
+                del matrix
+
+            if appends:
+                block = np.stack(list(appends.values())).astype(self.dtype)
+                # 从ID文件记录的行数处写入，覆盖之前中断遗留的未提交行
+                with open(self.matrix_path, 'r+b' if self.matrix_path.exists() else 'wb') as f:
+                    f.seek(len(self._row_ids) * self._row_bytes)
+                    f.write(block.tobytes())
+                    f.truncate()
+                with open(self.ids_path, 'a', encoding='utf-8') as f:
+                    f.write("".join(f"{doc_id}\n" for doc_id in appends))
+                for doc_id in appends:
+                    self._id_to_row[doc_id] = len(self._row_ids)
+                    self._row_ids.append(doc_id)
+
+            self._invalidate()
+            return len(updates) + len(appends)
+
+    def remove(self, doc_id: str) -> bool:
+        """
+        删除向量（仅标记删除，空间在compact时回收）
+
+        Args:
+            doc_id: 文档ID
+
+        Returns:
+            bool: 是否删除了向量
+        """
+        with self._lock:
+            row = self._id_to_row.pop(doc_id, None)
+            if row is None:
+                return False
+            self._row_ids[row] = None
+            self._deleted_mask = None
+            self._write_ids()
+            return True
+
+    def _write_ids(self):
+        with open(self.ids_path, 'w', encoding='utf-8') as f:
+            f.write("".join(f"{doc_id or ''}\n" for doc_id in self._row_ids))
+
+    def compact(self):
+        """回收已删除的行"""
+        with self._lock:
+            if not self.dim or len(self._id_to_row) == len(self._row_ids):
+                return
+
+            live_rows = [row for row, doc_id in enumerate(self._row_ids) if doc_id]
+            block = np.array(self.matrix()[live_rows]) if live_rows else np.zeros((0, self.dim), dtype=self.dtype)
+            self._invalidate()
+
+            tmp_path = self.matrix_path.with_suffix(".bin.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(block.tobytes())
+            os.replace(tmp_path, self.matrix_path)
+
+            self._row_ids = [self._row_ids[row] for row in live_rows]
+            self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._row_ids)}
+            self._write_ids()
+            logger.info(f"向量矩阵 {self.name} 压缩完成，剩余 {len(self._row_ids)} 行")
+
+    def clear(self):
+        """删除矩阵的所有文件并清空内存中的行号映射，共享实例之后可继续写入"""
+        with self._lock:
+            self._invalidate()
+            for path in (self.matrix_path, self.ids_path, self.meta_path):
+                if path.exists():
+                    os.remove(path)
+            self.dim = None
+            self._row_ids = []
+            self._id_to_row = {}
+
+    def search(self, query_vector: Iterable[float], limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        在内存映射矩阵上直接计算余弦相似度，返回前limit个结果
+
+        Args:
+            query_vector: 查询向量
+            limit: 返回数量
+
+        Returns:
+            List[Tuple[str, float]]: (文档ID, 余弦相似度) 列表，按相似度降序排列
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            matrix = self.matrix()
+            if matrix is None or not self._id_to_row:
+                return []
+
+            query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+            if query.shape[0] != self.dim:
+                logger.warning(f"查询向量维度不匹配: {query.shape[0]} != {self.dim}")
+                return []
+
+            query_norm = np.linalg.norm(query)
+            if query_norm == 0:
+                return []
+
+            scores = (matrix @ (query / query_norm).astype(matrix.dtype)).astype(np.float32)
+            norms = np.linalg.norm(matrix, axis=1).astype(np.float32)
+            scores = np.divide(scores, norms, out=np.zeros(len(norms), dtype=np.float32), where=norms > 0)
+
+            # 已删除的行不参与排序
+            if self._deleted_mask is None:
+                self._deleted_mask = np.array([doc_id is None for doc_id in self._row_ids], dtype=bool)
+            scores[self._deleted_mask] = -np.inf
+
+            # 已删除的行得分为 -inf，最多只取有效行数个结果
+            k = min(limit, len(self._id_to_row), len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._row_ids[row], float(scores[row])) for row in top]
+
+
+class VectorMatrixStore:
+    """按集合管理向量矩阵"""
+
+    def __init__(self, base_dir: Path, dtype: str = "float32"):
+        """
+        初始化向量矩阵存储
+
+        Args:
+            base_dir: 矩阵文件目录
+            dtype: 新建矩阵的数据类型，float32或float16
+        """
+        self.base_dir = Path(base_dir)
+        self.dtype = dtype
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._matrices: Dict[str, VectorMatrix] = {}
+
+    def get_matrix(self, collection_name: str) -> VectorMatrix:
+        """获取（必要时打开）集合的向量矩阵"""
+        if collection_name not in self._matrices:
+            # 多个存储实例可能指向同一目录，共享矩阵实例以保持行号一致
+            self._matrices[collection_name] = VectorMatrix.open(self.base_dir, collection_name, self.dtype)
+        return self._matrices[collection_name]
+
+    def attach_vectors(self, collection_name: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        为文档副本附加向量字段
+
+        Args:
+            collection_name: 集合名称
+            documents: 文档列表
+
+        Returns:
+            List[Dict[str, Any]]: 附加了向量的文档副本
+        """
+        field = get_vector_field(collection_name)
+        if field is None:
+            return documents
+
+        matrix = self.get_matrix(collection_name)
+        result = []
+        for doc in documents:
+            vector = matrix.get(doc.get("id"))
+            if vector is not None:
+                doc = dict(doc)
+                doc[field] = vector
+            result.append(doc)
+        return result
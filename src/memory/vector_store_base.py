@@ -0,0 +1,295 @@
+# src/memory/vector_store_base.py
+"""
+向量存储后端的公共基类
+ChromaDB和NumPy两种后端共用的线程池、耗时统计、同步清单和文档编解码逻辑
+"""
+from typing import Dict, Any, List, Optional, Tuple, Callable
+import json
+import os
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.memory.vector_matrix_store import get_vector_field
+from src.memory.sync_manifest import SyncManifest, ManifestEntries
+from src.utils.therapist_config import TherapistConfig, load_therapist_config
+from src.utils.logger import logger
+
+
+# 无需读取文档正文即可返回的字段
+_BODYLESS_FIELDS = {"id", "similarity"}
+
+# 批量读写时每批的文档数量
+BATCH_SIZE = 500
+
+# 执行存储调用的线程数
+DEFAULT_MAX_WORKERS = 4
+
+
+class VectorStoreBase:
+    """向量存储后端基类
+
+    子类需要实现: init_collections、_open_collection、has_collection、ensure_collection、add_documents、
+    upsert_documents、get_document、update_document、search_documents、search_documents_batch、
+    get_document_ids、export_documents、reset
+    """
+
+    def __init__(self, persist_directory: str, max_workers: int = DEFAULT_MAX_WORKERS,
+                 therapist_config: Optional[TherapistConfig] = None):
+        """
+        初始化向量存储
+
+        Args:
+            persist_directory: 持久化目录
+            max_workers: 执行存储调用的线程池大小
+            therapist_config: 咨询师配置，为None时加载默认配置文件
+        """
+        self.persist_directory = persist_directory
+
+        # 确保持久化目录存在
+        os.makedirs(self.persist_directory, exist_ok=True)
+
+        # 向量数据库一侧的同步清单，随每次写入在内存中更新，在cleanup时保存；
+        # 未保存的条目在下次启动同步时会被当作缺失或已变化的文档重新写入
+        self.manifest = SyncManifest.open(self.persist_directory)
+
+        # 存储调用都是同步的，统一放到有界线程池中执行，避免阻塞事件循环
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # 同一集合的写操作串行执行
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+
+        # 集合在首次使用时才打开，打开过程串行执行
+        self._open_lock = asyncio.Lock()
+
+        # 各类操作的耗时统计: 操作名 -> {count, total_ms, max_ms}
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+        # 可用的治疗流派
+        therapist_config = therapist_config or load_therapist_config()
+        self.therapy_types = list(therapist_config.therapy_types)
+
+    def _collection_names(self) -> List[str]:
+        """所有默认集合的名称"""
+        names = ["profiler_skills"]
+        # 为每个治疗流派添加集合
+        for therapy_type in self.therapy_types:
+            names.append(f"therapist_{therapy_type}_skills")
+        names.extend(["medical_records", "student_vectors"])
+        return names
+
+    def _open_collection(self, collection_name: str):
+        """打开（必要时创建）一个默认集合（在线程池中执行），由子类实现"""
+        raise NotImplementedError
+
+    async def _get_collection(self, collection_name: str, create: bool = False):
+        """
+        获取集合，首次使用时只打开这一个集合
+
+        Args:
+            collection_name: 集合名称
+            create: 不是默认集合但为治疗师技能集合时是否创建
+
+        Returns:
+            集合对象，不存在时返回None
+        """
+        if collection_name not in self._collections:
+            async with self._open_lock:
+                # 等待锁期间可能已被其他协程打开
+                opened = collection_name in self._collections
+                if not opened and collection_name in self._collection_names():
+                    await self._run("open_collection", self._open_collection, collection_name)
+                elif not opened and create and collection_name.startswith("therapist_"):
+                    # 新的治疗流派集合
+                    therapy_type = collection_name.split("_")[1]
+                    if therapy_type not in self.therapy_types:
+                        self.therapy_types.append(therapy_type)
+                        logger.info(f"添加新的治疗流派集合: {therapy_type}")
+                    await self.ensure_collection(collection_name)
+                    logger.info(f"创建新的治疗流派集合: {collection_name}")
+
+        return self._collections.get(collection_name)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取（必要时创建）执行ChromaDB调用的线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chroma")
+        return self._executor
+
+    def _get_write_lock(self, collection_name: str) -> asyncio.Lock:
+        """获取集合的写锁"""
+        if collection_name not in self._write_locks:
+            self._write_locks[collection_name] = asyncio.Lock()
+        return self._write_locks[collection_name]
+
+    async def _run(self, operation: str, func: Callable, *args, **kwargs):
+        """
+        在线程池中执行同步的存储调用并记录耗时
+
+        Args:
+            operation: 操作名称，用于耗时统计
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数的返回值
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+        finally:
+            self._record_metric(operation, (time.perf_counter() - start) * 1000)
+
+    async def _run_write(self, collection_name: str, operation: str, func: Callable, *args, **kwargs):
+        """在集合写锁内执行写操作，同一集合的写入按顺序进行"""
+        async with self._get_write_lock(collection_name):
+            return await self._run(operation, func, *args, **kwargs)
+
+    def _record_metric(self, operation: str, elapsed_ms: float):
+        """记录一次操作耗时"""
+        metric = self._metrics.setdefault(operation, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        metric["count"] += 1
+        metric["total_ms"] += elapsed_ms
+        metric["max_ms"] = max(metric["max_ms"], elapsed_ms)
+
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取向量存储调用的耗时统计
+
+        Returns:
+            Dict[str, Dict[str, float]]: 操作名 -> {count, total_ms, avg_ms, max_ms}
+        """
+        return {
+            operation: {
+                "count": metric["count"],
+                "total_ms": round(metric["total_ms"], 3),
+                "avg_ms": round(metric["total_ms"] / metric["count"], 3) if metric["count"] else 0.0,
+                "max_ms": round(metric["max_ms"], 3),
+            }
+            for operation, metric in self._metrics.items()
+        }
+
+    async def add_document(self, collection_name: str, doc_id: str, content: Dict[str, Any],
+                           metadata: Dict[str, Any]) -> None:
+        """添加文档到指定集合"""
+        await self.add_documents(collection_name, [doc_id], [content], [metadata])
+
+    def _update_manifest(self, collection_name: str, documents: List[Tuple[str, Dict[str, Any]]]):
+        """更新同步清单（在线程池中执行），保存推迟到 save_manifest"""
+        self.manifest.update(collection_name, documents)
+
+    def _remove_from_manifest(self, collection_name: str, doc_ids: List[str]):
+        """从同步清单中删除条目（在线程池中执行），保存推迟到 save_manifest"""
+        self.manifest.remove(collection_name, doc_ids)
+
+    async def save_manifest(self):
+        """保存同步清单中有变化的集合"""
+        if self.manifest.dirty:
+            await self._run("manifest", self.manifest.save)
+
+    async def get_manifest(self, collection_name: str, live_ids: Optional[List[str]] = None) -> ManifestEntries:
+        """
+        获取集合的同步清单
+
+        Args:
+            collection_name: 集合名称
+            live_ids: 向量数据库中实际存在的文档ID，提供时会剔除清单中已不存在的条目
+
+        Returns:
+            ManifestEntries: 文档ID -> [内容哈希, 更新时间]
+        """
+        entries = dict(self.manifest.entries(collection_name))
+        if live_ids is not None:
+            stale = set(entries) - set(live_ids)
+            if stale:
+                self.manifest.remove(collection_name, stale)
+                await self._run("manifest", self.manifest.save)
+                for doc_id in stale:
+                    entries.pop(doc_id, None)
+                logger.info(f"从 {collection_name} 的同步清单中移除了 {len(stale)} 个已不存在的条目")
+        return entries
+
+    @staticmethod
+    def _split_embedding(collection_name: str, content: Dict[str, Any]) -> Tuple[str, Optional[List[float]]]:
+        """
+        将向量字段从文档中分离
+
+        Args:
+            collection_name: 集合名称
+            content: 文档内容
+
+        Returns:
+            Tuple[str, Optional[List[float]]]: (不含向量的文档正文JSON, 向量)
+        """
+        field = get_vector_field(collection_name)
+        embedding_vector = None
+        if field is not None and field in content:
+            embedding_vector = content.get(field)
+            content = {key: value for key, value in content.items() if key != field}
+        return json.dumps(content, ensure_ascii=False), embedding_vector
+
+    @staticmethod
+    def _parse_document(collection_name: str, document: str) -> Dict[str, Any]:
+        """解析文档正文，并丢弃旧版本文档中内联保存的向量"""
+        parsed_doc = json.loads(document)
+        field = get_vector_field(collection_name)
+        if field is not None:
+            parsed_doc.pop(field, None)
+        return parsed_doc
+
+    def _build_results(self, collection_name: str, ids: List[str], documents: Optional[List[str]],
+                       metadatas: Optional[List[Dict[str, Any]]], distances: Optional[List[float]],
+                       include: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """
+        将ChromaDB的结果组装为文档列表，并按include进行字段投影
+
+        Args:
+            collection_name: 集合名称
+            ids: 文档ID列表
+            documents: 文档正文列表，未请求时为None
+            metadatas: 元数据列表
+            distances: 距离列表，非向量检索时为None
+            include: 需要返回的字段，为None时返回完整文档
+
+        Returns:
+            List[Dict[str, Any]]: 文档列表
+        """
+        results = []
+        for i, doc_id in enumerate(ids):
+            parsed_doc: Dict[str, Any] = {}
+            if documents is not None:
+                if not documents[i]:
+                    continue
+                try:
+                    parsed_doc = self._parse_document(collection_name, documents[i])
+                except json.JSONDecodeError:
+                    logger.info(f"无法解析文档: {documents[i]}")
+                    continue
+            parsed_doc.setdefault("id", doc_id)
+
+            # 添加相似度分数（ChromaDB返回距离，需转换为相似度）
+            if distances is not None and i < len(distances):
+                parsed_doc["similarity"] = 1.0 / (1.0 + distances[i])  # 距离转相似度
+
+            if metadatas is not None and i < len(metadatas) and metadatas[i]:
+                parsed_doc.update(metadatas[i])
+
+            if include is not None:
+                parsed_doc = {key: parsed_doc[key] for key in include if key in parsed_doc}
+            results.append(parsed_doc)
+        return results
+
+    async def cleanup(self):
+        """清理资源"""
+        await self.save_manifest()
+        # 关闭线程池
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._metrics:
+            logger.info(f"向量存储调用耗时统计: {self.get_metrics()}")
+        logger.info("清理资源")
\ No newline at end of file
@@ -20,6 +20,7 @@ class RuntimeState(TypedDict, total=False):
     is_profile_complete: bool  # 是否完成profile
     is_consultation_complete: bool  # 是否完成consultation
     metadata: Dict[str, Any]  # 元数据
+    student_feature_vector: Dict[str, Any]  # 当前学生的特征向量（按学生ID和画像版本缓存）
 
     # CBT相关运行时状态（新增字段，匹配 consultation_controller 的初始化）
     current_cbt_stage: str  # 当前CBT阶段，例如: "stage_1"
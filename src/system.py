@@ -69,6 +69,9 @@ class System:
                 api_base="https://api.siliconflow.cn/v1"
             )
 
+            # 技能整理在配置开启时使用同一个LLM服务合并近似重复的技能
+            self.memory_manager.skill_consolidator.llm_service = llm_service
+
             # 创建指导员Agent
             self.supervisor_agent = SupervisorAgent(llm_service=llm_service)
 
@@ -7,4 +7,24 @@ load_dotenv()
 class Config:
     """配置类"""
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # 写入技能记忆后是否回读向量数据库进行验证（仅用于调试）
+    MEMORY_VERIFY_WRITES = os.getenv("MEMORY_VERIFY_WRITES", "false").lower() in ("1", "true", "yes")
+    # 长期记忆向量存储后端: chroma 或 numpy
+    MEMORY_VECTOR_BACKEND = os.getenv("MEMORY_VECTOR_BACKEND", "chroma").lower()
+    # NumPy后端中集合启用IVF近似索引的向量数量，0表示始终精确检索
+    MEMORY_IVF_THRESHOLD = int(os.getenv("MEMORY_IVF_THRESHOLD", "0"))
+    # 混合检索中向量相似度的权重（其余为BM25词法分数），嵌入不可用时只使用词法分数
+    MEMORY_HYBRID_ALPHA = float(os.getenv("MEMORY_HYBRID_ALPHA", "0.7"))
+    # 每个技能集合保留的技能数量上限，超出时按使用频率和时间衰减淘汰（会删除技能，需显式开启），0表示不限制
+    SKILL_CAPACITY = int(os.getenv("SKILL_CAPACITY", "0"))
+    # 技能向量余弦相似度不低于该值时视为近似重复并合并
+    SKILL_MERGE_THRESHOLD = float(os.getenv("SKILL_MERGE_THRESHOLD", "0.92"))
+    # 集合新增多少条技能后在后台执行一次整理，0表示只手动整理
+    SKILL_CONSOLIDATE_EVERY = int(os.getenv("SKILL_CONSOLIDATE_EVERY", "50"))
+    # 合并近似重复技能时是否调用LLM概括（每个聚类一次调用）
+    SKILL_MERGE_WITH_LLM = os.getenv("SKILL_MERGE_WITH_LLM", "false").lower() in ("1", "true", "yes")
+    # 治疗效果模型的先验强度（特征桶内样本较少时向流派全局平均收缩的伪观测数）
+    THERAPY_PRIOR_STRENGTH = float(os.getenv("THERAPY_PRIOR_STRENGTH", "5"))
+    # 治疗效果模型推荐的置信度低于该值时，再用相似历史案例修正
+    THERAPY_MIN_CONFIDENCE = float(os.getenv("THERAPY_MIN_CONFIDENCE", "0.8"))
     # 添加其他配置项
\ No newline at end of file
@@ -5,8 +5,6 @@ import json
 from typing import Dict, Any, Optional
 from abc import ABC, abstractmethod
 
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
 from src.utils.logger import logger
 
 
@@ -31,6 +29,9 @@ class OpenAIService(LLMService):
     def __init__(self, api_key: str, model_name: str = "gpt-3.5-turbo", default_temperature: float = 0.5,
                  api_base: Optional[str] = None):
 
+        # langchain_openai导入较慢，在创建服务时才导入
+        from langchain_openai import ChatOpenAI
+
         if api_base:
             base_url = api_base
 
@@ -43,6 +44,8 @@ class OpenAIService(LLMService):
         self.default_temperature = default_temperature
 
     async def invoke(self, prompt: str, temperature: Optional[float] = None) -> str:
+        from langchain_core.messages import HumanMessage
+
         try:
             if temperature is not None:
                 original_temp = self.model.temperature
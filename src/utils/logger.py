@@ -5,12 +5,23 @@ import datetime
 from pathlib import Path
 import sys
 
+
+class _LazyFileHandler(logging.FileHandler):
+    """第一条日志写入时才创建日志目录和日志文件，导入logger本身不产生文件"""
+
+    def __init__(self, filename, encoding=None):
+        super().__init__(filename, encoding=encoding, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 def setup_logger() -> logging.Logger:
     """设置日志"""
 
     # sys.exit(0)
     logs_dir = Path(__file__).parents[2] / "runtime-logs"
-    os.makedirs(logs_dir, exist_ok=True)
     
     # 创建带时间戳的日志文件名
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -31,8 +42,8 @@ def setup_logger() -> logging.Logger:
     console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(console_formatter)
     
-    # 创建文件处理程序
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    # 创建文件处理程序（延迟到第一条日志时再创建文件）
+    file_handler = _LazyFileHandler(log_file, encoding='utf-8')
     file_handler.setLevel(logging.INFO)
     file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(file_formatter)
@@ -0,0 +1,129 @@
+# src/utils/startup_profiler.py
+"""
+启动耗时分析
+记录各模块的导入耗时和各初始化阶段的耗时，通过命令行参数 --profile-startup 开启。
+本模块只依赖标准库，需要在导入其他项目模块之前启用，才能统计到它们的导入耗时。
+"""
+import sys
+import time
+import builtins
+import threading
+import importlib.util
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 开启启动耗时分析的命令行参数
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """启动耗时分析器
+
+    导入耗时通过包装 builtins.__import__ 统计，只记录主线程中首次导入的模块:
+    累计耗时包含该模块导入的其他模块，自身耗时不包含。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._start: Optional[float] = None
+        self._original_import = None
+        self._main_thread = threading.get_ident()
+        # 模块名 -> [累计耗时, 自身耗时]（秒）
+        self._imports: Dict[str, List[float]] = {}
+        # 正在导入的模块的子模块累计耗时
+        self._stack: List[float] = []
+        # (阶段名, 耗时)
+        self._phases: List[Tuple[str, float]] = []
+
+    def enable(self):
+        """开始记录模块导入耗时"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._start = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        """停止记录模块导入耗时"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """记录耗时的 __import__"""
+        if threading.get_ident() != self._main_thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        module_name = name
+        if level:
+            try:
+                module_name = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                pass
+        if module_name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            timing = self._imports.setdefault(module_name, [0.0, 0.0])
+            timing[0] += elapsed
+            timing[1] += elapsed - children
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        记录一个初始化阶段的耗时（未开启时不做任何事）
+
+        Args:
+            name: 阶段名称
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, time.perf_counter() - start))
+
+    def report(self, top: int = 20) -> str:
+        """
+        生成启动耗时报告
+
+        Args:
+            top: 按累计耗时列出的模块数量
+
+        Returns:
+            str: 报告文本
+        """
+        if not self.enabled:
+            return ""
+
+        total = time.perf_counter() - self._start
+        lines = [f"=== 启动耗时分析（总计 {total * 1000:.1f} ms）===", "模块导入（累计 / 自身，ms）:"]
+        ranked = sorted(self._imports.items(), key=lambda item: item[1][0], reverse=True)
+        for module_name, (cumulative, own) in ranked[:top]:
+            lines.append(f"  {cumulative * 1000:9.1f} {own * 1000:9.1f}  {module_name}")
+        if len(ranked) > top:
+            lines.append(f"  ... 另有 {len(ranked) - top} 个模块")
+
+        if self._phases:
+            lines.append("初始化阶段（ms）:")
+            for name, elapsed in self._phases:
+                lines.append(f"  {elapsed * 1000:9.1f}  {name}")
+        return "\n".join(lines)
+
+
+# 进程内共享的分析器实例
+profiler = StartupProfiler()
+
+if PROFILE_FLAG in sys.argv:
+    profiler.enable()
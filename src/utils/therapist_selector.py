@@ -4,6 +4,8 @@ import json
 
 from src.utils.vector_utils import VectorUtils
 from src.memory.memory_manager import MemoryManager
+from src.memory.outcome_model import blend_cases, rank_estimates
+from src.utils.config import Config
 from src.utils.logger import logger
 
 
@@ -15,16 +17,17 @@ class TherapistSelector:
             memory_manager: MemoryManager,
             basic_info: Dict[str, Any],
             portrait: Dict[str, Any],
-            available_therapists: List[str]
+            available_therapists: List[str],
+            feature_vector: Optional[Dict[str, Any]] = None
     ) -> Tuple[str, float]:
         """
         根据学生特征和历史病历，选择最佳的治疗师流派
 
         算法流程:
-        1. 创建当前学生的特征向量
-        2. 查找相似的历史案例(获取相似度最高的10个向量)
-        3. 获取这些向量对应的病历，提取治疗类型和改善分数
-        4. 计算综合得分: 相似度 × 改善分数
+        1. 获取当前学生的特征向量（优先复用状态中已计算的向量）
+        2. 查找相似的历史案例(获取相似度最高的3个向量及其检索相似度)
+        3. 批量获取这些向量对应的病历，只读取治疗类型和改善分数
+        4. 计算综合得分: 检索相似度 × 改善分数
         5. 选择综合得分最高的治疗师流派
 
         Args:
@@ -32,92 +35,20 @@ class TherapistSelector:
             basic_info: 学生基本信息
             portrait: 学生心理画像
             available_therapists: 可用的治疗师流派列表
+            feature_vector: 已计算的学生特征向量（VectorUtils.get_student_feature_vector 的结果），
+                            为None时重新创建
 
         Returns:
             Tuple[str, float]: (最佳治疗师流派, 综合得分)
         """
         try:
-            # 1. 创建当前学生的特征向量
-            current_vector = VectorUtils.create_student_feature_vector(basic_info, portrait)
-            current_feature_text = current_vector["feature_text"]
+            # 1. 获取当前学生的特征向量
+            current_vector = feature_vector or VectorUtils.create_student_feature_vector(basic_info, portrait)
 
-            # 2. 查找相似的历史案例(Top 10)
-            similar_vectors = await memory_manager.find_similar_vectors(current_feature_text, limit=3)
-            # logger.info("-------1---------------")
-            # logger.info(similar_vectors)
-
-            if not similar_vectors:
-                logger.warning("未找到相似的历史案例，将使用默认治疗师")
-                return available_therapists[0], 0.0
-
-            # 3. 获取向量索引数据
-            vector_index = await memory_manager.get_vector_index()
-            # logger.info("-------2---------------")
-            # logger.info(vector_index)
-
-            # 4. 计算每个案例的综合得分
-            case_scores = []
-
-            for vector in similar_vectors:
-                vector_id = vector.get("id")
-                # logger.info("-------3----------")
-                # logger.info(vector_id)
-                if not vector_id or vector_id not in vector_index:
-                    continue
-
-                # 获取关联的病历ID
-                record_id = vector_index[vector_id].get("record_id")
-                # logger.info("-------4----------")
-                # logger.info(record_id)
-                if not record_id:
-                    continue
-
-                # 获取完整病历
-                medical_record = await memory_manager.get_medical_record(record_id)
-                # logger.info("-------5----------")
-                # logger.info(medical_record)
-                if not medical_record:
-                    continue
-
-                # 获取治疗师流派和改善分数
-                therapy_type = medical_record.get("therapyType")
-                # logger.info("------6----------")
-                # logger.info(therapy_type)
-
-                # 必须确保治疗师流派在可用列表中
-                if therapy_type not in available_therapists:
-                    continue
-
-                # 获取治疗效果分数
-                improvement_score = medical_record.get("totalImprovementScore", 0)
-                # logger.info("-------7----------")
-                # logger.info(improvement_score)
-
-                # 如果改善分数不是正数，跳过(量表分数变高说明效果不好)
-                # if improvement_score <= 0:
-                #     continue
-
-                # 计算相似度
-                similarity = TherapistSelector._calculate_similarity(
-                    current_feature_text,
-                    vector.get("feature_text", "")
-                )
-                # logger.info("-------8----------")
-                # logger.info(similarity)
-
-                # 计算综合得分
-                combined_score = similarity * improvement_score
-                # logger.info("-------9--------")
-                # logger.info(combined_score)
-
-                # 记录该案例信息
-                case_scores.append({
-                    "therapy_type": therapy_type,
-                    "record_id": record_id,
-                    "similarity": similarity,
-                    "improvement_score": improvement_score,
-                    "combined_score": combined_score
-                })
+            # 2-4. 查找相似的历史案例(Top 3)并计算每个案例的综合得分
+            case_scores = await TherapistSelector._find_similar_cases(
+                memory_manager, current_vector, available_therapists, limit=3
+            )
 
             # 5. 按综合得分排序
             if not case_scores:
@@ -147,45 +78,163 @@ class TherapistSelector:
             return available_therapists[0], 0.0
 
     @staticmethod
-    def _calculate_similarity(text1: str, text2: str) -> float:
+    async def recommend_therapist(
+            memory_manager: MemoryManager,
+            basic_info: Dict[str, Any],
+            portrait: Dict[str, Any],
+            available_therapists: List[str],
+            feature_vector: Optional[Dict[str, Any]] = None,
+            min_confidence: Optional[float] = None,
+            refine_limit: int = 3
+    ) -> Dict[str, Any]:
         """
-        计算两个特征文本的相似度
+        基于治疗效果模型推荐治疗师流派
 
-        使用词袋模型和余弦相似度计算两个文本的相似度
+        算法流程:
+        1. 读取治疗效果模型中学生所在特征桶的聚合值，估计各流派的期望改善分数和置信度
+        2. 置信度低于阈值时，用少量相似历史案例（检索相似度加权）修正估计
+        3. 选择期望改善分数最高的流派
 
         Args:
-            text1: 第一个特征文本
-            text2: 第二个特征文本
+            memory_manager: 记忆管理器
+            basic_info: 学生基本信息
+            portrait: 学生心理画像
+            available_therapists: 可用的治疗师流派列表
+            feature_vector: 已计算的学生特征向量，修正时复用
+            min_confidence: 置信度阈值，默认读取配置 THERAPY_MIN_CONFIDENCE
+            refine_limit: 修正时使用的相似案例数量，0表示不修正
 
         Returns:
-            float: 相似度分数 (0-1之间)
+            Dict[str, Any]: {"therapy_type", "expected_improvement", "confidence", "refined", "estimates"}
         """
-        if not text1 or not text2:
-            return 0.0
-
-        # 分词
-        words1 = text1.split()
-        words2 = text2.split()
-
-        # 构建词汇表
-        vocabulary = sorted(set(words1).union(set(words2)))
-
-        # 构建词袋向量
-        vector1 = [words1.count(word) for word in vocabulary]
-        vector2 = [words2.count(word) for word in vocabulary]
+        threshold = Config.THERAPY_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        try:
+            recommendation = await memory_manager.recommend_therapy(basic_info, available_therapists)
+            recommendation["refined"] = False
 
-        # 计算向量的点积
-        dot_product = sum(a * b for a, b in zip(vector1, vector2))
+            if recommendation["confidence"] < threshold and refine_limit > 0:
+                current_vector = feature_vector or VectorUtils.create_student_feature_vector(basic_info, portrait)
+                cases = await TherapistSelector._find_similar_cases(
+                    memory_manager, current_vector, available_therapists, limit=refine_limit
+                )
+                if cases:
+                    estimates = blend_cases(recommendation["estimates"], cases)
+                    best_type, confidence = rank_estimates(estimates)
+                    best_type = best_type or recommendation["therapy_type"]
+                    recommendation = {
+                        "therapy_type": best_type,
+                        "expected_improvement": estimates[best_type]["expected_improvement"],
+                        "confidence": confidence,
+                        "refined": True,
+                        "estimates": estimates,
+                    }
+
+            logger.info(
+                f"治疗效果模型推荐: {recommendation['therapy_type']} "
+                f"(期望改善 {recommendation['expected_improvement']:.2f}, 置信度 {recommendation['confidence']:.2f}, "
+                f"{'已' if recommendation['refined'] else '未'}用相似案例修正)"
+            )
+            return recommendation
 
-        # 计算向量的范数
-        magnitude1 = sum(a * a for a in vector1) ** 0.5
-        magnitude2 = sum(b * b for b in vector2) ** 0.5
+        except Exception as e:
+            logger.error(f"推荐治疗师流派时出错: {str(e)}")
+            return {
+                "therapy_type": available_therapists[0],
+                "expected_improvement": 0.0,
+                "confidence": 0.0,
+                "refined": False,
+                "estimates": {},
+            }
 
-        # 避免除以零
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
+    @staticmethod
+    async def _find_similar_cases(
+            memory_manager: MemoryManager,
+            current_vector: Dict[str, Any],
+            available_therapists: List[str],
+            limit: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        查找相似的历史案例并计算每个案例的综合得分（检索相似度 × 改善分数）
 
-        # 计算余弦相似度
-        similarity = dot_product / (magnitude1 * magnitude2)
+        Args:
+            memory_manager: 记忆管理器
+            current_vector: 当前学生的特征向量数据
+            available_therapists: 可用的治疗师流派列表
+            limit: 相似案例数量
 
-        return similarity
\ No newline at end of file
+        Returns:
+            List[Dict[str, Any]]: 案例列表，包含 therapy_type、record_id、similarity、improvement_score、combined_score
+        """
+        # 2. 查找相似的历史案例，复用已有向量，只取ID和检索相似度
+        similar_vectors = await memory_manager.find_similar_vectors(
+            current_vector["feature_text"], limit=limit, include=["id", "similarity"],
+            query_vector=current_vector.get("feature_vector")
+        )
+
+        if not similar_vectors:
+            logger.warning("未找到相似的历史案例")
+            return []
+
+        # 3. 批量点查相似向量对应的病历ID，再一次性读取病历中需要的字段
+        vector_index = await memory_manager.get_vector_index_entries(
+            [vector.get("id") for vector in similar_vectors if vector.get("id")]
+        )
+        record_ids = list(dict.fromkeys(
+            vector_index[vector["id"]]["record_id"]
+            for vector in similar_vectors
+            if vector.get("id") in vector_index and vector_index[vector["id"]].get("record_id")
+        ))
+        medical_records = {
+            record["id"]: record
+            for record in await memory_manager.get_medical_records(
+                record_ids, fields=["therapyType", "totalImprovementScore"]
+            )
+        }
+
+        # 4. 计算每个案例的综合得分
+        case_scores = []
+
+        for vector in similar_vectors:
+            vector_id = vector.get("id")
+            if not vector_id or vector_id not in vector_index:
+                continue
+
+            # 获取关联的病历
+            record_id = vector_index[vector_id].get("record_id")
+            medical_record = medical_records.get(record_id)
+            if not medical_record:
+                continue
+
+            # 获取治疗师流派和改善分数
+            therapy_type = medical_record.get("therapyType")
+
+            # 必须确保治疗师流派在可用列表中
+            if therapy_type not in available_therapists:
+                continue
+
+            # 获取治疗效果分数
+            try:
+                improvement_score = float(medical_record.get("totalImprovementScore", 0))
+            except (TypeError, ValueError):
+                continue
+
+            # 如果改善分数不是正数，跳过(量表分数变高说明效果不好)
+            # if improvement_score <= 0:
+            #     continue
+
+            # 直接使用检索返回的相似度（与检索排序使用同一度量）
+            similarity = vector.get("similarity", 0.0)
+
+            # 计算综合得分
+            combined_score = similarity * improvement_score
+
+            # 记录该案例信息
+            case_scores.append({
+                "therapy_type": therapy_type,
+                "record_id": record_id,
+                "similarity": similarity,
+                "improvement_score": improvement_score,
+                "combined_score": combined_score
+            })
+
+        return case_scores
@@ -1,6 +1,7 @@
 # src/utils/vector_utils.py
 import json
 from typing import Dict, Any, List, Optional
+import uuid
 import hashlib
 from datetime import datetime
 import numpy as np
@@ -52,6 +53,83 @@ class VectorUtils:
         # 拼接成文本
         return " ".join(features)
 
+    @staticmethod
+    def feature_version(feature_text: str) -> str:
+        """
+        特征文本的版本号（内容哈希），画像中参与特征提取的部分不变时版本号不变
+
+        Args:
+            feature_text: 特征文本
+
+        Returns:
+            str: 8位十六进制哈希
+        """
+        return hashlib.md5(feature_text.encode()).hexdigest()[:8]
+
+    @staticmethod
+    def new_vector_id(content_hash: str, timestamp: float) -> str:
+        """
+        生成学生特征向量ID，同一画像版本在同一秒内多次生成也不会重复
+
+        Args:
+            content_hash: 特征文本的版本号
+            timestamp: 创建时间戳
+
+        Returns:
+            str: 向量ID
+        """
+        return f"student_vector_{int(timestamp)}_{content_hash}_{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def for_new_record(vector_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        为新病历生成向量数据：复用已计算的特征向量，但使用新的向量ID和创建时间，
+        避免同一缓存向量关联多份病历时覆盖已有的向量索引条目
+
+        Args:
+            vector_data: get_student_feature_vector 返回的向量数据
+
+        Returns:
+            Dict[str, Any]: 新的向量数据副本
+        """
+        timestamp = datetime.now().timestamp()
+        metadata = dict(vector_data.get("metadata", {}))
+        metadata["created_at"] = timestamp
+        return {
+            **vector_data,
+            "id": VectorUtils.new_vector_id(metadata.get("feature_version", ""), timestamp),
+            "metadata": metadata,
+        }
+
+    @staticmethod
+    def get_student_feature_vector(state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        获取当前学生的特征向量，按 (学生ID, 画像版本) 缓存在状态的 student_feature_vector 中，
+        同一版本只调用一次向量化服务，供咨询师选择、相似案例检索和病历创建复用
+
+        Args:
+            state: 运行时状态（读取 current_student_basic_info 和 psychological_portraits）
+
+        Returns:
+            Dict[str, Any]: 与 create_student_feature_vector 相同结构的向量数据
+        """
+        basic_info = state.get("current_student_basic_info", {})
+        portrait = state.get("psychological_portraits", {})
+        student_id = basic_info.get("id", "unknown")
+        version = VectorUtils.feature_version(VectorUtils.extract_features_to_text(basic_info, portrait))
+
+        cached = state.get("student_feature_vector")
+        if cached:
+            cached_metadata = cached.get("metadata", {})
+            if (cached_metadata.get("student_id") == student_id
+                    and cached_metadata.get("feature_version") == version
+                    and cached.get("feature_vector") is not None):
+                return cached
+
+        vector_data = VectorUtils.create_student_feature_vector(basic_info, portrait)
+        state["student_feature_vector"] = vector_data
+        return vector_data
+
     @staticmethod
     def create_student_feature_vector(basic_info: Dict[str, Any], portrait: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -70,8 +148,8 @@ class VectorUtils:
 
             # 生成向量ID（基于特征文本的哈希）
             timestamp = datetime.now().timestamp()
-            content_hash = hashlib.md5(feature_text.encode()).hexdigest()[:8]
-            vector_id = f"student_vector_{int(timestamp)}_{content_hash}"
+            content_hash = VectorUtils.feature_version(feature_text)
+            vector_id = VectorUtils.new_vector_id(content_hash, timestamp)
 
             # 使用统一的向量化服务获取向量
             from src.utils.embedding_service import get_text_embedding
@@ -85,7 +163,8 @@ class VectorUtils:
                 "feature_vector": feature_vector,  # 可能为None，存储时需要处理
                 "metadata": {
                     "student_id": basic_info.get("id", "unknown"),
-                    "created_at": timestamp
+                    "created_at": timestamp,
+                    "feature_version": content_hash
                 }
             }
 
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# 让测试可以按 src.* / app.* 导入项目模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
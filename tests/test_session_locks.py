@@ -0,0 +1,164 @@
+# tests/test_session_locks.py
+import asyncio
+
+import pytest
+
+from app.business_logic.services.session_locks import SessionLockManager
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_same_session_is_serialised():
+    async def scenario():
+        locks = SessionLockManager()
+        active = 0
+        max_active = 0
+
+        async def process():
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return "ok"
+
+        results = await asyncio.gather(*(locks.run("s1", ("message", i), process) for i in range(5)))
+        assert results == ["ok"] * 5
+        assert max_active == 1
+
+    run(scenario())
+
+
+def test_other_sessions_are_not_blocked():
+    async def scenario():
+        locks = SessionLockManager()
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "slow"
+
+        async def fast():
+            return "fast"
+
+        slow_task = asyncio.create_task(locks.run("s1", "a", slow))
+        await asyncio.sleep(0)
+        assert await asyncio.wait_for(locks.run("s2", "a", fast), timeout=1) == "fast"
+        assert not slow_task.done()
+        release.set()
+        assert await slow_task == "slow"
+
+    run(scenario())
+
+
+def test_identical_requests_are_coalesced():
+    async def scenario():
+        locks = SessionLockManager()
+        calls = 0
+
+        async def process():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        key = ("message", "user1", "你好")
+        results = await asyncio.gather(*(locks.run("s1", key, process) for _ in range(3)))
+        assert results == [1, 1, 1]
+        assert calls == 1
+
+        # 不同内容的请求各自处理
+        other = await locks.run("s1", ("message", "user1", "再见"), process)
+        assert other == 2
+
+    run(scenario())
+
+
+def test_errors_propagate_to_coalesced_requests():
+    async def scenario():
+        locks = SessionLockManager()
+
+        async def process():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(locks.run("s1", "k", process) for _ in range(2)),
+                                       return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert results[0] is results[1]
+
+    run(scenario())
+
+
+def test_cancelled_first_request_is_retried_by_waiter():
+    async def scenario():
+        locks = SessionLockManager()
+        started = asyncio.Event()
+        calls = 0
+
+        async def process():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                started.set()
+                await asyncio.sleep(10)
+            return "done"
+
+        first = asyncio.create_task(locks.run("s1", "k", process))
+        await started.wait()
+        duplicate = asyncio.create_task(locks.run("s1", "k", process))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await asyncio.wait_for(duplicate, timeout=1) == "done"
+        assert calls == 2
+
+    run(scenario())
+
+
+def test_cancelled_duplicate_does_not_affect_first_request():
+    async def scenario():
+        locks = SessionLockManager()
+        release = asyncio.Event()
+
+        async def process():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(locks.run("s1", "k", process))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(locks.run("s1", "k", process))
+        await asyncio.sleep(0)
+
+        duplicate.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await duplicate
+        release.set()
+        assert await first == "done"
+
+    run(scenario())
+
+
+def test_state_is_cleaned_up():
+    async def scenario():
+        locks = SessionLockManager()
+
+        async def ok():
+            return 1
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        await asyncio.gather(locks.run("s1", "a", ok), locks.run("s2", "a", ok))
+        with pytest.raises(RuntimeError):
+            await locks.run("s1", "b", fail)
+
+        assert locks._locks == {}
+        assert locks._waiters == {}
+        assert locks._in_flight == {}
+
+    run(scenario())
@@ -0,0 +1,80 @@
+# tests/test_vector_matrix_store.py
+import numpy as np
+import pytest
+
+from src.memory.vector_matrix_store import VectorMatrix
+
+
+DIM = 4
+
+
+def _vector(seed: int):
+    return np.random.default_rng(seed).random(DIM).tolist()
+
+
+@pytest.fixture
+def matrix(tmp_path):
+    matrix = VectorMatrix(tmp_path, "skills")
+    matrix.put_many([(f"doc{i}", _vector(i)) for i in range(3)])
+    return matrix
+
+
+def test_reload_keeps_committed_rows(tmp_path, matrix):
+    reloaded = VectorMatrix(tmp_path, "skills")
+    assert reloaded.ids() == ["doc0", "doc1", "doc2"]
+    assert reloaded.get("doc1") == pytest.approx(_vector(1))
+
+
+def test_load_truncates_uncommitted_matrix_rows(tmp_path, matrix):
+    # 矩阵已写入但ID还没提交时中断
+    with open(matrix.matrix_path, "ab") as f:
+        f.write(np.asarray(_vector(99), dtype=np.float32).tobytes())
+
+    reloaded = VectorMatrix(tmp_path, "skills")
+    assert len(reloaded._row_ids) == 3
+    assert reloaded.matrix_path.stat().st_size == 3 * DIM * 4
+
+    # 下一次追加写在第3行，而不是未提交行之后
+    reloaded.put("doc3", _vector(3))
+    assert VectorMatrix(tmp_path, "skills").get("doc3") == pytest.approx(_vector(3))
+
+
+def test_load_drops_partial_id_line(tmp_path, matrix):
+    with open(matrix.ids_path, "a", encoding="utf-8") as f:
+        f.write("doc3")
+
+    reloaded = VectorMatrix(tmp_path, "skills")
+    assert reloaded.ids() == ["doc0", "doc1", "doc2"]
+    assert matrix.ids_path.read_text(encoding="utf-8") == "doc0\ndoc1\ndoc2\n"
+
+
+def test_load_truncates_ids_without_matrix_rows(tmp_path, matrix):
+    # ID文件比矩阵多一行（矩阵被截断）时以矩阵为准
+    with open(matrix.matrix_path, "r+b") as f:
+        f.truncate(2 * DIM * 4)
+
+    reloaded = VectorMatrix(tmp_path, "skills")
+    assert reloaded.ids() == ["doc0", "doc1"]
+    assert "doc2" not in reloaded
+    assert matrix.ids_path.read_text(encoding="utf-8") == "doc0\ndoc1\n"
+
+
+def test_open_shares_instance_per_file(tmp_path):
+    assert VectorMatrix.open(tmp_path, "skills") is VectorMatrix.open(tmp_path, "skills")
+    assert VectorMatrix.open(tmp_path, "skills") is not VectorMatrix.open(tmp_path, "records")
+
+
+def test_search_limits(matrix):
+    assert matrix.search(_vector(1), limit=0) == []
+    assert matrix.search(_vector(1), limit=-1) == []
+
+    results = matrix.search(_vector(1), limit=10)
+    assert len(results) == 3
+    assert results[0][0] == "doc1"
+
+
+def test_search_skips_removed_rows(matrix):
+    matrix.remove("doc1")
+    results = matrix.search(_vector(1), limit=10)
+    assert [doc_id for doc_id, _ in results if doc_id == "doc1"] == []
+    assert len(results) == 2
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# tools/benchmark_therapist_selection.py
+"""
+治疗师选择基准测试
+在合成病历上比较基于相似案例检索的选择器（select_best_therapist）
+与基于治疗效果模型的推荐（recommend_therapist）的延迟和选择准确率
+"""
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import shutil
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.memory.memory_manager import MemoryManager
+from src.utils.therapist_selector import TherapistSelector
+from src.utils.logger import logger
+
+THERAPY_TYPES = ["cbt", "psychodynamic"]
+
+# 合成学生的基本信息取值
+FEATURE_VALUES = {
+    "grade": ["大一", "大二", "大三", "大四", "研一", "研二"],
+    "gender": ["男", "女"],
+    "university_type": ["985", "211", "普通本科", "专科"],
+    "major": ["理工", "文史", "医学", "艺术", "经管"],
+}
+
+
+class SyntheticPopulation:
+    """合成学生群体：每个特征取值对各治疗流派有固定的效果偏移，嵌入由特征取值的随机方向叠加噪声得到"""
+
+    def __init__(self, dim: int, seed: int = 42):
+        self.rng = np.random.default_rng(seed)
+        self.dim = dim
+        self.effects = {
+            (key, value, therapy_type): float(self.rng.normal(0, 2))
+            for key, values in FEATURE_VALUES.items() for value in values for therapy_type in THERAPY_TYPES
+        }
+        self.directions = {
+            (key, value): self._unit(self.rng.standard_normal(dim))
+            for key, values in FEATURE_VALUES.items() for value in values
+        }
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        return vector / np.linalg.norm(vector)
+
+    def student(self, index: int) -> Dict[str, Any]:
+        info = {"id": f"stu{index:06d}"}
+        for key, values in FEATURE_VALUES.items():
+            info[key] = values[self.rng.integers(len(values))]
+        return info
+
+    def expected(self, basic_info: Dict[str, Any], therapy_type: str) -> float:
+        return sum(self.effects[(key, basic_info[key], therapy_type)] for key in FEATURE_VALUES)
+
+    def best_therapy(self, basic_info: Dict[str, Any]) -> str:
+        return max(THERAPY_TYPES, key=lambda therapy_type: self.expected(basic_info, therapy_type))
+
+    def embedding(self, basic_info: Dict[str, Any]) -> List[float]:
+        vector = sum(self.directions[(key, basic_info[key])] for key in FEATURE_VALUES)
+        vector = vector + 0.5 * self.rng.standard_normal(self.dim)
+        return self._unit(vector).astype(np.float32).tolist()
+
+    def feature_text(self, basic_info: Dict[str, Any]) -> str:
+        return " ".join(f"{key}:{value}" for key, value in basic_info.items())
+
+
+async def populate(manager: MemoryManager, population: SyntheticPopulation, size: int) -> float:
+    """
+    批量写入合成病历和学生特征向量
+
+    Returns:
+        float: 治疗效果模型单条增量更新的平均耗时（毫秒）
+    """
+    records, vectors, index_entries = [], [], []
+    for i in range(size):
+        basic_info = population.student(i)
+        therapy_type = THERAPY_TYPES[i % len(THERAPY_TYPES)]
+        score = population.expected(basic_info, therapy_type) + float(population.rng.normal(0, 3))
+        record_id = f"record_{basic_info['id']}"
+        records.append({
+            "id": record_id,
+            "student_id": basic_info["id"],
+            "basic_info": basic_info,
+            "therapyType": therapy_type,
+            "totalImprovementScore": round(score, 2),
+            "createdAt": float(i),
+        })
+        vector_id = f"student_vector_{basic_info['id']}"
+        vectors.append({
+            "id": vector_id,
+            "feature_text": population.feature_text(basic_info),
+            "feature_vector": population.embedding(basic_info),
+        })
+        index_entries.append((vector_id, basic_info["id"], record_id, float(i)))
+
+    await manager.vector_store.upsert_documents(
+        "medical_records", [r["id"] for r in records], records,
+        [{"student_id": r["student_id"], "type": "medical_record"} for r in records]
+    )
+    await manager.vector_store.upsert_documents(
+        "student_vectors", [v["id"] for v in vectors], vectors,
+        [{"type": "student_vector"} for _ in vectors]
+    )
+    manager.vector_index.put_many(index_entries)
+
+    # 模型逐条增量更新，与 create_medical_record 中的写入方式一致
+    start = time.perf_counter()
+    for record in records:
+        manager.outcome_model.upsert([record])
+    return (time.perf_counter() - start) * 1000 / size
+
+
+async def measure(name: str, select, queries: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                  population: SyntheticPopulation) -> Dict[str, Any]:
+    """对一种选择方式计时并统计与真实最优流派一致的比例"""
+    latencies, correct = [], 0
+    for basic_info, feature_vector in queries:
+        start = time.perf_counter()
+        therapy_type = await select(basic_info, feature_vector)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += therapy_type == population.best_therapy(basic_info)
+    return {
+        "method": name,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "accuracy": correct / len(queries),
+    }
+
+
+async def benchmark_size(size: int, dim: int, query_count: int, backend: str) -> List[Dict[str, Any]]:
+    """在给定规模下测试三种选择方式"""
+    directory = tempfile.mkdtemp(prefix="bench_therapist_")
+    try:
+        from src.utils.config import Config
+        Config.MEMORY_VECTOR_BACKEND = backend
+        manager = MemoryManager(base_dir=directory)
+        await manager.vector_store.init_collections()
+
+        population = SyntheticPopulation(dim)
+        update_ms = await populate(manager, population, size)
+
+        queries = []
+        for i in range(query_count):
+            basic_info = population.student(size + i)
+            queries.append((basic_info, {
+                "feature_text": population.feature_text(basic_info),
+                "feature_vector": population.embedding(basic_info),
+            }))
+
+        async def knn(basic_info, feature_vector):
+            therapy_type, _ = await TherapistSelector.select_best_therapist(
+                manager, basic_info, {}, THERAPY_TYPES, feature_vector)
+            return therapy_type
+
+        async def model(basic_info, feature_vector):
+            result = await TherapistSelector.recommend_therapist(
+                manager, basic_info, {}, THERAPY_TYPES, feature_vector, refine_limit=0)
+            return result["therapy_type"]
+
+        async def model_refined(basic_info, feature_vector):
+            result = await TherapistSelector.recommend_therapist(
+                manager, basic_info, {}, THERAPY_TYPES, feature_vector, min_confidence=1.01)
+            return result["therapy_type"]
+
+        # 预热（NumPy后端首次检索时加载矩阵）
+        await knn(*queries[0])
+
+        results = []
+        for name, select in [("knn", knn), ("model", model), ("model+knn", model_refined)]:
+            result = await measure(name, select, queries, population)
+            result.update(size=size, update_ms=update_ms)
+            results.append(result)
+
+        await manager.vector_store.cleanup()
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="治疗师选择基准测试")
+    parser.add_argument("--sizes", default="1000,10000", help="病历数量，逗号分隔")
+    parser.add_argument("--dim", type=int, default=1024, help="向量维度（bge-m3为1024）")
+    parser.add_argument("--queries", type=int, default=100, help="选择次数")
+    parser.add_argument("--backend", default="numpy", help="向量存储后端（chroma或numpy）")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        logger.info(f"测试规模 {size}")
+        # 选择过程中的逐次日志会干扰计时
+        logger.setLevel(logging.WARNING)
+        try:
+            results.extend(await benchmark_size(size, args.dim, args.queries, args.backend))
+        finally:
+            logger.setLevel(logging.INFO)
+
+    print(f"{'方式':<12}{'规模':>10}{'p50(ms)':>12}{'p95(ms)':>12}{'准确率':>10}{'模型更新(ms/条)':>18}")
+    for r in results:
+        print(f"{r['method']:<12}{r['size']:>10}{r['p50_ms']:>12.2f}{r['p95_ms']:>12.2f}"
+              f"{r['accuracy']:>10.2f}{r['update_ms']:>18.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
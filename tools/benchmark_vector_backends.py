@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# tools/benchmark_vector_backends.py
+"""
+向量存储后端基准测试
+比较ChromaDB与NumPy后端在不同集合规模下的写入和检索耗时
+"""
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import shutil
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.memory.long_term_store import create_long_term_store
+from src.memory.numpy_vector_store import NumpyVectorStore
+from src.utils.logger import logger
+
+COLLECTION = "profiler_skills"
+
+
+async def benchmark_backend(backend: str, vectors: np.ndarray, queries: np.ndarray,
+                            limit: int, batch_queries: int) -> Dict[str, Any]:
+    """
+    对单个后端执行一轮基准测试
+
+    Args:
+        backend: 后端名称（chroma、numpy或numpy-ivf）
+        vectors: 要写入的向量
+        queries: 查询向量
+        limit: 每次检索返回数量
+        batch_queries: 批量检索时每批的查询数量
+
+    Returns:
+        Dict[str, Any]: 测试结果
+    """
+    directory = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        if backend == "numpy-ivf":
+            # 规模足够时总是启用IVF索引
+            store = NumpyVectorStore(directory, ivf_threshold=1000)
+        else:
+            store = create_long_term_store(directory, backend=backend)
+        await store.init_collections()
+
+        ids = [f"skill_{i}" for i in range(len(vectors))]
+        contents = [{"id": doc_id, "content": f"技能 {i}", "skill_vector": vectors[i].tolist()}
+                    for i, doc_id in enumerate(ids)]
+        metadatas = [{"agent_type": "profiler"}] * len(ids)
+
+        start = time.perf_counter()
+        await store.upsert_documents(COLLECTION, ids, contents, metadatas)
+        insert_s = time.perf_counter() - start
+
+        # 预热（NumPy后端首次检索时加载矩阵，必要时建立IVF索引）
+        await store.search_documents(COLLECTION, queries[0].tolist(), limit=limit, include=["id", "similarity"])
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            await store.search_documents(COLLECTION, query.tolist(), limit=limit, include=["id", "similarity"])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for offset in range(0, len(queries), batch_queries):
+            await store.search_documents_batch(COLLECTION, queries[offset:offset + batch_queries].tolist(),
+                                               limit=limit, include=["id", "similarity"])
+        batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        # 以精确暴力检索的结果计算召回率
+        hits = 0
+        for query in queries[:20]:
+            expected = set(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:limit])
+            results = await store.search_documents(COLLECTION, query.tolist(), limit=limit, include=["id"])
+            hits += len(expected & {int(doc["id"].split("_")[1]) for doc in results})
+        recall = hits / (limit * min(20, len(queries)))
+
+        await store.cleanup()
+        return {
+            "backend": backend,
+            "size": len(vectors),
+            "insert_s": insert_s,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "batch_ms_per_query": batch_ms,
+            "recall": recall,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="向量存储后端基准测试")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="集合规模，逗号分隔")
+    parser.add_argument("--dim", type=int, default=1024, help="向量维度（bge-m3为1024）")
+    parser.add_argument("--queries", type=int, default=100, help="检索次数")
+    parser.add_argument("--limit", type=int, default=5, help="每次检索返回数量")
+    parser.add_argument("--batch", type=int, default=32, help="批量检索时每批的查询数量")
+    parser.add_argument("--backends", default="chroma,numpy,numpy-ivf", help="要测试的后端，逗号分隔")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    results: List[Dict[str, Any]] = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        # bge-m3返回的是单位向量，这里同样归一化，使两种后端的l2/余弦排序一致
+        vectors = rng.standard_normal((size, args.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        for backend in args.backends.split(","):
+            logger.info(f"测试后端 {backend}，规模 {size}")
+            results.append(await benchmark_backend(backend, vectors, queries, args.limit, args.batch))
+
+    print(f"{'后端':<10}{'规模':>10}{'写入(s)':>12}{'p50(ms)':>12}{'p95(ms)':>12}{'批量(ms/次)':>14}{'召回率':>10}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['size']:>10}{r['insert_s']:>12.2f}{r['p50_ms']:>12.2f}"
+              f"{r['p95_ms']:>12.2f}{r['batch_ms_per_query']:>14.2f}{r['recall']:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,8 +17,11 @@ import shutil
 # 添加项目根目录到路径
 sys.path.append(str(Path(__file__).parent.parent))
 
+# 需要在导入其他项目模块之前导入，才能统计它们的导入耗时
+from src.utils.startup_profiler import profiler, PROFILE_FLAG
 from src.memory.memory_manager import MemoryManager
 from src.memory.system_initializer import MemorySystemInitializer
+from src.memory.sync_manifest import diff_manifests
 from src.utils.logger import logger
 
 
@@ -32,7 +35,8 @@ class MemorySystemTool:
 
     async def initialize(self):
         """初始化记忆管理器"""
-        self.memory_manager = await MemorySystemInitializer.initialize_memory_system()
+        with profiler.phase("initialize_memory_system"):
+            self.memory_manager = await MemorySystemInitializer.initialize_memory_system()
         # 获取所有治疗师流派
         self.therapy_types = self._get_therapist_types()
         logger.info(f"记忆系统初始化完成")
@@ -47,32 +51,7 @@ class MemorySystemTool:
         Returns:
             List[str]: 治疗师流派列表
         """
-        # 默认流派
-        therapy_types = ["cbt", "psychodynamic"]
-
-        try:
-            # 尝试从配置文件加载治疗师流派
-            base_dir = Path(__file__).parent.parent
-            config_path = os.path.join(base_dir, "src", "therapists_config.json")
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
-                # 提取所有流派ID
-                therapist_types = [
-                    therapist.get("id")
-                    for therapist in config_data.get("therapists", [])
-                    if therapist.get("id")
-                ]
-
-                if therapist_types:
-                    therapy_types = therapist_types
-
-        except Exception as e:
-            logger.info(f"加载治疗师配置失败: {str(e)}，将使用默认流派")
-
-        return therapy_types
+        return list(self.memory_manager.therapy_types) or ["cbt", "psychodynamic"]
 
     async def import_test(self):
         """测试从JSON导入到向量数据库"""
@@ -93,7 +72,7 @@ class MemorySystemTool:
             logger.info(f"\n正在处理集合: {collection_name}")
 
             # 获取JSON文件中的记录
-            json_docs = json_store.get_all_documents(collection_name)
+            json_docs = json_store.get_all_documents(collection_name, with_vectors=True)
             logger.info(f"JSON中找到 {len(json_docs)} 条记录")
 
             if json_docs:
@@ -154,7 +133,7 @@ class MemorySystemTool:
     async def _list_specific_skills(self, agent_type: str, therapy_type: Optional[str] = None):
         """列出特定类型的技能记忆"""
         logger.info(f"\n=== {agent_type}{' ' + therapy_type if therapy_type else ''} 技能记忆 ===")
-        skills = await self.memory_manager.get_skill_memory(agent_type, therapy_type)
+        skills = await self.memory_manager.get_skill_memory(agent_type, therapy_type, limit=1000)
         if not skills:
             logger.info("未找到技能记忆")
             return
@@ -182,9 +161,8 @@ class MemorySystemTool:
             records = await self.memory_manager.get_student_medical_records(student_id)
         else:
             logger.info("\n=== 所有医疗记录 ===")
-            # 这里需要实现获取所有记录的方法
-            records = await self.memory_manager.vector_store.search_documents(
-                "medical_records", query="", filter_dict=None, limit=100)
+            page = await self.memory_manager.query_medical_records(page_size=100)
+            records = page["records"]
 
         if not records:
             logger.info("未找到医疗记录")
@@ -216,29 +194,11 @@ class MemorySystemTool:
 
         logger.info("\n=== 学生特征向量 ===")
 
-        # 获取向量索引
-        index_path = Path(self.memory_manager.json_store.base_dir).joinpath("vector_index.json")
-        if not index_path.exists():
-            logger.info("向量索引文件不存在")
-            return
-
-        try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-        except Exception as e:
-            logger.info(f"读取向量索引失败: {str(e)}")
-            return
-
-        if not index_data:
-            logger.info("向量索引为空")
-            return
-
-        # 过滤学生ID（如果指定）
+        # 获取向量索引（指定学生时按索引查询）
+        filtered_index = await self.memory_manager.get_vector_index(student_id)
         if student_id:
-            filtered_index = {k: v for k, v in index_data.items() if v.get("student_id") == student_id}
             logger.info(f"学生 {student_id} 的特征向量:")
         else:
-            filtered_index = index_data
             logger.info(f"所有学生特征向量:")
 
         if not filtered_index:
@@ -290,8 +250,56 @@ class MemorySystemTool:
 
         # 添加技能
         await self.memory_manager.update_skill_memory(agent_type, skill_data, therapy_type)
+        await self.memory_manager.flush_pending_writes()
         logger.info(f"成功添加技能: {skill_id}")
 
+    async def consolidate_skills(self, agent_type: Optional[str] = None, therapy_type: Optional[str] = None):
+        """合并近似重复的技能记忆并按容量淘汰"""
+        if not self.memory_manager:
+            await self.initialize()
+
+        collection_name = None
+        if agent_type == "profiler":
+            collection_name = "profiler_skills"
+        elif agent_type == "therapist" and therapy_type:
+            collection_name = f"therapist_{therapy_type}_skills"
+
+        results = await self.memory_manager.consolidate_skills(collection_name)
+        for name, result in results.items():
+            if result is None:
+                logger.info(f"{name}: 整理失败")
+                continue
+            logger.info(f"{name}: 合并 {result['merged']} 条，淘汰 {result['evicted']} 条，剩余 {result['remaining']} 条")
+        await self.memory_manager.persist_memories()
+
+    async def manage_snapshot(self, action: str, session_id: str, name: Optional[str] = None):
+        """创建、恢复、列出或删除技能记忆快照"""
+        if not self.memory_manager:
+            await self.initialize()
+
+        if action == "list":
+            snapshots = await self.memory_manager.list_memory_snapshots(session_id)
+            logger.info(f"找到 {len(snapshots)} 个快照:")
+            for snapshot in snapshots:
+                created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot["created_at"]))
+                logger.info(f"{snapshot['session_id']}/{snapshot['name']} ({created}): {snapshot['collections']}")
+            return
+
+        if not name:
+            logger.error("需要提供快照名称 --name")
+            return
+
+        if action == "create":
+            await self.memory_manager.create_memory_snapshot(session_id, name)
+        elif action == "restore":
+            await self.memory_manager.restore_memory_snapshot(session_id, name)
+            await self.memory_manager.persist_memories()
+        elif action == "delete":
+            if await self.memory_manager.delete_memory_snapshot(session_id, name):
+                logger.info(f"已删除快照 {session_id}/{name}")
+            else:
+                logger.warning(f"快照不存在: {session_id}/{name}")
+
     async def sync_json_vector(self):
         """同步JSON和向量数据库"""
         if not self.memory_manager:
@@ -299,9 +307,8 @@ class MemorySystemTool:
 
         logger.info("\n执行完整同步...")
 
-        # 使用初始化器执行完整同步
-        initializer = MemorySystemInitializer()
-        memory_manager = await initializer.initialize_memory_system()
+        # 使用初始化器执行完整同步（校验向量数据库中实际存在的文档）
+        await self.memory_manager.initializer.initialize(verify=True)
 
         logger.info("同步完成")
 
@@ -344,30 +351,39 @@ class MemorySystemTool:
                 for therapy_type in self.therapy_types:
                     collections.append(f"therapist_{therapy_type}_skills")
 
+                # 集合默认在首次使用时才打开，验证前打开全部默认集合
+                await vector_store.init_collections()
+
                 logger.info(f"检查 {len(collections)} 个集合:")
                 for collection_name in collections:
                     try:
-                        # 尝试获取集合并计数
-                        if collection_name in vector_store._collections:
-                            count = len(vector_store._collections[collection_name].get()["ids"])
-                            logger.info(f"  - {collection_name}: {count} 条记录")
-                        else:
+                        if not vector_store.has_collection(collection_name):
                             logger.info(f"  - {collection_name}: 集合不存在")
+                            continue
+
+                        # 只获取文档ID，并与两侧的同步清单比较
+                        vector_doc_ids = await vector_store.get_document_ids(collection_name)
+                        vector_manifest = await vector_store.get_manifest(collection_name, live_ids=vector_doc_ids)
+                        json_manifest = json_store.get_manifest(collection_name)
+                        diff = diff_manifests(json_manifest, vector_manifest)
+
+                        logger.info(
+                            f"  - {collection_name}: 向量库 {len(vector_doc_ids)} 条记录，JSON {len(json_manifest)} 条记录，"
+                            f"缺失 {len(diff['missing'])}，已变化 {len(diff['changed'])}，仅存在于向量库 {len(diff['orphaned'])}"
+                        )
+                        if json_manifest:
+                            latest = max(entry[1] for entry in json_manifest.values())
+                            logger.info(f"    最近更新: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(latest))}")
                     except Exception as e:
                         logger.info(f"  - {collection_name}: 访问错误 - {str(e)}")
 
-        # 检查向量索引文件
-        index_path = Path(json_store.base_dir).joinpath("vector_index.json")
-        logger.info(f"\n向量索引文件: {index_path}")
-        if not index_path.exists():
-            logger.info("警告: 向量索引文件不存在")
-        else:
-            try:
-                with open(index_path, 'r', encoding='utf-8') as f:
-                    index_data = json.load(f)
-                logger.info(f"向量索引包含 {len(index_data)} 条记录")
-            except Exception as e:
-                logger.info(f"读取向量索引失败: {str(e)}")
+        # 检查向量索引
+        vector_index = self.memory_manager.vector_index
+        logger.info(f"\n向量索引数据库: {vector_index.path}")
+        try:
+            logger.info(f"向量索引包含 {vector_index.count()} 条记录")
+        except Exception as e:
+            logger.info(f"读取向量索引失败: {str(e)}")
 
         logger.info("\n记忆系统验证完成")
 
@@ -392,6 +408,7 @@ class MemorySystemTool:
 
         # 关闭现有连接
         await self.memory_manager.vector_store.cleanup()
+        vector_index = self.memory_manager.vector_index
         self.memory_manager = None
 
         try:
@@ -407,13 +424,9 @@ class MemorySystemTool:
             # 重新创建目录
             os.makedirs(vector_dir, exist_ok=True)
 
-            # 重置向量索引文件
-            json_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "json-memories")
-            index_path = json_dir / "vector_index.json"
-            if index_path.exists():
-                logger.info(f"重置向量索引文件: {index_path}")
-                with open(index_path, 'w', encoding='utf-8') as f:
-                    json.dump({}, f, ensure_ascii=False, indent=2)
+            # 清空向量索引，重建时会从病历重新生成学生特征向量
+            logger.info(f"重置向量索引: {vector_index.path}")
+            vector_index.clear()
 
             logger.info("向量数据库已重置")
 
@@ -429,6 +442,7 @@ class MemorySystemTool:
 async def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="记忆系统管理工具")
+    parser.add_argument(PROFILE_FLAG, action="store_true", help="输出各模块导入耗时和各初始化阶段耗时")
 
     # 子命令
     subparsers = parser.add_subparsers(dest="command", help="命令")
@@ -452,6 +466,17 @@ async def main():
     add_skill_parser.add_argument("--therapy_type", help="疗法类型（仅当agent_type为therapist时使用）")
     add_skill_parser.add_argument("--content", required=True, help="技能内容")
 
+    # 整理技能
+    consolidate_parser = subparsers.add_parser("consolidate-skills", help="合并近似重复的技能记忆并按容量淘汰")
+    consolidate_parser.add_argument("--agent_type", choices=["profiler", "therapist"], help="智能体类型（不提供则整理所有技能集合）")
+    consolidate_parser.add_argument("--therapy_type", help="疗法类型（仅当agent_type为therapist时使用）")
+
+    # 技能记忆快照
+    snapshot_parser = subparsers.add_parser("snapshot", help="创建、恢复、列出或删除技能记忆快照")
+    snapshot_parser.add_argument("action", choices=["create", "restore", "list", "delete"], help="操作")
+    snapshot_parser.add_argument("--session_id", default="default", help="会话ID（实验名称）")
+    snapshot_parser.add_argument("--name", help="快照名称（list时不需要）")
+
     # 同步
     subparsers.add_parser("sync", help="同步JSON和向量数据库")
 
@@ -472,6 +497,15 @@ async def main():
     args = parser.parse_args()
 
     # 执行命令
+    with profiler.phase(f"command {args.command}"):
+        await run_command(tool, args, parser)
+
+    if args.profile_startup:
+        logger.info("\n" + profiler.report())
+
+
+async def run_command(tool: MemorySystemTool, args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """执行解析后的子命令"""
     if args.command == "list-skills":
         await tool.list_skills(args.agent_type, args.therapy_type)
     elif args.command == "list-records":
@@ -480,6 +514,10 @@ async def main():
         await tool.list_vectors(args.student_id)
     elif args.command == "add-skill":
         await tool.add_skill(args.agent_type, args.content, args.therapy_type)
+    elif args.command == "consolidate-skills":
+        await tool.consolidate_skills(args.agent_type, args.therapy_type)
+    elif args.command == "snapshot":
+        await tool.manage_snapshot(args.action, args.session_id, args.name)
     elif args.command == "sync":
         await tool.sync_json_vector()
     elif args.command == "validate":